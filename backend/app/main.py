@@ -2,16 +2,27 @@
 VoiceForge Backend - FastAPI Application
 CPU-based voice cloning with intelligent auto-processing
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 import logging
 import os
+from pathlib import Path
 
-from app.routers import audio, voice, generation, podcast
+from app.routers import audio, voice, generation, podcast, admin
 from app.services.voice_cloner import VoiceClonerService
 from app.services.denoiser import DenoiserService
 from app.services.podcast_engine import PodcastService
+from app.services.scheduler import GenerationScheduler, SchedulerFull, MAX_CONCURRENT_GENERATIONS
+from app.services.transcoder import TranscodeCache
+from app.services.metrics import REGISTRY, GENERATION_QUEUE
+from app.services.profiler import PROFILER
+from app.services.tracing import TracingMiddleware
+from app.services.janitor import (
+    StorageJanitor, StoragePolicy, HOUR,
+    OUTPUT_TTL_HOURS, PODCAST_TTL_HOURS, UPLOAD_TTL_HOURS, TEMP_TTL_HOURS
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -35,13 +46,51 @@ async def lifespan(app: FastAPI):
     app.state.voice_cloner = VoiceClonerService()
     logger.info("Voice cloner loaded successfully")
 
+    # One generation per TTS worker (or per batch slot) unless configured otherwise
+    voice_cloner = app.state.voice_cloner
+    if voice_cloner.worker_pool:
+        concurrency = voice_cloner.worker_pool.num_workers
+    elif voice_cloner.batcher:
+        concurrency = voice_cloner.batcher.max_batch_size
+    else:
+        concurrency = 1
+    app.state.scheduler = GenerationScheduler(MAX_CONCURRENT_GENERATIONS or concurrency)
+
     logger.info("Loading podcast service...")
-    app.state.podcast_service = PodcastService(app.state.voice_cloner)
+    app.state.podcast_service = PodcastService(app.state.voice_cloner, app.state.scheduler)
     logger.info("Podcast service loaded successfully")
     
+    # Compressed variants of served audio, cached next to their sources
+    app.state.transcoder = TranscodeCache(["uploads", "voice_models"])
+    
+    # Expire unused artifacts and keep storage within quota (clears crash debris first)
+    temp_dir = app.state.denoiser.temp_dir
+    app.state.janitor = StorageJanitor(
+        [
+            StoragePolicy(Path("uploads") / "outputs", OUTPUT_TTL_HOURS * HOUR),
+            StoragePolicy(Path("uploads") / "podcast_outputs", PODCAST_TTL_HOURS * HOUR),
+            # Uploads are voice sources, not cache: only their own TTL removes them
+            StoragePolicy(Path("uploads"), UPLOAD_TTL_HOURS * HOUR, in_quota=False),
+            StoragePolicy(temp_dir, TEMP_TTL_HOURS * HOUR),
+        ],
+        partial_roots=["uploads", "voice_models", temp_dir],
+        # Raw uploads awaiting processing, and per-segment podcast files
+        # (older versions wrote these next to the finished episodes)
+        job_leftovers=[
+            ("uploads", "*_raw.*"),
+            (temp_dir, "*_seg_*"),
+            (Path("uploads") / "podcast_outputs", "*_seg_*"),
+        ]
+    )
+    app.state.voice_cloner.output_cache.janitor = app.state.janitor
+    app.state.janitor.start()
+    
     yield
     
     logger.info("Shutting down VoiceForge backend...")
+    await app.state.janitor.stop()
+    PROFILER.shutdown()
+    app.state.voice_cloner.shutdown()
 
 
 app = FastAPI(
@@ -58,24 +107,55 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id"],
 )
 
+# Per-request traces, returned as X-Trace-Id (see /api/admin/traces)
+app.add_middleware(TracingMiddleware)
+
+@app.exception_handler(SchedulerFull)
+async def scheduler_full_handler(request: Request, exc: SchedulerFull):
+    """Reject work fast when the generation queue is full."""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
 # Register routers
 app.include_router(audio.router, prefix="/api/audio", tags=["Audio"])
 app.include_router(voice.router, prefix="/api/voice", tags=["Voice"])
 app.include_router(generation.router, prefix="/api/generate", tags=["Generation"])
 app.include_router(podcast.router, prefix="/api/podcast", tags=["Podcast"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
+    models_loaded = hasattr(app.state, "voice_cloner") and hasattr(app.state, "denoiser")
     return {
         "status": "healthy",
-        "models_loaded": hasattr(app.state, "voice_cloner") and hasattr(app.state, "denoiser")
+        "models_loaded": models_loaded,
+        "voice_cache": app.state.voice_cloner.voice_cache.stats() if models_loaded else None,
+        "batching": app.state.voice_cloner.batcher.stats() if models_loaded and app.state.voice_cloner.batcher else None,
+        "segment_cache": app.state.podcast_service.segment_cache.stats() if hasattr(app.state, "podcast_service") else None,
+        "transcode_cache": app.state.transcoder.stats() if hasattr(app.state, "transcoder") else None,
+        "storage": app.state.janitor.stats() if hasattr(app.state, "janitor") else None
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics: per-stage timings, real-time factor, in-flight work, model load time."""
+    if hasattr(app.state, "scheduler"):
+        scheduler_stats = app.state.scheduler.stats()
+        GENERATION_QUEUE.set(scheduler_stats["running"], state="running")
+        GENERATION_QUEUE.set(scheduler_stats["queued"], state="queued")
+    return PlainTextResponse(REGISTRY.render(), media_type=REGISTRY.CONTENT_TYPE)
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
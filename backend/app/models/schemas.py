@@ -14,6 +14,8 @@ class AudioUploadResponse(BaseModel):
     sample_rate: int
     is_valid: bool
     message: str
+    # Background voice state encoding: "pending", "ready", "failed" or "none"
+    voice_state: str = "none"
 
 
 class VoiceModelCreate(BaseModel):
@@ -33,16 +35,32 @@ class VoiceModel(BaseModel):
     preview_url: str
 
 
+class DefaultVoice(BaseModel):
+    """Built-in voice available without cloning."""
+    name: str
+    is_default: bool
+    loaded: bool
+
+
+class DefaultVoiceList(BaseModel):
+    """List of built-in voices."""
+    voices: List[DefaultVoice]
+    default: str
+
+
 class VoiceModelList(BaseModel):
     """List of voice models."""
     models: List[VoiceModel]
     count: int
+    # Pass as cursor to fetch the next page; None on the last page
+    next_cursor: Optional[str] = None
 
 
 class GenerationRequest(BaseModel):
     """Request to generate speech."""
     voice_model_id: Optional[str] = None
     audio_id: Optional[str] = None  # For one-shot cloning without saving
+    default_voice: Optional[str] = None  # Built-in voice name when no clone is given
     text: str = Field(..., min_length=1, max_length=50000)
     speed: float = Field(default=1.0, ge=0.5, le=2.0)
     pitch: float = Field(default=0.0, ge=-12.0, le=12.0)
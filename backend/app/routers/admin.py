@@ -0,0 +1,131 @@
+"""
+Admin router.
+Recent request traces and on-demand sampling profiles.
+"""
+import asyncio
+import hmac
+import os
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+
+from app.services.profiler import PROFILER, PROFILE_INTERVAL_MS, PROFILE_MAX_SECONDS, ProfilerBusy
+from app.services.tracing import TRACES
+
+# Required in X-Admin-Token (or as a bearer token) when set; otherwise only local clients are served
+ADMIN_TOKEN = os.environ.get("VOICEFORGE_ADMIN_TOKEN", "")
+LOCAL_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+def require_admin(request: Request) -> None:
+    if ADMIN_TOKEN:
+        supplied = request.headers.get("x-admin-token") or ""
+        authorization = request.headers.get("authorization", "")
+        if not supplied and authorization.lower().startswith("bearer "):
+            supplied = authorization[len("bearer "):].strip()
+        if not hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+            raise HTTPException(status_code=401, detail="Admin token required")
+    elif request.client is None or request.client.host not in LOCAL_HOSTS:
+        raise HTTPException(
+            status_code=403,
+            detail="Admin endpoints are only served to localhost unless VOICEFORGE_ADMIN_TOKEN is set"
+        )
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+class ProfileRequest(BaseModel):
+    """Profile every thread for seconds, or one request (by trace id) until it finishes."""
+    seconds: float | None = None
+    trace_id: str | None = None
+    interval_ms: float = PROFILE_INTERVAL_MS
+
+
+@router.get("/traces")
+async def list_traces(
+    limit: int = Query(50, ge=1, le=1000),
+    min_duration_ms: float = Query(0.0, ge=0),
+    path: str | None = Query(None, description="Only requests whose path starts with this")
+):
+    """Requests in flight and the most recent finished ones (newest first)."""
+    return {
+        "active": [trace.summary() for trace in TRACES.active()],
+        "traces": [trace.summary() for trace in TRACES.recent(limit, min_duration_ms, path)],
+        "buffer": TRACES.stats(),
+    }
+
+
+@router.get("/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """One trace with its spans and the time spent per span name."""
+    trace = TRACES.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found (it may have left the buffer)")
+    return trace.to_dict()
+
+
+@router.post("/profiles", status_code=201)
+async def start_profile(data: ProfileRequest):
+    """
+    Start a sampling profile. With trace_id, only work done for that request
+    is sampled and the profile ends when the request does (send the id in
+    X-Trace-Id to profile a request before it starts); seconds then bounds
+    the wait. Only one profile runs at a time.
+    """
+    if data.seconds is None and data.trace_id is None:
+        raise HTTPException(status_code=400, detail="Give seconds, trace_id or both")
+    seconds = data.seconds if data.seconds is not None else PROFILE_MAX_SECONDS
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {PROFILE_MAX_SECONDS:g}]")
+    if not 1 <= data.interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 1000")
+    if data.trace_id and TRACES.is_finished(data.trace_id):
+        raise HTTPException(status_code=409, detail="That request has already finished")
+
+    try:
+        session = PROFILER.start(seconds, data.trace_id, data.interval_ms)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return session.summary()
+
+
+@router.get("/profiles")
+async def list_profiles():
+    """The running profile and the last few finished ones."""
+    return {"profiles": [session.summary() for session in PROFILER.sessions()]}
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    """Profile status and its hottest functions so far."""
+    session = PROFILER.get(profile_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return {**session.summary(), "top_functions": session.top_functions()}
+
+
+@router.post("/profiles/{profile_id}/stop")
+async def stop_profile(profile_id: str):
+    """End a running profile now."""
+    session = await asyncio.to_thread(PROFILER.stop, profile_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return session.summary()
+
+
+@router.get("/profiles/{profile_id}/download")
+async def download_profile(profile_id: str):
+    """
+    The sampled stacks in the folded format ("frame;frame;... count" per
+    line), for speedscope or flamegraph.pl.
+    """
+    session = PROFILER.get(profile_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if session.running:
+        raise HTTPException(status_code=409, detail="Profile is still running; stop it or wait for it to finish")
+    return PlainTextResponse(
+        session.folded(),
+        headers={"content-disposition": f'attachment; filename="profile-{session.id}.folded"'}
+    )
@@ -2,80 +2,119 @@
 Audio upload and processing router.
 Handles file upload, format conversion, and denoising.
 """
+import asyncio
 import os
 import uuid
-import aiofiles
-from fastapi import APIRouter, UploadFile, File, HTTPException, Request
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Request, Query
 
 from app.models.schemas import AudioUploadResponse
+from app.services.http_cache import cached_file_response, discard_digest, record_digest
+from app.services.scheduler import client_id_for
+from app.services.tracing import span
+from app.services.transcoder import FORMAT_PATTERN
+from app.services.upload_spool import spool_upload, UploadTooLarge, UnsupportedUpload
 
 router = APIRouter()
 
 UPLOADS_DIR = "uploads"
 ALLOWED_EXTENSIONS = {".wav", ".mp3", ".m4a", ".webm", ".ogg", ".flac"}
 
+# The body is parsed by spool_upload, so describe the form for the API docs
+UPLOAD_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "multipart/form-data": {
+            "schema": {
+                "type": "object",
+                "required": ["file"],
+                "properties": {"file": {"type": "string", "format": "binary"}}
+            }
+        }
+    }
+}
 
-@router.post("/upload", response_model=AudioUploadResponse)
-async def upload_audio(request: Request, file: UploadFile = File(...)):
+
+@router.post("/upload", response_model=AudioUploadResponse, openapi_extra={"requestBody": UPLOAD_REQUEST_BODY})
+async def upload_audio(request: Request, precompute_voice: bool = False):
     """
     Upload audio file for voice cloning.
     Automatically converts format, resamples, and denoises.
     Minimum 30 seconds required for accurate cloning.
+    The file is streamed to disk; oversized or non-audio uploads are rejected
+    as soon as that is known.
+    With precompute_voice, the voice state is encoded in the background right
+    after processing, so cloning or one-shot generation can start at once.
     """
-    # Validate file extension
-    ext = os.path.splitext(file.filename)[1].lower()
-    if ext not in ALLOWED_EXTENSIONS:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Unsupported file format. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
-        )
-    
     # Generate unique ID
     audio_id = str(uuid.uuid4())[:12]
     
     # Ensure uploads dir exists
     os.makedirs(UPLOADS_DIR, exist_ok=True)
     
-    # Save uploaded file
-    raw_path = os.path.join(UPLOADS_DIR, f"{audio_id}_raw{ext}")
+    # Save uploaded file (extension is taken from the uploaded filename)
+    spool_path = os.path.join(UPLOADS_DIR, f"{audio_id}_raw.partial")
     processed_path = os.path.join(UPLOADS_DIR, f"{audio_id}.wav")
     
-    async with aiofiles.open(raw_path, "wb") as f:
-        content = await file.read()
-        await f.write(content)
+    try:
+        with span("receive_upload") as attributes:
+            filename, ext, attributes["bytes"] = await spool_upload(request, spool_path, ALLOWED_EXTENSIONS)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedUpload as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    raw_path = os.path.join(UPLOADS_DIR, f"{audio_id}_raw{ext}")
+    os.replace(spool_path, raw_path)
     
     # Process audio (convert, resample, denoise)
     denoiser = request.app.state.denoiser
     result = await denoiser.process_audio(raw_path, processed_path)
+    if result["output_path"]:
+        await asyncio.to_thread(record_digest, processed_path)
     
     # Clean up raw file
     if os.path.exists(raw_path):
         os.remove(raw_path)
     
+    voice_cloner = request.app.state.voice_cloner
+    if precompute_voice and result["output_path"]:
+        voice_cloner.precompute_voice_state(processed_path, request.app.state.scheduler, client_id_for(request))
+    
     return AudioUploadResponse(
         id=audio_id,
-        filename=file.filename,
+        filename=filename,
         duration_seconds=result["duration_seconds"],
         sample_rate=result["sample_rate"],
         is_valid=result["is_valid"],
-        message=result["message"]
+        message=result["message"],
+        voice_state=voice_cloner.voice_state_status(processed_path)
     )
 
 
 @router.get("/{audio_id}")
-async def get_audio(audio_id: str):
-    """Stream or download processed audio file."""
+async def get_audio(
+    request: Request,
+    audio_id: str,
+    format: str = Query("wav", pattern=FORMAT_PATTERN)
+):
+    """Stream or download processed audio file, optionally in another encoding."""
     audio_path = os.path.join(UPLOADS_DIR, f"{audio_id}.wav")
     
     if not os.path.exists(audio_path):
         raise HTTPException(status_code=404, detail="Audio not found")
     
-    return FileResponse(
-        audio_path,
-        media_type="audio/wav",
-        filename=f"{audio_id}.wav"
-    )
+    try:
+        variant = await request.app.state.transcoder.variant(audio_path, format)
+        return await cached_file_response(
+            request,
+            variant.path,
+            media_type=variant.media_type,
+            filename=f"{audio_id}{variant.extension}"
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Audio not found")
 
 
 @router.get("/{audio_id}/info")
@@ -88,16 +127,23 @@ async def get_audio_info(request: Request, audio_id: str):
     
     denoiser = request.app.state.denoiser
     # await the async method
-    return await denoiser.get_audio_info(audio_path)
+    info = await denoiser.get_audio_info(audio_path)
+    # Whether the voice state encoded at upload time is ready yet
+    info["voice_state"] = request.app.state.voice_cloner.voice_state_status(audio_path)
+    return info
 
 
 @router.delete("/{audio_id}")
-async def delete_audio(audio_id: str):
+async def delete_audio(request: Request, audio_id: str):
     """Delete an uploaded audio file."""
     audio_path = os.path.join(UPLOADS_DIR, f"{audio_id}.wav")
     
     if os.path.exists(audio_path):
+        # Voice states first: the cache key includes the file's modification time
+        request.app.state.voice_cloner.discard_voice_state(audio_path)
         os.remove(audio_path)
+        discard_digest(audio_path)
+        request.app.state.transcoder.discard(audio_path)
         return {"deleted": True}
     
     raise HTTPException(status_code=404, detail="Audio not found")
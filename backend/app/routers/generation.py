@@ -3,13 +3,20 @@ Speech generation router.
 Handles text-to-speech with cloned voices.
 """
 import os
-import asyncio
 import json
-from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import FileResponse
+from contextlib import nullcontext
+from fastapi import APIRouter, HTTPException, Request, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sse_starlette.sse import EventSourceResponse
 
+from app.services.audio_buffer import AudioAccumulator, to_pcm16, wav_header
+from app.services.scheduler import Priority, client_id_for
+from app.services.text_processor import TextProcessor
+from app.services.http_cache import cached_file_response
+from app.services.janitor import mark_accessed
+from app.services.transcoder import FORMAT_PATTERN
+
 router = APIRouter()
 
 
@@ -18,6 +25,7 @@ class GenerateRequest(BaseModel):
     text: str
     voice_model_id: str | None = None
     audio_id: str | None = None
+    default_voice: str | None = None  # Built-in voice name, see /api/voice/defaults
     speed: float = 1.0
     pitch: float = 0.0
 
@@ -28,6 +36,7 @@ class GenerateResponse(BaseModel):
     output_path: str
     duration_seconds: float
     audio_url: str
+    cache_hit: bool = False  # An identical earlier request's output was reused
 
 
 @router.post("/", response_model=GenerateResponse)
@@ -35,7 +44,8 @@ async def generate_speech(request: Request, data: GenerateRequest):
     """
     Generate speech from text using a cloned voice.
     
-    If neither voice_model_id nor audio_id is provided, uses a default voice.
+    If neither voice_model_id nor audio_id is provided, uses a default voice
+    (optionally chosen by name with default_voice).
     """
     # if not data.voice_model_id and not data.audio_id:
     #     raise HTTPException(
@@ -53,21 +63,44 @@ async def generate_speech(request: Request, data: GenerateRequest):
         if not os.path.exists(audio_path):
             raise HTTPException(status_code=404, detail="Audio not found")
     
-    # Generate speech
     voice_cloner = request.app.state.voice_cloner
-    result = await voice_cloner.generate_speech(
-        text=data.text,
-        voice_model_id=data.voice_model_id,
-        audio_path=audio_path,
-        speed=data.speed,
-        pitch=data.pitch
-    )
+    if data.default_voice and data.default_voice not in voice_cloner.DEFAULT_VOICES:
+        raise HTTPException(status_code=400, detail=f"Unknown default voice '{data.default_voice}'")
+    
+    try:
+        voice = voice_cloner.describe_voice(data.voice_model_id, audio_path, data.default_voice)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    scheduler = request.app.state.scheduler
+    client_id = client_id_for(request)
+    
+    async def generate():
+        # Generate speech once the scheduler grants a slot (429 if the queue is full)
+        async with scheduler.slot(Priority.INTERACTIVE, client_id):
+            return await voice_cloner.generate_speech(
+                text=data.text,
+                voice_model_id=data.voice_model_id,
+                audio_path=audio_path,
+                speed=data.speed,
+                pitch=data.pitch,
+                default_voice=data.default_voice
+            )
+    
+    # Identical requests reuse the existing output, or join the one being generated;
+    # the janitor must not expire an upload used as the voice meanwhile
+    with request.app.state.janitor.lease(audio_path) if audio_path else nullcontext():
+        result, cache_hit = await voice_cloner.output_cache.get_or_create(
+            voice_cloner.output_cache_key(data.text, voice, data.speed, data.pitch),
+            generate
+        )
     
     return GenerateResponse(
         output_id=result["output_id"],
         output_path=result["output_path"],
         duration_seconds=result["duration_seconds"],
-        audio_url=f"/api/generate/{result['output_id']}"
+        audio_url=f"/api/generate/{result['output_id']}",
+        cache_hit=cache_hit
     )
 
 
@@ -75,6 +108,7 @@ async def generate_speech(request: Request, data: GenerateRequest):
 async def generate_speech_stream(request: Request, data: GenerateRequest):
     """
     Generate speech with Server-Sent Events for progress updates.
+    A "generating" event is sent as each text chunk finishes synthesis.
     """
     if not data.voice_model_id and not data.audio_id:
         raise HTTPException(
@@ -85,6 +119,13 @@ async def generate_speech_stream(request: Request, data: GenerateRequest):
     if not data.text.strip():
         raise HTTPException(status_code=400, detail="Text cannot be empty")
     
+    voice_cloner = request.app.state.voice_cloner
+    scheduler = request.app.state.scheduler
+    client_id = client_id_for(request)
+    
+    # Reject before opening the event stream if the queue is full
+    scheduler.check_admission()
+    
     async def event_generator():
         try:
             # Send start event
@@ -95,7 +136,6 @@ async def generate_speech_stream(request: Request, data: GenerateRequest):
                     "message": "Starting generation..."
                 })
             }
-            await asyncio.sleep(0.1)
             
             # Get audio path if using audio_id
             audio_path = None
@@ -110,46 +150,52 @@ async def generate_speech_stream(request: Request, data: GenerateRequest):
                         })
                     }
                     return
+                mark_accessed(audio_path)
             
-            # Progress: loading voice
-            yield {
-                "data": json.dumps({
-                    "stage": "loading",
-                    "progress": 20,
-                    "message": "Loading voice model..."
-                })
-            }
-            await asyncio.sleep(0.1)
+            # Wait for a generation slot (already admitted above)
+            async with scheduler.slot(Priority.INTERACTIVE, client_id, admit=False):
+                # Progress: loading voice
+                yield {
+                    "data": json.dumps({
+                        "stage": "loading",
+                        "progress": 0,
+                        "message": "Loading voice model..."
+                    })
+                }
+                voice = await voice_cloner.resolve_voice(
+                    data.voice_model_id, audio_path, data.default_voice
+                )
             
-            # Progress: generating
-            yield {
-                "data": json.dumps({
-                    "stage": "generating",
-                    "progress": 50,
-                    "message": "Generating speech..."
-                })
-            }
+                # Progress: one event per synthesized text chunk
+                accumulator = AudioAccumulator(
+                    voice_cloner.tts_model.sample_rate,
+                    expected_seconds=TextProcessor.estimate_duration(data.text) * 1.25,
+                    crossfade_ms=voice_cloner.CHUNK_CROSSFADE_MS
+                )
+                async for idx, total, audio in voice_cloner.iter_speech_chunks(data.text, voice):
+                    accumulator.append(audio)
+                    yield {
+                        "data": json.dumps({
+                            "stage": "generating",
+                            "progress": round(95 * (idx + 1) / total, 1),
+                            "message": f"Generated chunk {idx + 1} of {total}",
+                            "chunks_completed": idx + 1,
+                            "total_chunks": total
+                        })
+                    }
             
-            # Generate speech
-            voice_cloner = request.app.state.voice_cloner
-            result = await voice_cloner.generate_speech(
-                text=data.text,
-                voice_model_id=data.voice_model_id,
-                audio_path=audio_path,
-                speed=data.speed,
-                pitch=data.pitch
-            )
+                result = await voice_cloner.save_output(accumulator.audio, data.speed, data.pitch)
             
-            # Progress: complete
-            yield {
-                "data": json.dumps({
-                    "stage": "complete",
-                    "progress": 100,
-                    "message": "Generation complete!",
-                    "audio_url": f"/api/generate/{result['output_id']}",
-                    "duration_seconds": result["duration_seconds"]
-                })
-            }
+                # Progress: complete
+                yield {
+                    "data": json.dumps({
+                        "stage": "complete",
+                        "progress": 100,
+                        "message": "Generation complete!",
+                        "audio_url": f"/api/generate/{result['output_id']}",
+                        "duration_seconds": result["duration_seconds"]
+                    })
+                }
             
         except Exception as e:
             yield {
@@ -163,16 +209,116 @@ async def generate_speech_stream(request: Request, data: GenerateRequest):
     return EventSourceResponse(event_generator())
 
 
+@router.post("/stream/audio")
+async def generate_speech_audio_stream(
+    request: Request,
+    data: GenerateRequest,
+    format: str = Query("wav", pattern="^(wav|pcm)$")
+):
+    """
+    Stream generated audio to the client while it is being synthesized.
+    
+    Each text chunk is sent as soon as it is generated, so time-to-first-audio
+    is one chunk's synthesis time. format=wav sends a 16-bit mono WAV with an
+    open-ended header; format=pcm sends raw little-endian 16-bit PCM
+    (sample rate in the X-Sample-Rate header).
+    """
+    if not data.text.strip():
+        raise HTTPException(status_code=400, detail="Text cannot be empty")
+    
+    audio_path = None
+    if data.audio_id:
+        audio_path = os.path.join("uploads", f"{data.audio_id}.wav")
+        if not os.path.exists(audio_path):
+            raise HTTPException(status_code=404, detail="Audio not found")
+        mark_accessed(audio_path)
+    
+    voice_cloner = request.app.state.voice_cloner
+    if data.default_voice and data.default_voice not in voice_cloner.DEFAULT_VOICES:
+        raise HTTPException(status_code=400, detail=f"Unknown default voice '{data.default_voice}'")
+    
+    # Cheap existence checks only; loading the voice waits for admission and a slot
+    try:
+        voice_cloner.describe_voice(data.voice_model_id, audio_path, data.default_voice)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    sample_rate = voice_cloner.tts_model.sample_rate
+    total_chunks = len(TextProcessor.chunk_text(data.text))
+    
+    scheduler = request.app.state.scheduler
+    client_id = client_id_for(request)
+    scheduler.check_admission()
+    
+    async def audio_generator():
+        # The slot is held while the voice loads and for as long as the client is being streamed to
+        async with scheduler.slot(Priority.INTERACTIVE, client_id, admit=False):
+            voice = await voice_cloner.resolve_voice(
+                data.voice_model_id, audio_path, data.default_voice
+            )
+            yield wav_header(sample_rate) if format == "wav" else b""
+            async for _, _, audio in voice_cloner.stream_speech(
+                data.text, voice, data.speed, data.pitch
+            ):
+                if len(audio):
+                    yield to_pcm16(audio)
+    
+    # Run up to the first yield (slot granted, voice loaded) before responding,
+    # so a voice that fails to load is an HTTP error rather than a broken stream
+    stream = audio_generator()
+    try:
+        first = await stream.__anext__()
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def body():
+        try:
+            yield first
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+    
+    return StreamingResponse(
+        body(),
+        media_type="audio/wav" if format == "wav" else f"audio/L16;rate={sample_rate};channels=1",
+        headers={
+            "X-Sample-Rate": str(sample_rate),
+            "X-Total-Chunks": str(total_chunks),
+            "Cache-Control": "no-store"
+        }
+    )
+
+
+@router.get("/queue")
+async def get_queue_stats(request: Request):
+    """Generation queue depth, concurrency and wait times."""
+    return request.app.state.scheduler.stats()
+
+
 @router.get("/{output_id}")
-async def download_generated_audio(output_id: str):
-    """Download generated audio file."""
+async def download_generated_audio(
+    request: Request,
+    output_id: str,
+    format: str = Query("wav", pattern=FORMAT_PATTERN)
+):
+    """Download generated audio file, optionally encoded as opus/mp3/flac or 16-bit/float WAV."""
     output_path = os.path.join("uploads", "outputs", f"{output_id}.wav")
     
     if not os.path.exists(output_path):
         raise HTTPException(status_code=404, detail="Generated audio not found")
     
-    return FileResponse(
-        output_path,
-        media_type="audio/wav",
-        filename=f"voiceforge_{output_id}.wav"
-    )
+    try:
+        variant = await request.app.state.transcoder.variant(output_path, format)
+        return await cached_file_response(
+            request,
+            variant.path,
+            media_type=variant.media_type,
+            filename=f"voiceforge_{output_id}{variant.extension}"
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Generated audio not found")
@@ -1,11 +1,15 @@
-from fastapi import APIRouter, HTTPException, Request, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Request, BackgroundTasks, Query
 from pydantic import BaseModel
 from typing import Dict
 from pathlib import Path
 import logging
 import traceback
 
+from app.services.scheduler import client_id_for
+from app.services.http_cache import cached_file_response
+from app.services.tracing import span
+from app.services.transcoder import FORMAT_PATTERN
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
@@ -22,13 +26,18 @@ async def generate_podcast(request: Request, data: PodcastRequest):
     if not hasattr(request.app.state, "podcast_service"):
         raise HTTPException(status_code=503, detail="Podcast service not initialized")
     
+    # Podcasts run at batch priority; reject up front if the queue is full
+    request.app.state.scheduler.check_admission()
+    
     try:
         service = request.app.state.podcast_service
-        result = await service.generate_podcast(
-            script=data.script,
-            speaker_map=data.speaker_map,
-            title=data.title
-        )
+        with span("generate_podcast", speakers=len(data.speaker_map)):
+            result = await service.generate_podcast(
+                script=data.script,
+                speaker_map=data.speaker_map,
+                title=data.title,
+                client_id=client_id_for(request)
+            )
         return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -40,9 +49,14 @@ async def generate_podcast(request: Request, data: PodcastRequest):
         raise HTTPException(status_code=500, detail=f"Generation error: {str(e)}")
 
 @router.get("/audio/{podcast_id}")
-async def get_podcast_audio(request: Request, podcast_id: str):
+async def get_podcast_audio(
+    request: Request,
+    podcast_id: str,
+    format: str = Query("wav", pattern=FORMAT_PATTERN)
+):
     """
     Stream/Download the generated podcast audio.
+    format selects an encoding (e.g. opus, mp3); encoded episodes are cached.
     """
     # Look in the podcast outputs directory
     # Note: Hardcoding path here matching the service... ideally config shared
@@ -50,9 +64,14 @@ async def get_podcast_audio(request: Request, podcast_id: str):
     
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="Podcast audio not found")
-        
-    return FileResponse(
-        path=file_path,
-        media_type="audio/wav",
-        filename=f"podcast_{podcast_id}.wav"
-    )
+    
+    try:
+        variant = await request.app.state.transcoder.variant(file_path, format)
+        return await cached_file_response(
+            request,
+            variant.path,
+            media_type=variant.media_type,
+            filename=f"podcast_{podcast_id}{variant.extension}"
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Podcast audio not found")
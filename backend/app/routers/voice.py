@@ -4,10 +4,14 @@ Handles voice cloning, model storage, and library management.
 """
 import os
 import traceback
-from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Request, Query
 
-from app.models.schemas import VoiceModelCreate, VoiceModel, VoiceModelList
+from app.models.schemas import (
+    VoiceModelCreate, VoiceModel, VoiceModelList, DefaultVoice, DefaultVoiceList
+)
+from app.services.http_cache import cached_file_response
+from app.services.tracing import span
+from app.services.transcoder import FORMAT_PATTERN
 
 router = APIRouter()
 
@@ -42,11 +46,13 @@ async def clone_voice(request: Request, data: VoiceModelCreate):
         # Create voice model using voice cloner
         voice_cloner = request.app.state.voice_cloner
         print("Calling save_voice_model")
-        metadata = await voice_cloner.save_voice_model(
-            audio_path=audio_path,
-            name=data.name,
-            tags=data.tags
-        )
+        # The janitor must not expire the upload while it is being cloned
+        with request.app.state.janitor.lease(audio_path), span("save_voice_model"):
+            metadata = await voice_cloner.save_voice_model(
+                audio_path=audio_path,
+                name=data.name,
+                tags=data.tags
+            )
         print("Model saved")
         
         return VoiceModel(
@@ -66,13 +72,22 @@ async def clone_voice(request: Request, data: VoiceModelCreate):
 
 
 @router.get("/models", response_model=VoiceModelList)
-async def list_voice_models(request: Request):
-    """List all saved voice models."""
+async def list_voice_models(
+    request: Request,
+    limit: int | None = Query(None, ge=1, le=500),
+    cursor: str | None = None,
+    tag: str | None = None,
+    name: str | None = None
+):
+    """
+    List saved voice models, newest first.
+    With limit, returns one page and a next_cursor to pass for the next one.
+    tag filters by exact tag, name by case-insensitive substring.
+    """
     try:
         voice_cloner = request.app.state.voice_cloner
-        # Use await if needed (currently synchronous but good to be careful)
-        # voice_cloner.list_voice_models is sync, so no await needed
-        models = voice_cloner.list_voice_models()
+        # Served from the catalog index (sync, no file reads)
+        models, next_cursor = voice_cloner.list_voice_models(limit=limit, cursor=cursor, tag=tag, name=name)
         
         return VoiceModelList(
             models=[
@@ -86,13 +101,26 @@ async def list_voice_models(request: Request):
                 )
                 for m in models
             ],
-            count=len(models)
+            count=len(models),
+            next_cursor=next_cursor
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Error in list_models: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/defaults", response_model=DefaultVoiceList)
+async def list_default_voices(request: Request):
+    """List built-in voices that can be used via default_voice without cloning."""
+    voice_cloner = request.app.state.voice_cloner
+    return DefaultVoiceList(
+        voices=[DefaultVoice(**v) for v in voice_cloner.list_default_voices()],
+        default=voice_cloner.DEFAULT_VOICE
+    )
+
+
 @router.get("/models/{model_id}")
 async def get_voice_model(request: Request, model_id: str):
     """Get details of a specific voice model."""
@@ -113,19 +141,28 @@ async def get_voice_model(request: Request, model_id: str):
 
 
 @router.get("/models/{model_id}/preview")
-async def get_voice_preview(request: Request, model_id: str):
-    """Stream preview audio for a voice model."""
+async def get_voice_preview(
+    request: Request,
+    model_id: str,
+    format: str = Query("wav", pattern=FORMAT_PATTERN)
+):
+    """Stream preview audio for a voice model, optionally in another encoding."""
     voice_cloner = request.app.state.voice_cloner
     preview_path = voice_cloner.get_preview_path(model_id)
     
     if not preview_path:
         raise HTTPException(status_code=404, detail="Preview not found")
     
-    return FileResponse(
-        preview_path,
-        media_type="audio/wav",
-        filename=f"{model_id}_preview.wav"
-    )
+    try:
+        variant = await request.app.state.transcoder.variant(preview_path, format)
+        return await cached_file_response(
+            request,
+            variant.path,
+            media_type=variant.media_type,
+            filename=f"{model_id}_preview{variant.extension}"
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Preview not found")
 
 
 @router.delete("/models/{model_id}")
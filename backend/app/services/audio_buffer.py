@@ -0,0 +1,216 @@
+"""
+Audio Buffer - Preallocated accumulator and streaming helpers for chunked generation
+Joins consecutively generated audio chunks with short crossfades and writes
+long audio to disk incrementally
+"""
+
+import os
+import struct
+import threading
+
+import numpy as np
+
+# Size placeholder for WAV streams whose final length is unknown
+UNKNOWN_WAV_SIZE = 0xFFFFFFFF
+
+
+def _crossfade_into(tail: np.ndarray, head: np.ndarray) -> None:
+    """Blend head into tail in place with a linear crossfade (equal lengths)."""
+    fade_in = np.linspace(0.0, 1.0, len(tail), endpoint=False, dtype=np.float32)
+    tail *= 1.0 - fade_in
+    tail += head * fade_in
+
+
+class AudioAccumulator:
+    """
+    Growable float32 buffer that chunks are appended to in order.
+    The buffer is preallocated from an estimate of the final length and only
+    grows (geometrically) if the estimate was too small, so appending N chunks
+    does not re-copy the accumulated audio N times.
+    """
+
+    def __init__(self, sample_rate: int, expected_seconds: float = 0.0, crossfade_ms: float = 10.0):
+        self.sample_rate = sample_rate
+        self.crossfade_samples = int(sample_rate * crossfade_ms / 1000)
+        capacity = max(int(sample_rate * expected_seconds), sample_rate)
+        self._buffer = np.zeros(capacity, dtype=np.float32)
+        self._length = 0
+        self.chunks = 0
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._length + extra
+        if needed <= len(self._buffer):
+            return
+        capacity = max(needed, int(len(self._buffer) * 1.5))
+        grown = np.zeros(capacity, dtype=np.float32)
+        grown[:self._length] = self._buffer[:self._length]
+        self._buffer = grown
+
+    def append(self, chunk: np.ndarray) -> None:
+        """Append a chunk, crossfading it with the tail of the audio so far."""
+        chunk = np.asarray(chunk, dtype=np.float32).reshape(-1)
+        if len(chunk) == 0:
+            return
+
+        overlap = 0
+        if self._length > 0:
+            overlap = min(self.crossfade_samples, self._length, len(chunk))
+
+        if overlap > 0:
+            _crossfade_into(self._buffer[self._length - overlap:self._length], chunk[:overlap])
+
+        rest = chunk[overlap:]
+        self._reserve(len(rest))
+        self._buffer[self._length:self._length + len(rest)] = rest
+        self._length += len(rest)
+        self.chunks += 1
+
+    @property
+    def audio(self) -> np.ndarray:
+        """The accumulated audio (a view into the buffer, no copy)."""
+        return self._buffer[:self._length]
+
+    def __len__(self) -> int:
+        return self._length
+
+
+class CrossfadeStream:
+    """
+    Streaming counterpart of AudioAccumulator.
+    Holds back the last crossfade window of each chunk so it can be blended
+    with the head of the next one before being released to the client.
+    """
+
+    def __init__(self, sample_rate: int, crossfade_ms: float = 10.0):
+        self.crossfade_samples = int(sample_rate * crossfade_ms / 1000)
+        self._pending = np.zeros(0, dtype=np.float32)
+
+    def push(self, chunk: np.ndarray) -> np.ndarray:
+        """Add a chunk and return the audio that is now final."""
+        chunk = np.array(chunk, dtype=np.float32).reshape(-1)
+        overlap = min(len(self._pending), len(chunk), self.crossfade_samples)
+        if overlap > 0:
+            _crossfade_into(self._pending[len(self._pending) - overlap:], chunk[:overlap])
+        joined = np.concatenate([self._pending, chunk[overlap:]])
+
+        hold = min(self.crossfade_samples, len(joined))
+        self._pending = joined[len(joined) - hold:].copy()
+        return joined[:len(joined) - hold]
+
+    def flush(self) -> np.ndarray:
+        """Release the held-back tail at the end of the stream."""
+        tail, self._pending = self._pending, np.zeros(0, dtype=np.float32)
+        return tail
+
+
+def to_pcm16(audio: np.ndarray) -> bytes:
+    """Convert float audio in [-1, 1] to little-endian 16-bit PCM bytes."""
+    clipped = np.clip(np.asarray(audio, dtype=np.float32), -1.0, 1.0)
+    return (clipped * 32767.0).astype("<i2").tobytes()
+
+
+def wav_header(sample_rate: int, channels: int = 1, bits_per_sample: int = 16,
+               data_bytes: int | None = None, audio_format: int = 1) -> bytes:
+    """
+    Build a 44-byte RIFF/WAVE header.
+    With data_bytes=None the sizes are set to the 0xFFFFFFFF placeholder used
+    for streams of unknown length, which players treat as "read until EOF".
+    """
+    block_align = channels * bits_per_sample // 8
+    if data_bytes is None:
+        riff_size = data_size = UNKNOWN_WAV_SIZE
+    else:
+        data_size = data_bytes
+        riff_size = min(36 + data_bytes, UNKNOWN_WAV_SIZE)
+    return (
+        b"RIFF" + struct.pack("<I", riff_size) + b"WAVE"
+        + b"fmt " + struct.pack(
+            "<IHHIIHH", 16, audio_format, channels, sample_rate,
+            sample_rate * block_align, block_align, bits_per_sample
+        )
+        + b"data" + struct.pack("<I", data_size)
+    )
+
+
+class StreamingWavWriter:
+    """
+    16-bit mono WAV file written incrementally.
+    Audio goes to `<path>.partial` and the header sizes are patched in on
+    close(), which then moves the file into place, so a finished file is never
+    half-written and memory use does not depend on the audio length.
+    """
+
+    def __init__(self, path, sample_rate: int):
+        self.path = str(path)
+        self.partial_path = self.path + ".partial"
+        self.sample_rate = sample_rate
+        self.frames = 0
+        self._file = open(self.partial_path, "wb")
+        self._file.write(wav_header(sample_rate, data_bytes=0))
+
+    def write(self, audio: np.ndarray) -> None:
+        """Append float audio in [-1, 1]."""
+        self.write_pcm16(to_pcm16(audio))
+
+    def write_pcm16(self, data: bytes) -> None:
+        """Append already converted 16-bit PCM bytes."""
+        self._file.write(data)
+        self.frames += len(data) // 2
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.frames / self.sample_rate
+
+    def close(self) -> None:
+        """Patch the header with the final sizes and move the file into place."""
+        self._file.seek(0)
+        self._file.write(wav_header(self.sample_rate, data_bytes=self.frames * 2))
+        self._file.close()
+        os.replace(self.partial_path, self.path)
+
+    def abort(self) -> None:
+        """Discard the partial file."""
+        self._file.close()
+        if os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class OrderedSegmentWriter:
+    """
+    Writes segments that may finish out of order to a StreamingWavWriter in
+    index order, with a fixed silence gap between consecutive segments.
+    Segments that arrive early are held as 16-bit PCM until their turn.
+    Thread-safe.
+    """
+
+    def __init__(self, writer: StreamingWavWriter, gap_seconds: float = 0.0):
+        self.writer = writer
+        self._silence = bytes(2 * int(writer.sample_rate * gap_seconds))
+        self._held: dict[int, bytes] = {}
+        self._lock = threading.Lock()
+        self.next_index = 0
+
+    def add(self, index: int, audio: np.ndarray) -> None:
+        """Add segment `index`; writes it and any held successors once contiguous."""
+        pcm = to_pcm16(audio)
+        with self._lock:
+            self._held[index] = pcm
+            while self.next_index in self._held:
+                if self.next_index > 0:
+                    self.writer.write_pcm16(self._silence)
+                self.writer.write_pcm16(self._held.pop(self.next_index))
+                self.next_index += 1
+
+    @property
+    def held_bytes(self) -> int:
+        """PCM bytes waiting for earlier segments."""
+        return sum(len(pcm) for pcm in self._held.values())
@@ -0,0 +1,140 @@
+"""
+Audio Decoder - Any upload to mono float32 at the target rate in one decode
+soundfile reads WAV/FLAC/OGG/MP3 directly; other formats stream from an ffmpeg pipe
+"""
+
+import os
+import shutil
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import soundfile as sf
+import soxr
+
+# Use the bundled ffmpeg when present (Windows builds)
+FFMPEG_PATH = Path(__file__).parent.parent.parent / "ffmpeg-master-latest-win64-gpl" / "bin"
+if FFMPEG_PATH.exists():
+    os.environ["PATH"] = str(FFMPEG_PATH) + os.pathsep + os.environ.get("PATH", "")
+
+# Frames decoded per block when streaming; a whole number of MPEG audio frames
+# (1152 samples), since libsndfile glitches on MP3 reads that split one
+DECODE_BLOCK_FRAMES = 1152 * 256
+
+
+@dataclass
+class AudioInfo:
+    """What soundfile reports about a file it can decode."""
+    sample_rate: int
+    channels: int
+    frames: int
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.frames / self.sample_rate
+
+
+def probe_audio(path: str) -> AudioInfo | None:
+    """Header info when soundfile can decode path, else None (ffmpeg is needed)."""
+    try:
+        info = sf.info(path)
+    except RuntimeError:
+        return None
+    return AudioInfo(sample_rate=info.samplerate, channels=info.channels, frames=info.frames)
+
+
+def resampled_length(frames: int, sample_rate: int, target_sr: int) -> int:
+    """
+    Length after resampling, as librosa.resample sizes it: the ceiling of
+    frames times the float ratio. Dividing exactly instead comes out one
+    sample short when the rounded ratio lands just above a whole number.
+    """
+    ratio = float(target_sr) / sample_rate
+    return int(np.ceil(frames * ratio))
+
+
+def decode_audio(path: str, target_sr: int) -> np.ndarray:
+    """
+    Decode path to mono float32 at target_sr with a single resample, the same
+    result librosa.load(path, sr=target_sr, mono=True) gives.
+    """
+    info = probe_audio(path)
+    if info is None:
+        blocks = list(_ffmpeg_blocks(path, target_sr, DECODE_BLOCK_FRAMES))
+        return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+
+    audio, sr = sf.read(path, dtype="float32", always_2d=True)
+    audio = audio.mean(axis=1, dtype=np.float32)
+    if sr == target_sr:
+        return audio
+    audio = soxr.resample(audio, sr, target_sr, quality="HQ")
+    length = resampled_length(info.frames, sr, target_sr)
+    if len(audio) >= length:
+        return audio[:length]
+    return np.pad(audio, (0, length - len(audio)))
+
+
+def iter_audio_blocks(path: str, target_sr: int, block_frames: int = DECODE_BLOCK_FRAMES) -> Iterator[np.ndarray]:
+    """
+    Stream path as mono float32 blocks at target_sr, resampling block by
+    block, so memory use does not depend on file length. The concatenated
+    blocks match decode_audio.
+    """
+    info = probe_audio(path)
+    if info is None:
+        yield from _ffmpeg_blocks(path, target_sr, block_frames)
+        return
+
+    resampler = None
+    if info.sample_rate != target_sr:
+        resampler = soxr.ResampleStream(info.sample_rate, target_sr, 1, dtype="float32", quality="HQ")
+    remaining = resampled_length(info.frames, info.sample_rate, target_sr)
+    with sf.SoundFile(path) as f:
+        while True:
+            block = f.read(block_frames, dtype="float32", always_2d=True)
+            last = len(block) < block_frames
+            mono = block.mean(axis=1, dtype=np.float32)
+            if resampler is not None:
+                mono = resampler.resample_chunk(mono, last=last)
+            mono = mono[:remaining]
+            remaining -= len(mono)
+            if len(mono):
+                yield mono
+            if last:
+                break
+    if remaining > 0:
+        yield np.zeros(remaining, dtype=np.float32)
+
+
+def _ffmpeg_blocks(path: str, target_sr: int, block_frames: int) -> Iterator[np.ndarray]:
+    """Decode with ffmpeg (downmix and resample in one pass) read from a pipe."""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise ValueError(f"ffmpeg is required to decode {Path(path).suffix or 'this'} audio")
+
+    process = subprocess.Popen(
+        [ffmpeg, "-nostdin", "-v", "error", "-i", str(path),
+         "-f", "f32le", "-ac", "1", "-ar", str(target_sr), "pipe:1"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    try:
+        block_bytes = block_frames * 4
+        leftover = b""
+        while data := process.stdout.read(block_bytes):
+            data = leftover + data
+            usable = len(data) - len(data) % 4
+            leftover = data[usable:]
+            if usable:
+                yield np.frombuffer(data[:usable], dtype=np.float32)
+        error = process.stderr.read().decode(errors="replace").strip()
+        if process.wait() != 0:
+            raise ValueError(f"Failed to decode audio: {error or f'ffmpeg exited with {process.returncode}'}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        process.stderr.close()
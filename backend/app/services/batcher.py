@@ -0,0 +1,314 @@
+"""
+Micro-Batcher - Runs concurrent short generations as one batched Pocket-TTS pass
+Off by default; enabled by setting VOICEFORGE_BATCH_WINDOW_MS above zero
+
+Pocket-TTS only exposes single-request generation, but its flow LM (where
+almost all the compute goes) is batch-capable. The LM's streaming attention
+keeps one position for the whole batch, so requests can share a pass only when
+their voice prompt plus text tokens add up to the same length and the text fits
+in a single Pocket-TTS sentence chunk. Everything else runs on its own through
+the normal path. Mimi's streaming decoder cannot take a batch, so each
+request's frames are decoded with its own decoder state.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Callable
+
+import numpy as np
+import torch
+
+try:
+    from pocket_tts.models.tts_model import prepare_text_prompt, split_into_best_sentences
+    from pocket_tts.modules.stateful_module import increment_steps, init_states
+except ImportError:  # Internals moved in this Pocket-TTS build; batching stays off
+    prepare_text_prompt = split_into_best_sentences = increment_steps = init_states = None
+
+from app.services.metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# How long the first request of a batch waits for company (ms); 0 disables batching
+BATCH_WINDOW_MS = float(os.environ.get("VOICEFORGE_BATCH_WINDOW_MS", "0"))
+# Requests run together in one batched pass at most
+MAX_BATCH_SIZE = int(os.environ.get("VOICEFORGE_MAX_BATCH_SIZE", "8"))
+
+# Mimi decoder context, as used by Pocket-TTS itself
+_MIMI_SEQUENCE_LENGTH = 1000
+# Mimi decoder steps per generated latent frame
+_MIMI_STEPS_PER_FRAME = 16
+
+
+def supports_batched_generation(tts_model) -> bool:
+    """Whether this Pocket-TTS build exposes the pieces batched generation needs."""
+    if increment_steps is None:
+        return False
+    flow_lm = getattr(tts_model, "flow_lm", None)
+    mimi = getattr(tts_model, "mimi", None)
+    return (
+        hasattr(tts_model, "_run_flow_lm")
+        and flow_lm is not None and mimi is not None
+        and hasattr(flow_lm, "conditioner") and hasattr(flow_lm.conditioner, "prepare")
+        and hasattr(mimi, "decode_from_latent") and hasattr(mimi, "quantizer")
+    )
+
+
+@dataclass
+class PreparedText:
+    """Text tokenized the way Pocket-TTS does for a single sentence chunk."""
+    text: str
+    tokens: torch.Tensor  # [1, T]
+    frames_after_eos: int
+    max_gen_len: int
+
+
+class BatchedGenerator:
+    """Synchronous batched generation on Pocket-TTS internals."""
+
+    def __init__(self, tts_model):
+        self.tts_model = tts_model
+
+    def prepare(self, text: str) -> PreparedText | None:
+        """Tokenize text; None if Pocket-TTS would split it into several chunks."""
+        flow_lm = self.tts_model.flow_lm
+        try:
+            chunks = split_into_best_sentences(flow_lm.conditioner.tokenizer, text)
+        except ValueError:
+            return None
+        if len(chunks) != 1:
+            return None
+
+        chunk = chunks[0]
+        _, frames_after_eos = prepare_text_prompt(chunk)
+        return PreparedText(
+            text=chunk,
+            tokens=flow_lm.conditioner.prepare(chunk).tokens,
+            frames_after_eos=frames_after_eos + 2,
+            max_gen_len=int((len(chunk.split()) + 2.0) * 12.5),
+        )
+
+    @staticmethod
+    def batch_key(voice_state: dict, prepared: PreparedText) -> tuple | None:
+        """
+        Requests with equal keys can share a batched pass: same state layout and
+        the same sequence position once the text has been prompted.
+        None if the state does not have the expected layout.
+        """
+        layout = []
+        for module_name, module_state in voice_state.items():
+            if set(module_state) != {"cache", "current_end"}:
+                return None
+            cache = module_state["cache"]
+            if cache.dim() < 2 or cache.shape[1] != 1:
+                return None
+            layout.append((module_name, tuple(cache.shape), cache.dtype, module_state["current_end"].shape[0]))
+        return tuple(layout), prepared.tokens.shape[-1]
+
+    @staticmethod
+    def _stack_states(voice_states: list[dict]) -> dict:
+        """Stack single-request states along the batch dimension (copies, inputs untouched)."""
+        stacked = {}
+        for module_name, module_state in voice_states[0].items():
+            stacked[module_name] = {
+                # The position is shared by the whole batch
+                "current_end": module_state["current_end"].clone(),
+                "cache": torch.cat([s[module_name]["cache"] for s in voice_states], dim=1),
+            }
+        return stacked
+
+    @torch.no_grad()
+    def generate(self, voice_states: list[dict], prepared: list[PreparedText]) -> list[torch.Tensor]:
+        """Generate audio for every request in one batched pass; returns 1-D tensors."""
+        tts_model = self.tts_model
+        flow_lm = tts_model.flow_lm
+        batch = len(voice_states)
+        device = prepared[0].tokens.device
+
+        state = self._stack_states(voice_states)
+        no_tokens = torch.zeros((batch, 0), dtype=torch.int64, device=device)
+        no_latents = torch.empty((batch, 0, flow_lm.ldim), dtype=flow_lm.dtype, device=device)
+        no_conditioning = torch.empty((batch, 0, flow_lm.dim), dtype=flow_lm.dtype, device=device)
+
+        # Prompt the text for every request at once
+        tokens = torch.cat([p.tokens.reshape(1, -1) for p in prepared], dim=0)
+        tts_model._run_flow_lm(
+            model_state=state,
+            text_tokens=tokens,
+            backbone_input_latents=no_latents,
+            audio_conditioning=no_conditioning,
+        )
+        increment_steps(flow_lm, state, increment=tokens.shape[1])
+
+        mimi_states = [
+            init_states(tts_model.mimi, batch_size=1, sequence_length=_MIMI_SEQUENCE_LENGTH)
+            for _ in range(batch)
+        ]
+        backbone_input = torch.full((batch, 1, flow_lm.ldim), float("NaN"), dtype=flow_lm.dtype, device=device)
+        eos_steps: list[int | None] = [None] * batch
+        frame_counts: list[int | None] = [None] * batch
+        frames: list[list[torch.Tensor]] = [[] for _ in range(batch)]
+
+        for step in range(max(p.max_gen_len for p in prepared)):
+            next_latent, is_eos = tts_model._run_flow_lm(
+                model_state=state,
+                text_tokens=no_tokens,
+                backbone_input_latents=backbone_input,
+                audio_conditioning=no_conditioning,
+            )
+            increment_steps(flow_lm, state, increment=1)
+
+            # Same stopping rule as Pocket-TTS, tracked per request
+            for row, request in enumerate(prepared):
+                if frame_counts[row] is not None:
+                    continue
+                if eos_steps[row] is None and is_eos[row].item():
+                    eos_steps[row] = step
+                if eos_steps[row] is not None and step >= eos_steps[row] + request.frames_after_eos:
+                    frame_counts[row] = step
+                elif step + 1 >= request.max_gen_len:
+                    logger.warning("Maximum generation length reached without EOS in batched generation")
+                    frame_counts[row] = step + 1
+
+            for row, count in enumerate(frame_counts):
+                if count is None or count > step:
+                    frames[row].append(self._decode_frame(next_latent[row:row + 1], mimi_states[row]))
+            if all(count is not None for count in frame_counts):
+                break
+            backbone_input = next_latent
+
+        return [
+            torch.cat(row_frames, dim=-1)[0, 0] if row_frames else torch.zeros(0)
+            for row_frames in frames
+        ]
+
+    def _decode_frame(self, latent: torch.Tensor, mimi_state: dict) -> torch.Tensor:
+        """Decode one latent frame of one request -> [1, 1, samples]."""
+        flow_lm = self.tts_model.flow_lm
+        mimi = self.tts_model.mimi
+        mimi_input = latent * flow_lm.emb_std + flow_lm.emb_mean
+        quantized = mimi.quantizer(mimi_input.transpose(-1, -2))
+        audio_frame = mimi.decode_from_latent(quantized, mimi_state)
+        increment_steps(mimi, mimi_state, increment=_MIMI_STEPS_PER_FRAME)
+        return audio_frame
+
+
+@dataclass
+class _PendingBatch:
+    requests: list = field(default_factory=list)  # (voice_state, text, prepared, future)
+    timer: asyncio.TimerHandle | None = None
+
+
+class MicroBatcher:
+    """
+    Collects synthesis requests for a short window and runs compatible ones
+    together. Requests that cannot be batched, or batches of one, go through
+    synthesize_one (voice_state, text) -> Tensor in a thread as usual.
+    A Pocket-TTS model is not safe to run from several threads at once, so
+    batches and single requests take turns on it; concurrency comes from
+    batching, not from overlapping passes.
+    """
+
+    def __init__(
+        self,
+        tts_model,
+        synthesize_one: Callable,
+        window_ms: float = BATCH_WINDOW_MS,
+        max_batch_size: int = MAX_BATCH_SIZE
+    ):
+        self.generator = BatchedGenerator(tts_model)
+        self.synthesize_one = synthesize_one
+        self.window_seconds = window_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self._pending: dict[tuple, _PendingBatch] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._model_lock = threading.Lock()
+        self.batches = 0
+        self.batched_requests = 0
+        self.single_requests = 0
+
+    async def synthesize(self, voice_state: dict, text: str) -> np.ndarray:
+        """Generate audio for text, batched with compatible concurrent requests."""
+        prepared = await asyncio.to_thread(self.generator.prepare, text)
+        key = self.generator.batch_key(voice_state, prepared) if prepared else None
+        if key is None:
+            self.single_requests += 1
+            audio = await asyncio.to_thread(self._on_model, self.synthesize_one, voice_state, text)
+            return audio.numpy()
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = _PendingBatch()
+            pending.timer = loop.call_later(self.window_seconds, self._flush, key)
+        pending.requests.append((voice_state, text, prepared, future))
+
+        if len(pending.requests) >= self.max_batch_size:
+            pending.timer.cancel()
+            self._flush(key)
+        return await future
+
+    def _flush(self, key: tuple) -> None:
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        # The batch serves several requests, so it belongs to none of their traces
+        task = contextvars.Context().run(asyncio.create_task, self._run(pending.requests))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, requests: list) -> None:
+        requests = [r for r in requests if not r[3].done()]
+        if len(requests) > 1:
+            try:
+                audios = await asyncio.to_thread(
+                    self._on_model,
+                    self._generate_batch,
+                    [r[0] for r in requests],
+                    [r[2] for r in requests]
+                )
+            except Exception as e:
+                logger.warning(f"Batched generation of {len(requests)} requests failed, running them one by one: {e}")
+            else:
+                self.batches += 1
+                self.batched_requests += len(requests)
+                for (_, _, _, future), audio in zip(requests, audios):
+                    if not future.done():
+                        future.set_result(audio.numpy())
+                return
+
+        for voice_state, text, _, future in requests:
+            self.single_requests += 1
+            try:
+                audio = await asyncio.to_thread(self._on_model, self.synthesize_one, voice_state, text)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(audio.numpy())
+
+    def _generate_batch(self, voice_states: list[dict], prepared: list[PreparedText]) -> list[torch.Tensor]:
+        # Timed once the model is ours, so waiting for it is not counted
+        with STAGE_SECONDS.time(stage="generate_audio_batch"):
+            return self.generator.generate(voice_states, prepared)
+
+    def _on_model(self, fn: Callable, *args):
+        """Run fn(*args) with the model to itself (called in a worker thread)."""
+        with self._model_lock:
+            return fn(*args)
+
+    def stats(self) -> dict:
+        """Batching counters."""
+        return {
+            "window_ms": self.window_seconds * 1000,
+            "max_batch_size": self.max_batch_size,
+            "batches": self.batches,
+            "batched_requests": self.batched_requests,
+            "single_requests": self.single_requests,
+            "avg_batch_size": round(self.batched_requests / self.batches, 2) if self.batches else 0.0,
+        }
@@ -6,17 +6,21 @@ Since DeepFilterNet doesn't support Python 3.14 yet
 import librosa
 import soundfile as sf
 import numpy as np
+import scipy.fft
+import scipy.signal
+from numpy.lib.stride_tricks import sliding_window_view
 from pathlib import Path
+from typing import Iterator
 import tempfile
 import os
 import asyncio
 
-# Configure ffmpeg for pydub (use bundled version)
-FFMPEG_PATH = Path(__file__).parent.parent.parent / "ffmpeg-master-latest-win64-gpl" / "bin"
-if FFMPEG_PATH.exists():
-    os.environ["PATH"] = str(FFMPEG_PATH) + os.pathsep + os.environ.get("PATH", "")
+from app.services.audio_decoder import decode_audio, iter_audio_blocks, probe_audio
+from app.services.metrics import IN_FLIGHT, STAGE_SECONDS
+from app.services.tracing import span
 
-from pydub import AudioSegment
+# Uploads at least this long are denoised block by block with bounded memory (0 = always)
+STREAMING_DENOISE_SECONDS = float(os.environ.get("VOICEFORGE_STREAMING_DENOISE_SECONDS", "300"))
 
 
 class DenoiserService:
@@ -25,35 +29,30 @@ class DenoiserService:
     MIN_DURATION_SECONDS = 30  # Minimum required for voice cloning
     TARGET_SAMPLE_RATE = 48000
     
+    # Spectral subtraction parameters (librosa.stft defaults)
+    N_FFT = 2048
+    HOP_LENGTH = 512
+    NOISE_PROFILE_SECONDS = 0.5
+    # Streaming mode: STFT frames processed per block, samples per scratch-file read
+    STREAM_BLOCK_FRAMES = 256
+    STREAM_READ_FRAMES = 1 << 18
+    
     def __init__(self):
         self.temp_dir = Path(tempfile.gettempdir()) / "voiceforge" / "processed"
         self.temp_dir.mkdir(parents=True, exist_ok=True)
     
-    def _convert_to_wav(self, input_path: str, output_path: str) -> str:
-        """Convert any supported audio format to WAV using pydub."""
-        ext = Path(input_path).suffix.lower().lstrip('.')
-        if ext == 'wav':
-            return input_path
-        
-        try:
-            audio = AudioSegment.from_file(input_path, format=ext)
-            audio = audio.set_frame_rate(self.TARGET_SAMPLE_RATE).set_channels(1)
-            audio.export(output_path, format='wav')
-            return output_path
-        except Exception as e:
-            raise ValueError(f"Failed to convert {ext} to WAV: {str(e)}")
-    
     async def process_audio(
         self,
         input_path: str,
         output_path: str | None = None
     ) -> dict:
         """
-        Process audio file: load, resample, apply basic noise reduction.
+        Process audio file: decode, resample, apply basic noise reduction.
         """
         try:
             # Run blocking operations in thread
-            return await asyncio.to_thread(self._process_sync, input_path, output_path)
+            with IN_FLIGHT.track(operation="denoise"), span("process_audio"):
+                return await asyncio.to_thread(self._process_sync, input_path, output_path)
         except Exception as e:
             return {
                 "output_path": "",
@@ -65,50 +64,58 @@ class DenoiserService:
             
     def _process_sync(self, input_path: str, output_path: str | None) -> dict:
         """Synchronous implementation of processing."""
-        temp_wav = None
         try:
-            # Pre-convert non-WAV formats to WAV using pydub (requires ffmpeg)
-            ext = Path(input_path).suffix.lower()
-            if ext != '.wav':
-                temp_wav = str(self.temp_dir / f"temp_{Path(input_path).stem}.wav")
-                input_path = self._convert_to_wav(input_path, temp_wav)
+            # Generate output path if not provided
+            if output_path is None:
+                input_name = Path(input_path).stem
+                output_path = str(self.temp_dir / f"{input_name}_processed.wav")
             
-            # Load audio with librosa
-            audio, sr = librosa.load(input_path, sr=self.TARGET_SAMPLE_RATE, mono=True)
+            # Long uploads (and those whose length is unknown before decoding)
+            # never load fully into memory
+            info = probe_audio(input_path)
+            if info is None or info.duration_seconds >= STREAMING_DENOISE_SECONDS:
+                duration = self._process_streaming(input_path, output_path)
+                return self._result(output_path, duration)
+            
+            # Decode straight to the target rate (one decode, one resample)
+            sr = self.TARGET_SAMPLE_RATE
+            with STAGE_SECONDS.time(stage="denoise_decode"):
+                audio = decode_audio(input_path, sr)
             
             # Calculate duration
             duration = len(audio) / sr
             
             # Apply basic noise reduction using spectral gating
-            audio_denoised = self._reduce_noise(audio, sr)
+            with STAGE_SECONDS.time(stage="denoise_reduce"):
+                audio_denoised = self._reduce_noise(audio, sr)
             
             # Normalize audio
-            audio_normalized = librosa.util.normalize(audio_denoised)
-            
-            # Generate output path if not provided
-            if output_path is None:
-                input_name = Path(input_path).stem
-                output_path = str(self.temp_dir / f"{input_name}_processed.wav")
+            with STAGE_SECONDS.time(stage="denoise_normalize"):
+                audio_normalized = librosa.util.normalize(audio_denoised)
             
             # Save as WAV
-            sf.write(output_path, audio_normalized, sr)
-            
-            # Validate duration
-            is_valid = duration >= self.MIN_DURATION_SECONDS
-            if is_valid:
-                message = f"Audio processed successfully ({duration:.1f}s)"
-            else:
-                message = f"Audio too short ({duration:.1f}s). Need at least {self.MIN_DURATION_SECONDS}s for accurate cloning."
+            with STAGE_SECONDS.time(stage="denoise_write"):
+                sf.write(output_path, audio_normalized, sr)
             
-            return {
-                "output_path": output_path,
-                "duration_seconds": duration,
-                "sample_rate": sr,
-                "is_valid": is_valid,
-                "message": message
-            }
+            return self._result(output_path, duration)
         except Exception as e:
              raise e
+    
+    def _result(self, output_path: str, duration: float) -> dict:
+        """Processing result, validating duration."""
+        is_valid = duration >= self.MIN_DURATION_SECONDS
+        if is_valid:
+            message = f"Audio processed successfully ({duration:.1f}s)"
+        else:
+            message = f"Audio too short ({duration:.1f}s). Need at least {self.MIN_DURATION_SECONDS}s for accurate cloning."
+        
+        return {
+            "output_path": output_path,
+            "duration_seconds": duration,
+            "sample_rate": self.TARGET_SAMPLE_RATE,
+            "is_valid": is_valid,
+            "message": message
+        }
 
     async def get_audio_info(self, audio_path: str) -> dict:
         """Get information about an audio file without processing."""
@@ -157,7 +164,7 @@ class DenoiserService:
             stft = librosa.stft(audio)
             
             # Estimate noise from first 0.5 seconds (assuming it contains less speech)
-            noise_frames = int(0.5 * sr / 512)  # 512 is default hop length
+            noise_frames = int(self.NOISE_PROFILE_SECONDS * sr / self.HOP_LENGTH)
             noise_frames = min(noise_frames, stft.shape[1] // 4)
             
             if noise_frames > 0:
@@ -182,3 +189,140 @@ class DenoiserService:
         except Exception:
             # If noise reduction fails, return original
             return audio
+    
+    def _reduce_noise_stream(self, blocks: Iterator[np.ndarray]) -> Iterator[np.ndarray]:
+        """
+        Streaming equivalent of _reduce_noise: the noise profile is estimated
+        once from the opening frames, then STFT frames are cleaned a block at a
+        time and overlap-added, yielding finished output samples as soon as no
+        later frame overlaps them. The input length need not be known up front;
+        only a few blocks of samples are held at any time.
+        """
+        n_fft, hop = self.N_FFT, self.HOP_LENGTH
+        pad = n_fft // 2
+        max_noise_frames = int(self.NOISE_PROFILE_SECONDS * self.TARGET_SAMPLE_RATE / hop)
+        block_frames = max(self.STREAM_BLOCK_FRAMES, max_noise_frames)
+        window = scipy.signal.get_window("hann", n_fft, fftbins=True).astype(np.float32)
+        window_sq = window ** 2
+        
+        # Centered STFT input: pad zeros, the signal, pad zeros. buf holds
+        # padded samples from the start of frame `frame` onwards; ola and
+        # ola_sum hold the overlap-added output and window sum from there.
+        buf = np.zeros(pad, dtype=np.float32)
+        ola = np.zeros(0, dtype=np.float32)
+        ola_sum = np.zeros(0, dtype=np.float32)
+        frame = 0
+        received = 0
+        length = None  # input length, known once blocks run out
+        noise_spectrum = None
+        
+        while True:
+            # Gather input for the next block of frames
+            needed = (block_frames - 1) * hop + n_fft
+            pieces = [buf]
+            have = len(buf)
+            while have < needed and length is None:
+                piece = next(blocks, None)
+                if piece is None:
+                    length = received
+                    piece = np.zeros(pad, dtype=np.float32)
+                else:
+                    received += len(piece)
+                pieces.append(piece)
+                have += len(piece)
+            if len(pieces) > 1:
+                buf = np.concatenate(pieces)
+            
+            count = block_frames
+            if length is not None:
+                n_frames = 1 + length // hop
+                count = min(block_frames, n_frames - frame)
+            if noise_spectrum is None and length is not None:
+                if min(max_noise_frames, n_frames // 4) == 0:
+                    # Too short to estimate noise from: unchanged, like _reduce_noise
+                    yield buf[pad:pad + length].copy()
+                    return
+            
+            window_len = (count - 1) * hop + n_fft
+            if len(buf) < window_len:
+                buf = np.pad(buf, (0, window_len - len(buf)))
+            frames = sliding_window_view(buf[:window_len], n_fft)[::hop] * window
+            spectrum = scipy.fft.rfft(frames, axis=-1)
+            magnitude = np.abs(spectrum)
+            if noise_spectrum is None:
+                noise_frames = max_noise_frames if length is None else min(max_noise_frames, n_frames // 4)
+                noise_spectrum = np.mean(magnitude[:noise_frames], axis=0, keepdims=True)
+            
+            # Spectral subtraction as a gain on the complex spectrum (same phase)
+            cleaned = np.maximum(magnitude - 1.5 * noise_spectrum, 0.01 * magnitude)
+            gain = np.divide(cleaned, magnitude, out=np.zeros_like(magnitude), where=magnitude > 0)
+            spectrum *= gain
+            synthesized = scipy.fft.irfft(spectrum, n=n_fft, axis=-1).astype(np.float32, copy=False)
+            synthesized *= window
+            
+            if len(ola) < window_len:
+                ola = np.pad(ola, (0, window_len - len(ola)))
+                ola_sum = np.pad(ola_sum, (0, window_len - len(ola_sum)))
+            for k in range(n_fft // hop):
+                part = slice(k * hop, (k + 1) * hop)
+                ola[k * hop:(k + count) * hop].reshape(count, hop)[:] += synthesized[:, part]
+                ola_sum[k * hop:(k + count) * hop].reshape(count, hop)[:] += window_sq[part]
+            
+            # Samples before the next frame's start are final
+            start = frame * hop
+            frame += count
+            last = length is not None and frame >= n_frames
+            done = len(ola) if last else count * hop
+            finished = ola[:done]
+            nonzero = ola_sum[:done] > np.finfo(np.float32).tiny
+            finished[nonzero] /= ola_sum[:done][nonzero]
+            
+            # Output drops the leading pad and ends after hop * (n_frames - 1) samples
+            lo = max(pad - start, 0)
+            hi = min(pad + hop * (n_frames - 1) - start, done) if last else done
+            if hi > lo:
+                yield finished[lo:hi].copy()
+            if last:
+                return
+            
+            ola = ola[done:]
+            ola_sum = ola_sum[done:]
+            buf = buf[count * hop:]
+    
+    def _process_streaming(self, input_path: str, output_path: str) -> float:
+        """
+        Decode, denoise and peak-normalize a file with bounded memory. Pass one
+        writes the denoised float32 samples to a scratch file while tracking the
+        peak; pass two scales them into the output WAV. Returns the duration.
+        """
+        received = 0
+        
+        def counted_blocks() -> Iterator[np.ndarray]:
+            nonlocal received
+            for block in iter_audio_blocks(input_path, self.TARGET_SAMPLE_RATE):
+                received += len(block)
+                yield block
+        
+        partial_path = f"{output_path}.partial"
+        peak = 0.0
+        try:
+            # Decoding and noise reduction are interleaved, so they are timed together
+            with STAGE_SECONDS.time(stage="denoise_stream_reduce"), open(partial_path, "wb") as f:
+                for chunk in self._reduce_noise_stream(counted_blocks()):
+                    if len(chunk):
+                        peak = max(peak, float(np.max(np.abs(chunk))))
+                    chunk.tofile(f)
+            
+            # Same scaling as librosa.util.normalize (silence is left alone)
+            scale = 1.0 / peak if peak > np.finfo(np.float32).tiny else 1.0
+            block_bytes = self.STREAM_READ_FRAMES * 4
+            with STAGE_SECONDS.time(stage="denoise_stream_write"), open(partial_path, "rb") as f, sf.SoundFile(
+                output_path, "w", samplerate=self.TARGET_SAMPLE_RATE, channels=1, format="WAV"
+            ) as out:
+                while data := f.read(block_bytes):
+                    out.write(np.frombuffer(data, dtype=np.float32) * np.float32(scale))
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        
+        return received / self.TARGET_SAMPLE_RATE
@@ -0,0 +1,127 @@
+"""
+HTTP Cache - Strong validators and conditional responses for served audio
+Content digests are stored beside each file when it is written, never recomputed per request
+"""
+
+import asyncio
+import hashlib
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from app.services.janitor import StorageJanitor, mark_accessed
+
+# Cache lifetime of downloads (seconds); served files never change once written
+DOWNLOAD_MAX_AGE = int(os.environ.get("VOICEFORGE_DOWNLOAD_MAX_AGE", str(365 * 24 * 3600)))
+# Sidecar holding "<sha256> <size> <mtime_ns>" of the file it sits next to
+DIGEST_SUFFIX = ".sha256"
+# Bytes hashed per read
+DIGEST_CHUNK_BYTES = 1024 ** 2
+
+
+def digest_path(path: str | Path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + DIGEST_SUFFIX)
+
+
+def record_digest(path: str | Path) -> str:
+    """Hash a finished file and store the digest beside it (atomic)."""
+    path = Path(path)
+    stat = path.stat()
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(DIGEST_CHUNK_BYTES):
+            sha256.update(chunk)
+    digest = sha256.hexdigest()
+
+    sidecar = digest_path(path)
+    partial = sidecar.with_name(sidecar.name + ".partial")
+    partial.write_text(f"{digest} {stat.st_size} {stat.st_mtime_ns}\n")
+    os.replace(partial, sidecar)
+    return digest
+
+
+def file_digest(path: str | Path, stat: os.stat_result | None = None) -> str:
+    """
+    The stored digest of path. A file without a current one (written before
+    digests were recorded, or rewritten since) is hashed once and recorded.
+    """
+    stat = stat or os.stat(path)
+    try:
+        digest, size, mtime_ns = digest_path(path).read_text().split()
+        if int(size) == stat.st_size and int(mtime_ns) == stat.st_mtime_ns:
+            return digest
+    except (FileNotFoundError, ValueError):
+        pass
+    return record_digest(path)
+
+
+def discard_digest(path: str | Path) -> None:
+    digest_path(path).unlink(missing_ok=True)
+
+
+class LeasedFileResponse(FileResponse):
+    """A FileResponse that keeps the janitor off its file until it has been sent."""
+
+    def __init__(self, *args, janitor: StorageJanitor, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.janitor = janitor
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        with self.janitor.lease(self.path):
+            await super().__call__(scope, receive, send)
+
+
+def _not_modified(request: Request, etag: str, stat: os.stat_result) -> bool:
+    """Whether the client's cached copy is current (If-None-Match takes precedence, RFC 9110)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison, as required for If-None-Match
+        return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(stat.st_mtime) <= since
+    return False
+
+
+async def cached_file_response(
+    request: Request,
+    path: str | Path,
+    media_type: str,
+    filename: str
+) -> Response:
+    """
+    Serve an immutable file with a strong ETag (its stored content digest),
+    a long-lived Cache-Control, and 304 Not Modified for conditional
+    requests. Range and If-Range requests get 206 partial content. The
+    janitor holds off deleting the file while it is being sent.
+    Raises FileNotFoundError when path does not exist.
+    """
+    stat = await asyncio.to_thread(os.stat, path)
+    digest = await asyncio.to_thread(file_digest, path, stat)
+    headers = {
+        "etag": f'"{digest}"',
+        "cache-control": f"public, max-age={DOWNLOAD_MAX_AGE}, immutable",
+    }
+    if _not_modified(request, headers["etag"], stat):
+        mark_accessed(path)
+        headers["last-modified"] = formatdate(stat.st_mtime, usegmt=True)
+        return Response(status_code=304, headers=headers)
+
+    janitor = getattr(request.app.state, "janitor", None)
+    if janitor is None:
+        return FileResponse(path, media_type=media_type, filename=filename, headers=headers, stat_result=stat)
+    return LeasedFileResponse(
+        path, media_type=media_type, filename=filename, headers=headers, stat_result=stat, janitor=janitor
+    )
@@ -0,0 +1,338 @@
+"""
+Janitor - Disk lifecycle of uploads, generated outputs and podcasts
+Expires artifacts by last access, enforces a disk quota and clears debris left by crashed jobs
+"""
+
+import asyncio
+import fnmatch
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+# Unused artifacts are deleted after this long (hours; 0 keeps them)
+OUTPUT_TTL_HOURS = float(os.environ.get("VOICEFORGE_OUTPUT_TTL_HOURS", "168"))
+PODCAST_TTL_HOURS = float(os.environ.get("VOICEFORGE_PODCAST_TTL_HOURS", "720"))
+UPLOAD_TTL_HOURS = float(os.environ.get("VOICEFORGE_UPLOAD_TTL_HOURS", "0"))
+TEMP_TTL_HOURS = float(os.environ.get("VOICEFORGE_TEMP_TTL_HOURS", "24"))
+# Disk budget across the managed directories (bytes; 0 disables the quota)
+DISK_QUOTA_BYTES = int(os.environ.get("VOICEFORGE_DISK_QUOTA_BYTES", str(20 * 1024 ** 3)))
+# Seconds between sweeps
+JANITOR_INTERVAL_SECONDS = int(os.environ.get("VOICEFORGE_JANITOR_INTERVAL_SECONDS", "600"))
+# Artifacts touched more recently than this are never deleted (seconds)
+GRACE_SECONDS = 15 * 60
+
+# Leftovers of interrupted writes: removed at startup, never touched while running
+PARTIAL_SUFFIXES = (".partial", ".tmp")
+
+
+def is_partial_artifact(name: str) -> bool:
+    return name.endswith(PARTIAL_SUFFIXES)
+
+
+def artifact_key(name: str) -> str:
+    """
+    The artifact a file belongs to. Companion files share their source's
+    leading name: <id>.wav, <id>.wav.sha256, <id>.tc-opus.opus,
+    <id>.voice_state.pt and their .<name>.tmp spools all belong to <id>.
+    """
+    return name.lstrip(".").split(".", 1)[0]
+
+
+def mark_accessed(path: str | Path) -> None:
+    """
+    Record a use of path as its access time (its modification time, which
+    keys its content digest, is kept).
+    """
+    try:
+        os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+    except OSError:
+        pass
+
+
+@dataclass
+class StoragePolicy:
+    """
+    A directory the janitor manages, and how long unused artifacts live
+    there. Artifacts outside the quota are only ever deleted by their TTL.
+    """
+    directory: Path
+    ttl_seconds: float
+    in_quota: bool = True
+
+
+@dataclass
+class _Artifact:
+    policy: StoragePolicy
+    key: str
+    files: list[Path]
+    size: int
+    last_access: float
+    busy: bool
+
+
+class StorageJanitor:
+    """
+    Periodically deletes artifacts (a file together with its digest,
+    transcodes and voice state) from the managed directories:
+
+    - artifacts not accessed within their directory's TTL,
+    - then the least recently accessed ones while the total of the
+      directories under the quota exceeds it.
+
+    Last access is the newest access or modification time of any file of
+    the artifact. Artifacts are never deleted while leased (being served or
+    read by a generation), while still being written (they have a partial
+    file), or within GRACE_SECONDS of their last access. Partial files left
+    by crashed jobs are removed once at startup, before anything writes:
+    PARTIAL_SUFFIXES files anywhere under partial_roots, and files matching
+    a job_leftovers (directory, glob) pair directly in that directory.
+    """
+
+    def __init__(
+        self,
+        policies: list[StoragePolicy],
+        partial_roots: list[str | Path],
+        job_leftovers: list[tuple[str | Path, str]] = (),
+        quota_bytes: int = DISK_QUOTA_BYTES,
+        interval_seconds: int = JANITOR_INTERVAL_SECONDS
+    ):
+        self.policies = policies
+        self.partial_roots = [Path(root) for root in partial_roots]
+        self.job_leftovers = [(Path(directory).absolute(), pattern) for directory, pattern in job_leftovers]
+        self.quota_bytes = quota_bytes
+        self.interval_seconds = interval_seconds
+        self._leases: dict[Path, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+        self.sweeps = 0
+        self.last_sweep_at: float | None = None
+        self.usage_bytes = 0
+        self.files_deleted = 0
+        self.bytes_reclaimed = 0
+        self.reclaimed_by_reason: dict[str, int] = defaultdict(int)
+
+    # Leases
+
+    @contextmanager
+    def lease(self, path: str | Path) -> Iterator[None]:
+        """Keep path's artifact from being deleted while the block runs."""
+        self.acquire(path)
+        try:
+            yield
+        finally:
+            self.release(path)
+
+    def acquire(self, path: str | Path) -> None:
+        path = Path(path).absolute()
+        with self._lock:
+            self._leases[path] += 1
+        mark_accessed(path)
+
+    def release(self, path: str | Path) -> None:
+        path = Path(path).absolute()
+        with self._lock:
+            self._leases[path] -= 1
+            if self._leases[path] <= 0:
+                del self._leases[path]
+
+    def delete_unless_leased(self, path: str | Path) -> bool:
+        """
+        Delete path now (for caches evicting their own files) unless it is
+        leased; returns False if it was kept. Checked and deleted under the
+        lock, like sweeps.
+        """
+        path = Path(path)
+        with self._lock:
+            if path.absolute() in self._leases:
+                return False
+            path.unlink(missing_ok=True)
+        return True
+
+    # Lifecycle
+
+    def start(self) -> None:
+        self.remove_partial_artifacts()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                logger.error(f"Storage sweep failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def is_job_leftover(self, path: Path) -> bool:
+        """Whether path is a file a running job keeps only until it finishes."""
+        directory = path.parent.absolute()
+        return any(
+            directory == leftover_dir and fnmatch.fnmatchcase(path.name, pattern)
+            for leftover_dir, pattern in self.job_leftovers
+        )
+
+    def remove_partial_artifacts(self) -> int:
+        """Delete what interrupted uploads, generations and caches left behind (startup only)."""
+        candidates = [
+            path
+            for root in self.partial_roots if root.exists()
+            for path in root.rglob("*") if is_partial_artifact(path.name)
+        ]
+        for directory, pattern in self.job_leftovers:
+            if directory.exists():
+                candidates.extend(directory.glob(pattern))
+
+        reclaimed = 0
+        count = 0
+        for path in candidates:
+            try:
+                if not path.is_file():
+                    continue
+                size = path.stat().st_size
+                path.unlink()
+            except OSError:
+                continue
+            reclaimed += size
+            count += 1
+        self._record("startup", count, reclaimed)
+        if count:
+            logger.info(f"Removed {count} partial files ({reclaimed / 1024 ** 2:.1f} MB) left by interrupted jobs")
+        return reclaimed
+
+    # Sweeps
+
+    def sweep(self) -> dict:
+        """One TTL and quota pass; returns what was deleted."""
+        now = time.time()
+        artifacts = self._scan()
+        expired = [
+            a for a in artifacts
+            if a.policy.ttl_seconds and now - a.last_access > a.policy.ttl_seconds
+        ]
+        ttl_count, ttl_bytes = self._delete(expired, "ttl", now)
+
+        # Only directories under the quota count towards it or give way to it
+        artifacts = [a for a in artifacts if a.policy.in_quota]
+        usage = sum(a.size for a in artifacts if a.files[0].exists())
+        quota_count, quota_bytes = 0, 0
+        if self.quota_bytes and usage > self.quota_bytes:
+            # Least recently accessed first, until within quota
+            victims = []
+            excess = usage - self.quota_bytes
+            for artifact in sorted(artifacts, key=lambda a: a.last_access):
+                if excess <= 0:
+                    break
+                if artifact.files[0].exists() and self._deletable(artifact, now):
+                    victims.append(artifact)
+                    excess -= artifact.size
+            quota_count, quota_bytes = self._delete(victims, "quota", now)
+            usage -= quota_bytes
+
+        with self._lock:
+            self.sweeps += 1
+            self.last_sweep_at = now
+            self.usage_bytes = usage
+        if ttl_count or quota_count:
+            logger.info(
+                f"Storage sweep: {ttl_count} expired ({ttl_bytes / 1024 ** 2:.1f} MB), "
+                f"{quota_count} over quota ({quota_bytes / 1024 ** 2:.1f} MB); {usage / 1024 ** 2:.1f} MB in use"
+            )
+        return {
+            "expired": ttl_count,
+            "evicted": quota_count,
+            "bytes_reclaimed": ttl_bytes + quota_bytes,
+            "usage_bytes": usage,
+        }
+
+    def _scan(self) -> list[_Artifact]:
+        artifacts = []
+        for policy in self.policies:
+            groups: dict[str, list[tuple[Path, os.stat_result]]] = defaultdict(list)
+            try:
+                entries = list(os.scandir(policy.directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        groups[artifact_key(entry.name)].append((Path(entry.path), entry.stat()))
+                except OSError:
+                    continue
+            for key, files in groups.items():
+                artifacts.append(_Artifact(
+                    policy=policy,
+                    key=key,
+                    # The source (shortest name) first
+                    files=[path for path, _ in sorted(files, key=lambda f: len(f[0].name))],
+                    size=sum(stat.st_size for _, stat in files),
+                    last_access=max(max(stat.st_atime, stat.st_mtime) for _, stat in files),
+                    busy=any(is_partial_artifact(path.name) or self.is_job_leftover(path) for path, _ in files)
+                ))
+        return artifacts
+
+    def _deletable(self, artifact: _Artifact, now: float) -> bool:
+        """Whether artifact is idle: not being written, recently used or leased."""
+        if artifact.busy or now - artifact.last_access < GRACE_SECONDS:
+            return False
+        return not any(path.absolute() in self._leases for path in artifact.files)
+
+    def _delete(self, artifacts: list[_Artifact], reason: str, now: float) -> tuple[int, int]:
+        count = 0
+        reclaimed = 0
+        for artifact in artifacts:
+            # Checked and deleted under the lock, so a lease cannot be taken in between
+            with self._lock:
+                if not self._deletable(artifact, now):
+                    continue
+                for path in artifact.files:
+                    try:
+                        path.unlink()
+                    except FileNotFoundError:
+                        continue
+                    except OSError as e:
+                        logger.warning(f"Could not delete {path}: {e}")
+                        continue
+                    count += 1
+                reclaimed += artifact.size
+        self._record(reason, count, reclaimed)
+        return count, reclaimed
+
+    def _record(self, reason: str, count: int, reclaimed: int) -> None:
+        with self._lock:
+            self.files_deleted += count
+            self.bytes_reclaimed += reclaimed
+            self.reclaimed_by_reason[reason] += reclaimed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "usage_bytes": self.usage_bytes,
+                "quota_bytes": self.quota_bytes,
+                "sweeps": self.sweeps,
+                "last_sweep_at": self.last_sweep_at,
+                "files_deleted": self.files_deleted,
+                "bytes_reclaimed": self.bytes_reclaimed,
+                "bytes_reclaimed_by_reason": dict(self.reclaimed_by_reason),
+                "leases": len(self._leases),
+                "policies": {
+                    str(policy.directory): policy.ttl_seconds / HOUR if policy.ttl_seconds else None
+                    for policy in self.policies
+                },
+            }
@@ -0,0 +1,249 @@
+"""
+Metrics - Prometheus text-format metrics for generation, denoising and podcasts
+Per-stage latency histograms, real-time factor, in-flight work and model load time
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.services.tracing import record_span, span
+
+# Latency buckets (seconds): sub-millisecond state copies up to minutes-long podcasts
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# Real-time factor buckets: below 1 is faster than real time
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """A named metric family with one series per combination of label values."""
+    kind = ""
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in values]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels) -> Iterator[None]:
+        """Count the block as in flight while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in values]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...] = (), buckets: tuple[float, ...] = STAGE_BUCKETS):
+        super().__init__(name, help, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per series: (per-bucket counts, sum, count)
+        self._series: dict[tuple[str, ...], tuple[list[int], float, int]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._series.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._series[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall time of the block (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            series = sorted((key, (list(c), s, n)) for key, (c, s, n) in self._series.items())
+        lines = []
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, inf)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class StageHistogram(Histogram):
+    """Stage timings, also recorded as spans of the current request's trace."""
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            with span(labels["stage"]):
+                yield
+        finally:
+            Histogram.observe(self, time.perf_counter() - start, **labels)
+
+    def observe(self, value: float, **labels) -> None:
+        super().observe(value, **labels)
+        record_span(labels["stage"], value)
+
+
+class MetricsRegistry:
+    """The metrics exposed at /metrics, rendered in the Prometheus text format (0.0.4)."""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.register(StageHistogram(
+    "voiceforge_stage_seconds",
+    "Time spent in each processing stage.",
+    ("stage",)
+))
+REAL_TIME_FACTOR = REGISTRY.register(Histogram(
+    "voiceforge_real_time_factor",
+    "Seconds of compute per second of audio produced.",
+    ("kind",),
+    buckets=RTF_BUCKETS
+))
+AUDIO_SECONDS = REGISTRY.register(Counter(
+    "voiceforge_audio_seconds_total",
+    "Seconds of audio produced.",
+    ("kind",)
+))
+COMPUTE_SECONDS = REGISTRY.register(Counter(
+    "voiceforge_compute_seconds_total",
+    "Seconds of compute spent producing audio.",
+    ("kind",)
+))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    "voiceforge_in_flight",
+    "Operations currently running.",
+    ("operation",)
+))
+GENERATION_QUEUE = REGISTRY.register(Gauge(
+    "voiceforge_generation_queue",
+    "Generations holding a scheduler slot (running) or waiting for one (queued).",
+    ("state",)
+))
+MODEL_LOAD_SECONDS = REGISTRY.register(Gauge(
+    "voiceforge_model_load_seconds",
+    "Time taken to load each model at startup.",
+    ("model",)
+))
+
+
+def record_real_time_factor(kind: str, compute_seconds: float, audio_seconds: float) -> None:
+    """Account compute spent on audio_seconds of output (skipped for empty audio)."""
+    if audio_seconds <= 0:
+        return
+    REAL_TIME_FACTOR.observe(compute_seconds / audio_seconds, kind=kind)
+    AUDIO_SECONDS.inc(audio_seconds, kind=kind)
+    COMPUTE_SECONDS.inc(compute_seconds, kind=kind)
+
+
+@contextmanager
+def timed_load(model: str) -> Iterator[None]:
+    """Record how long the block takes to load model."""
+    start = time.perf_counter()
+    yield
+    MODEL_LOAD_SECONDS.set(time.perf_counter() - start, model=model)
@@ -0,0 +1,186 @@
+"""
+Output Cache - Content-addressed, deduplicating cache of generated speech
+Identical generation requests reuse the existing output instead of creating a new one
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from app.services.http_cache import discard_digest
+from app.services.janitor import StorageJanitor, mark_accessed
+
+logger = logging.getLogger(__name__)
+
+# Disk budget for cached outputs (bytes)
+OUTPUT_CACHE_BYTES = int(os.environ.get("VOICEFORGE_OUTPUT_CACHE_BYTES", str(1024 ** 3)))
+
+
+def output_key(**fields) -> str:
+    """sha256 content address over everything that determines the generated audio."""
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class OutputCache:
+    """
+    Maps request content keys to generated outputs in uploads/outputs.
+    Each entry is a small JSON record (the save_output result) in index_dir;
+    the index is rebuilt from those records at startup, least recently used
+    first by record mtime, which is refreshed on every hit. Once the outputs
+    exceed the disk budget the least recently used are deleted, except
+    outputs the janitor has leased (being downloaded), which are skipped.
+    Concurrent misses for the same key share one generation (single-flight).
+    """
+
+    def __init__(self, index_dir: str | Path, max_bytes: int = OUTPUT_CACHE_BYTES):
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[dict, int]] = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        # Set once the app's janitor exists; its leases protect outputs from eviction
+        self.janitor: StorageJanitor | None = None
+        self._load_index()
+
+    def _record_path(self, key: str) -> Path:
+        return self.index_dir / f"{key}.json"
+
+    def _load_index(self) -> None:
+        records = []
+        for path in self.index_dir.glob("*.json"):
+            try:
+                with open(path) as f:
+                    result = json.load(f)
+                size = os.path.getsize(result["output_path"])
+                records.append((path.stat().st_mtime, path.stem, result, size))
+            except (OSError, ValueError, KeyError):
+                # Output gone or record unreadable
+                path.unlink(missing_ok=True)
+        with self._lock:
+            for _, key, result, size in sorted(records, key=lambda r: r[0]):
+                self._entries[key] = (result, size)
+                self._current_bytes += size
+            self._evict()
+
+    def get(self, key: str) -> dict | None:
+        """The cached result for key (marking it recently used), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            return None
+
+        result = entry[0]
+        if not os.path.exists(result["output_path"]):
+            # Deleted behind our back
+            self._drop(key)
+            return None
+        try:
+            os.utime(self._record_path(key))
+        except OSError:
+            pass
+        # A reused output is in use again; keep the janitor's TTL from expiring it
+        mark_accessed(result["output_path"])
+        return result
+
+    def put(self, key: str, result: dict) -> None:
+        """Record a finished output, evicting old outputs to stay within budget."""
+        size = os.path.getsize(result["output_path"])
+        tmp_path = self._record_path(key).with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(result, f)
+        os.replace(tmp_path, self._record_path(key))
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._current_bytes -= old[1]
+            self._entries[key] = (result, size)
+            self._current_bytes += size
+            self._evict()
+
+    async def get_or_create(self, key: str, create: Callable[[], Awaitable[dict]]) -> tuple[dict, bool]:
+        """
+        Return (result, cache_hit). On a miss create() generates the output;
+        identical concurrent requests wait for that same generation. The
+        generation runs as its own task, so a disconnecting client does not
+        cancel it for the others.
+        """
+        result = self.get(key)
+        if result is not None:
+            self.hits += 1
+            return result, True
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task), True
+
+        self.misses += 1
+        task = asyncio.create_task(self._create(key, create))
+        # Retrieve the outcome even if every waiter has gone away
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._in_flight[key] = task
+        return await asyncio.shield(task), False
+
+    async def _create(self, key: str, create: Callable[[], Awaitable[dict]]) -> dict:
+        try:
+            result = await create()
+            await asyncio.to_thread(self.put, key, result)
+            return result
+        finally:
+            self._in_flight.pop(key, None)
+
+    def _drop(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._current_bytes -= entry[1]
+        self._record_path(key).unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        """Delete least recently used outputs until within budget, skipping leased ones (lock held)."""
+        for key in list(self._entries):
+            if self._current_bytes <= self.max_bytes:
+                break
+            result, size = self._entries[key]
+            output_path = Path(result["output_path"])
+            if self.janitor is None:
+                output_path.unlink(missing_ok=True)
+            elif not self.janitor.delete_unless_leased(output_path):
+                # Being served; a later eviction gets it
+                continue
+            del self._entries[key]
+            self._current_bytes -= size
+            discard_digest(output_path)
+            self._record_path(key).unlink(missing_ok=True)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.coalesced + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "coalesced": self.coalesced,
+                "misses": self.misses,
+                "in_flight": len(self._in_flight),
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+            }
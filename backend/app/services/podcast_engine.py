@@ -7,26 +7,42 @@ from pathlib import Path
 from typing import List, Dict, Optional
 from datetime import datetime
 import json
+import time
 
 import soundfile as sf
 import numpy as np
 import librosa
-from pydub import AudioSegment
 
+from app.services.audio_buffer import OrderedSegmentWriter, StreamingWavWriter
 from app.services.voice_cloner import VoiceClonerService
+from app.services.tts_workers import VoiceRef
 from app.services.denoiser import DenoiserService
+from app.services.http_cache import record_digest
+from app.services.metrics import IN_FLIGHT, STAGE_SECONDS, record_real_time_factor
+from app.services.scheduler import GenerationScheduler, Priority
+from app.services.segment_cache import SegmentCache, segment_key
+from app.services.text_processor import MAX_CHARS_PER_CHUNK
+from app.services.tracing import span
+from app.services.voice_state import pocket_tts_version
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Silence between consecutive segments
+SEGMENT_GAP_SECONDS = 0.3
+# Segments may start at most this far ahead of the first one not yet written
+SEGMENT_REORDER_WINDOW = 8
+
 class PodcastService:
-    def __init__(self, voice_cloner: VoiceClonerService):
+    def __init__(self, voice_cloner: VoiceClonerService, scheduler: GenerationScheduler | None = None):
         self.voice_cloner = voice_cloner
+        # Segments are queued as batch work so interactive requests go first
+        self.scheduler = scheduler or GenerationScheduler()
         self.output_dir = Path("uploads/podcast_outputs")
         self.output_dir.mkdir(parents=True, exist_ok=True)
-        # Limit concurrent generations to avoid CPU choking
-        self.generation_semaphore = asyncio.Semaphore(2)
+        # Rendered segments by content, so re-rendering an edited script is incremental
+        self.segment_cache = SegmentCache(Path("uploads/segment_cache"))
         
         # Ensure FFMPEG is in path (Shared logic with Denoiser)
         FFMPEG_PATH = Path(__file__).parent.parent.parent / "ffmpeg-master-latest-win64-gpl" / "bin"
@@ -81,7 +97,13 @@ class PodcastService:
             
         return segments
 
-    async def generate_podcast(self, script: str, speaker_map: Dict[str, str], title: str = "Podcast") -> dict:
+    async def generate_podcast(
+        self,
+        script: str,
+        speaker_map: Dict[str, str],
+        title: str = "Podcast",
+        client_id: str = "anonymous"
+    ) -> dict:
         """
         Generate a full podcast from script.
         speaker_map: {"SpeakerName": "voice_model_id"}
@@ -96,74 +118,113 @@ class PodcastService:
             if segment["speaker"] not in speaker_map:
                 raise ValueError(f"Speaker '{segment['speaker']}' not defined in cast.")
 
-        # Generate segments SEQUENTIALLY (Pocket-TTS model state is not thread-safe)
-        segment_files = []
-        for i, segment in enumerate(segments):
-            voice_id = speaker_map[segment["speaker"]]
-            logger.info(f"Generating segment {i+1}/{len(segments)} for {segment['speaker']}")
-            file_path = await self._generate_segment(i, segment["text"], voice_id, podcast_id)
-            segment_files.append(file_path)
-        
-        # Stitch them together
+        # Resolve each speaker's voice once for the whole podcast; loading or
+        # encoding a voice uses the model, so it takes a slot like the segments do
+        voices = {}
+        async with self.scheduler.slot(Priority.BATCH, client_id, admit=False):
+            for speaker in dict.fromkeys(segment["speaker"] for segment in segments):
+                voices[speaker] = await self.voice_cloner.resolve_voice(voice_model_id=speaker_map[speaker])
+
+        # Everything besides voice and text that changes the rendered audio
+        params = {
+            "model_variant": self.voice_cloner.MODEL_VARIANT,
+            "pocket_tts": pocket_tts_version(),
+            "crossfade_ms": self.voice_cloner.CHUNK_CROSSFADE_MS,
+            "max_chars_per_chunk": MAX_CHARS_PER_CHUNK,
+        }
+        # Kept apart from the segments, which are returned to the client as-is
+        cache_keys = [segment_key(voices[segment["speaker"]].key, segment["text"], params) for segment in segments]
+
+        # Segments are written into the output file as soon as they (and all
+        # segments before them) are ready; nothing is stitched at the end
         output_path = self.output_dir / f"{podcast_id}.wav"
-        
-        logger.info(f"Stitching {len(segment_files)} segments...")
-        duration = await asyncio.to_thread(
-            self._stitch_audio, 
-            segment_files, 
-            output_path
-        )
-        
-        # Clean up temp files
-        for f in segment_files:
-            try:
-                Path(f).unlink(missing_ok=True)
-            except Exception as e:
-                logger.warning(f"Failed to delete temp file {f}: {e}")
+        writer = StreamingWavWriter(output_path, self.voice_cloner.tts_model.sample_rate)
+        try:
+            with IN_FLIGHT.track(operation="podcast"):
+                stitcher = OrderedSegmentWriter(writer, gap_seconds=SEGMENT_GAP_SECONDS)
+                compute_seconds = await self._render_segments(segments, cache_keys, voices, stitcher, client_id)
+                await asyncio.to_thread(writer.close)
+                await asyncio.to_thread(record_digest, output_path)
+        except BaseException:
+            writer.abort()
+            raise
+        duration = writer.duration_seconds
+        record_real_time_factor("podcast", compute_seconds, duration)
 
         return {
             "id": podcast_id,
             "title": title,
             "url": f"/api/podcast/audio/{podcast_id}",
             "duration": duration,
-            "segments": segments # Return parsed script for UI sync
+            "segments": segments, # Return parsed script for UI sync (with per-segment cache_hit)
+            "cache_hits": sum(1 for segment in segments if segment.get("cache_hit"))
         }
 
-    async def _generate_segment_safe(self, index: int, text: str, voice_id: str, podcast_id: str) -> str:
-        """Wrapper to limit concurrency."""
-        async with self.generation_semaphore:
-            return await self._generate_segment(index, text, voice_id, podcast_id)
-
-    async def _generate_segment(self, index: int, text: str, voice_id: str, podcast_id: str) -> str:
-        """Generate single audio segment."""
-        # Use existing cloner service
-        # Note: speed/pitch support could be added here by extending arguments
-        result = await self.voice_cloner.generate_speech(
-            text=text,
-            voice_model_id=voice_id
-        )
-        
-        # Move to temp location with index to ensure order
-        src_path = Path(result["output_path"])
-        dest_path = self.output_dir / f"{podcast_id}_seg_{index:03d}.wav"
-        src_path.rename(dest_path)
-        
-        return str(dest_path)
+    async def _render_segments(
+        self,
+        segments: List[Dict[str, str]],
+        cache_keys: List[str],
+        voices: Dict[str, VoiceRef],
+        stitcher: OrderedSegmentWriter,
+        client_id: str
+    ) -> float:
+        """
+        Render all segments in parallel, as many at a time as the scheduler has
+        generation slots (one per TTS worker or batch slot; a single slot without
+        either, so segments then render one after another), handing each to the
+        stitcher.
+        Returns the seconds spent synthesizing (segment cache hits cost none).
+        Longest segments start first so the last one to finish is short, but a
+        segment only starts within SEGMENT_REORDER_WINDOW of the first unwritten
+        one, which bounds how much finished audio waits in memory.
+        """
+        pending = sorted(range(len(segments)), key=lambda i: len(segments[i]["text"]), reverse=True)
+        progress = asyncio.Condition()
+        compute_seconds = 0.0
 
-    def _stitch_audio(self, file_paths: List[str], output_path: Path) -> float:
-        """Concatenate audio files using pydub."""
-        combined = AudioSegment.empty()
-        silence = AudioSegment.silent(duration=300) # 300ms gap
-        
-        for i, fp in enumerate(file_paths):
-            try:
-                seg = AudioSegment.from_wav(fp)
-                combined += seg
-                # Add silence between speakers
-                if i < len(file_paths) - 1:
-                    combined += silence
-            except Exception as e:
-                logger.error(f"Error processing segment {fp}: {e}")
-        
-        combined.export(str(output_path), format="wav")
-        return combined.duration_seconds
+        def take_next() -> Optional[int]:
+            limit = stitcher.next_index + max(SEGMENT_REORDER_WINDOW, self.scheduler.max_concurrent)
+            for pos, index in enumerate(pending):
+                if index < limit:
+                    return pending.pop(pos)
+            return None
+
+        async def worker():
+            nonlocal compute_seconds
+            while True:
+                async with progress:
+                    index = take_next()
+                    while index is None and pending:
+                        await progress.wait()
+                        index = take_next()
+                if index is None:
+                    return
+
+                segment = segments[index]
+                with span("podcast_segment", index=index) as attributes:
+                    audio = await asyncio.to_thread(self.segment_cache.get, cache_keys[index])
+                    segment["cache_hit"] = attributes["cache_hit"] = audio is not None
+                    if audio is None:
+                        async with self.scheduler.slot(Priority.BATCH, client_id, admit=False):
+                            logger.info(f"Generating segment {index+1}/{len(segments)} for {segment['speaker']}")
+                            # Note: speed/pitch support could be added here by extending arguments
+                            start = time.perf_counter()
+                            audio = await self.voice_cloner.render_speech(segment["text"], voices[segment["speaker"]])
+                            compute_seconds += time.perf_counter() - start
+                        await asyncio.to_thread(self.segment_cache.put, cache_keys[index], audio)
+                    with STAGE_SECONDS.time(stage="podcast_stitch"):
+                        await asyncio.to_thread(stitcher.add, index, audio)
+
+                async with progress:
+                    progress.notify_all()
+
+        # One worker per generation slot keeps this podcast from filling the shared queue
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.scheduler.max_concurrent, len(segments)))]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+        return compute_seconds
@@ -0,0 +1,229 @@
+"""
+Profiler - On-demand stack-sampling profiles of the running server
+Samples every thread for a time window, or only the threads working on one traced request
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from app.services.tracing import TRACES, TraceStore, is_event_loop_thread, trace_of_thread
+
+logger = logging.getLogger(__name__)
+
+# Longest profile a session may run (seconds)
+PROFILE_MAX_SECONDS = float(os.environ.get("VOICEFORGE_PROFILE_MAX_SECONDS", "300"))
+# Default time between samples (milliseconds)
+PROFILE_INTERVAL_MS = 10.0
+# Finished profiles kept for download
+PROFILES_KEPT = 10
+# Functions listed in a profile's summary
+TOP_FUNCTIONS = 25
+# Innermost frames of threads waiting for work (idle pool threads, the loop's select)
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("thread.py", "_worker"),
+    ("selectors.py", "select"),
+}
+
+
+class ProfilerBusy(Exception):
+    """A profile is already running (one at a time keeps the overhead bounded)."""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+
+def _folded_stack(frame) -> str:
+    """The stack ending at frame, outermost first, ';'-separated (flame graph "folded" format)."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class ProfileSession:
+    """One profile: sampled stacks with how often each was seen."""
+
+    def __init__(self, seconds: float, trace_id: str | None, interval_ms: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.trace_id = trace_id
+        self.seconds = seconds
+        self.interval_ms = interval_ms
+        self.started_at = time.time()
+        self.ended_at: float | None = None
+        self.end_reason: str | None = None
+        self.samples: Counter[str] = Counter()
+        self.ticks = 0
+        self.idle_samples = 0
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self.ended_at is None
+
+    def _snapshot(self) -> Counter[str]:
+        with self._lock:
+            return Counter(self.samples)
+
+    def folded(self) -> str:
+        """Samples in the folded format read by flamegraph.pl and speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in self._snapshot().most_common())
+
+    def top_functions(self, limit: int = TOP_FUNCTIONS) -> list[dict]:
+        """Functions by samples spent inside them (total) and in their own code (self)."""
+        total: Counter[str] = Counter()
+        own: Counter[str] = Counter()
+        samples = self._snapshot()
+        for stack, count in samples.items():
+            frames = stack.split(";")[1:]  # without the thread name
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for label in set(frames):
+                total[label] += count
+        sampled = sum(samples.values()) or 1
+        return [
+            {
+                "function": label,
+                "total_samples": count,
+                "self_samples": own[label],
+                "total_percent": round(100 * count / sampled, 1),
+                "self_percent": round(100 * own[label] / sampled, 1),
+            }
+            for label, count in total.most_common(limit)
+        ]
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "mode": "request" if self.trace_id else "window",
+            "trace_id": self.trace_id,
+            "status": "running" if self.running else "finished",
+            "end_reason": self.end_reason,
+            "started_at": self.started_at,
+            "ended_at": self.ended_at,
+            "max_seconds": self.seconds,
+            "interval_ms": self.interval_ms,
+            "ticks": self.ticks,
+            "idle_samples": self.idle_samples,
+            "samples": sum(self._snapshot().values()),
+        }
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of the server's threads from a background
+    thread (sys._current_frames), so model, effects, denoising and disk work
+    running in the thread pool is seen as well as the event loop. A request
+    profile keeps only the worker threads running spans of that trace, and
+    ends when the request does.
+    """
+
+    def __init__(self, traces: TraceStore = TRACES):
+        self.traces = traces
+        self._sessions: OrderedDict[str, ProfileSession] = OrderedDict()
+        self._current: ProfileSession | None = None
+        self._lock = threading.Lock()
+
+    def start(self, seconds: float, trace_id: str | None = None,
+              interval_ms: float = PROFILE_INTERVAL_MS) -> ProfileSession:
+        """Start sampling; raises ProfilerBusy when a profile is already running."""
+        session = ProfileSession(min(seconds, PROFILE_MAX_SECONDS), trace_id, interval_ms)
+        with self._lock:
+            if self._current is not None:
+                raise ProfilerBusy(f"Profile {self._current.id} is still running")
+            self._current = session
+            self._sessions[session.id] = session
+            while len(self._sessions) > PROFILES_KEPT:
+                self._sessions.popitem(last=False)
+            session._thread = threading.Thread(
+                target=self._sample, args=(session,), name="voiceforge-profiler", daemon=True
+            )
+            session._thread.start()
+        logger.info(
+            f"Profiling {'request ' + trace_id if trace_id else 'all threads'} "
+            f"for up to {session.seconds:g} s every {interval_ms:g} ms"
+        )
+        return session
+
+    def stop(self, session_id: str) -> ProfileSession | None:
+        """Stop a running profile early (a no-op once it has ended)."""
+        session = self.get(session_id)
+        if session is None or not session.running:
+            return session
+        session._stop.set()
+        # Only this session's sampler; a later profile may be running by now
+        thread = session._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        return session
+
+    def shutdown(self) -> None:
+        with self._lock:
+            session = self._current
+        if session is not None:
+            self.stop(session.id)
+
+    def get(self, session_id: str) -> ProfileSession | None:
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def sessions(self) -> list[ProfileSession]:
+        with self._lock:
+            return list(reversed(self._sessions.values()))
+
+    def _sample(self, session: ProfileSession) -> None:
+        own = threading.get_ident()
+        deadline = time.perf_counter() + session.seconds
+        interval = session.interval_ms / 1000
+        reason = "stopped"
+        try:
+            while not session._stop.wait(interval):
+                if time.perf_counter() >= deadline:
+                    reason = "time limit"
+                    break
+                if session.trace_id and self.traces.is_finished(session.trace_id):
+                    reason = "request finished"
+                    break
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stacks = []
+                idle = 0
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    if session.trace_id and (
+                        is_event_loop_thread(ident) or trace_of_thread(ident) != session.trace_id
+                    ):
+                        continue
+                    if _is_idle(frame):
+                        idle += 1
+                        continue
+                    stacks.append(f"{names.get(ident, ident)};{_folded_stack(frame)}")
+                with session._lock:
+                    session.ticks += 1
+                    session.idle_samples += idle
+                    session.samples.update(stacks)
+        finally:
+            with self._lock:
+                session.ended_at = time.time()
+                session.end_reason = reason
+                self._current = None
+            logger.info(f"Profile {session.id} finished ({reason}): {sum(session._snapshot().values())} samples")
+
+
+PROFILER = SamplingProfiler()
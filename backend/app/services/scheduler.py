@@ -0,0 +1,200 @@
+"""
+Generation Scheduler - Admission control, priorities and fair sharing for TTS work
+Sits in front of VoiceClonerService.generate_speech
+
+- A fixed number of generations run at once (one per TTS worker by default).
+- Waiting work is queued by priority class; interactive requests always go
+  before batch (podcast) work.
+- Within a class, clients are served round-robin so one client's burst cannot
+  starve the others.
+- When the queue is full new requests are rejected immediately with
+  SchedulerFull, which the API turns into 429 + Retry-After.
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import AsyncIterator
+
+from app.services.tracing import span
+
+MAX_CONCURRENT_GENERATIONS = int(os.environ.get("VOICEFORGE_MAX_CONCURRENT_GENERATIONS", "0"))
+MAX_QUEUED_GENERATIONS = int(os.environ.get("VOICEFORGE_MAX_QUEUED_GENERATIONS", "32"))
+
+# Recent wait times kept for percentile reporting
+_WAIT_SAMPLES = 512
+
+
+class Priority(IntEnum):
+    """Priority classes; lower values are served first."""
+    INTERACTIVE = 0
+    BATCH = 1
+
+
+class SchedulerFull(Exception):
+    """Raised when the generation queue cannot accept more work."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Generation queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def client_id_for(request) -> str:
+    """Identify the client for fair sharing: X-Client-Id header, else remote address."""
+    client_id = request.headers.get("x-client-id")
+    if client_id:
+        return client_id
+    return request.client.host if request.client else "anonymous"
+
+
+class GenerationScheduler:
+    """Bounded, priority-aware, per-client fair queue of generation slots."""
+
+    def __init__(self, max_concurrent: int = 1, max_queue: int = MAX_QUEUED_GENERATIONS):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max_queue
+        self._running = 0
+        # priority -> client_id -> waiting futures (FIFO per client)
+        self._queues: dict[Priority, OrderedDict[str, deque[asyncio.Future]]] = {
+            p: OrderedDict() for p in Priority
+        }
+        self._queued = 0
+        self._waits: dict[Priority, deque[float]] = {p: deque(maxlen=_WAIT_SAMPLES) for p in Priority}
+        self._avg_service_seconds = 5.0
+        self.completed = 0
+        self.rejected = 0
+
+    # -- admission -----------------------------------------------------------
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait, from queue depth and service time."""
+        backlog = self._queued + self._running
+        return max(1, math.ceil(backlog * self._avg_service_seconds / self.max_concurrent))
+
+    def check_admission(self) -> None:
+        """Raise SchedulerFull if new work would not fit in the queue."""
+        if self._running >= self.max_concurrent and self._queued >= self.max_queue:
+            self.rejected += 1
+            raise SchedulerFull(self.retry_after())
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        priority: Priority = Priority.INTERACTIVE,
+        client_id: str = "anonymous",
+        admit: bool = True
+    ) -> AsyncIterator[None]:
+        """
+        Hold a generation slot for the duration of the block.
+        With admit=False the request was already admitted (e.g. segments of an
+        accepted podcast) and is queued even if the queue is full.
+        """
+        if admit:
+            self.check_admission()
+
+        enqueued_at = time.monotonic()
+        if self._running < self.max_concurrent and self._queued == 0:
+            self._running += 1
+        else:
+            with span("queue_wait", priority=priority.name.lower()):
+                await self._wait_for_turn(priority, client_id)
+        self._waits[priority].append(time.monotonic() - enqueued_at)
+
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started_at
+            self._avg_service_seconds = 0.9 * self._avg_service_seconds + 0.1 * elapsed
+            self.completed += 1
+            self._release()
+
+    async def run(self, coro_factory, priority: Priority = Priority.INTERACTIVE,
+                  client_id: str = "anonymous", admit: bool = True):
+        """Run coro_factory() once a slot is available and return its result."""
+        async with self.slot(priority, client_id, admit):
+            return await coro_factory()
+
+    # -- queue mechanics -----------------------------------------------------
+
+    async def _wait_for_turn(self, priority: Priority, client_id: str) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self._queues[priority].setdefault(client_id, deque()).append(future)
+        self._queued += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed to us just as we were cancelled
+                self._release()
+            else:
+                self._remove(priority, client_id, future)
+            raise
+
+    def _remove(self, priority: Priority, client_id: str, future: asyncio.Future) -> None:
+        waiters = self._queues[priority].get(client_id)
+        if waiters and future in waiters:
+            waiters.remove(future)
+            self._queued -= 1
+            if not waiters:
+                del self._queues[priority][client_id]
+
+    def _release(self) -> None:
+        self._running -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiters: highest priority first, clients round-robin."""
+        while self._running < self.max_concurrent and self._queued > 0:
+            for priority in Priority:
+                clients = self._queues[priority]
+                if clients:
+                    break
+            else:
+                return
+
+            client_id, waiters = next(iter(clients.items()))
+            future = waiters.popleft()
+            self._queued -= 1
+            if waiters:
+                clients.move_to_end(client_id)
+            else:
+                del clients[client_id]
+
+            if future.done():
+                continue
+            self._running += 1
+            future.set_result(None)
+
+    # -- reporting -----------------------------------------------------------
+
+    def stats(self) -> dict:
+        """Queue depth and wait-time statistics."""
+        def wait_stats(samples: deque[float]) -> dict:
+            if not samples:
+                return {"count": 0, "avg_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+            ordered = sorted(samples)
+            return {
+                "count": len(ordered),
+                "avg_ms": round(1000 * sum(ordered) / len(ordered), 1),
+                "p95_ms": round(1000 * ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 1),
+                "max_ms": round(1000 * ordered[-1], 1),
+            }
+
+        return {
+            "running": self._running,
+            "max_concurrent": self.max_concurrent,
+            "queued": self._queued,
+            "max_queue": self.max_queue,
+            "queued_by_priority": {
+                p.name.lower(): sum(len(w) for w in self._queues[p].values()) for p in Priority
+            },
+            "wait_time": {p.name.lower(): wait_stats(self._waits[p]) for p in Priority},
+            "avg_service_seconds": round(self._avg_service_seconds, 3),
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
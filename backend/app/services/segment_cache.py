@@ -0,0 +1,140 @@
+"""
+Segment Cache - Content-addressed on-disk cache of rendered podcast segments
+Re-rendering an edited script only synthesizes the segments that changed
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Disk budget for cached segment audio (bytes)
+SEGMENT_CACHE_BYTES = int(os.environ.get("VOICEFORGE_SEGMENT_CACHE_BYTES", str(2 * 1024 ** 3)))
+
+
+def segment_key(voice_key: str, text: str, params: dict) -> str:
+    """
+    Content address of a rendered segment: sha256 over the voice, the text and
+    everything else that changes the audio (synthesis params, model version).
+    """
+    payload = json.dumps(
+        {"voice": voice_key, "text": text, "params": params},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SegmentCache:
+    """
+    Thread-safe, size-bounded LRU of float32 segment audio stored as .npy files.
+    The index is rebuilt from the directory at startup (least recently used
+    by modification time, which is refreshed on every hit).
+    """
+
+    def __init__(self, directory: str | Path, max_bytes: int = SEGMENT_CACHE_BYTES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load_index()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.npy"
+
+    def _load_index(self) -> None:
+        files = []
+        for path in self.directory.glob("*.npy"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._current_bytes += size
+        with self._lock:
+            self._evict()
+
+    def get(self, key: str) -> np.ndarray | None:
+        """Cached audio for key (marking it recently used), or None."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+
+        path = self._path(key)
+        try:
+            audio = np.load(path, allow_pickle=False)
+            os.utime(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cached segment {key}: {e}")
+            self.invalidate(key)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return audio
+
+    def put(self, key: str, audio: np.ndarray) -> None:
+        """Store audio under key (atomic write), evicting old entries to stay within budget."""
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, audio, allow_pickle=False)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        size = self._path(key).stat().st_size
+        with self._lock:
+            self._current_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            size = self._entries.pop(key, None)
+            if size is not None:
+                self._current_bytes -= size
+        self._path(key).unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        """Drop least recently used files until within budget (lock held)."""
+        while self._current_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._current_bytes -= size
+            self._path(key).unlink(missing_ok=True)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
@@ -0,0 +1,307 @@
+"""
+Tracing - Per-request traces of timed spans, kept in a ring buffer
+Each request carries a trace id (X-Trace-Id); spans opened anywhere while serving it land in its trace
+"""
+
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Finished traces kept for the admin endpoints
+TRACE_BUFFER_SIZE = int(os.environ.get("VOICEFORGE_TRACE_BUFFER", "200"))
+# Spans beyond this are counted but not kept (long podcasts)
+MAX_SPANS_PER_TRACE = 1000
+
+TRACE_HEADER = "x-trace-id"
+# Client-supplied trace ids are used as given when they look like one
+TRACE_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+# Scrapes, health checks and admin calls would only crowd out real requests
+UNTRACED_PATHS = ("/metrics", "/health", "/api/admin")
+
+
+@dataclass
+class Span:
+    id: int
+    parent_id: int | None
+    name: str
+    start: float
+    end: float | None = None
+    thread: str = ""
+    attributes: dict = field(default_factory=dict)
+    error: str | None = None
+
+
+class Trace:
+    """The spans recorded while serving one request (thread-safe; spans arrive from worker threads)."""
+
+    def __init__(self, trace_id: str, method: str, path: str):
+        self.id = trace_id
+        self.method = method
+        self.path = path
+        self.route: str | None = None
+        self.status: int | None = None
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.spans: list[Span] = []
+        self.dropped_spans = 0
+        self._next_span_id = 1
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.end is not None
+
+    def duration_ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def add_span(self, name: str, parent_id: int | None, start: float, attributes: dict) -> Span | None:
+        """Record a span starting at start; None once the trace is finished or full."""
+        with self._lock:
+            if self.finished:
+                return None
+            if len(self.spans) >= MAX_SPANS_PER_TRACE:
+                self.dropped_spans += 1
+                return None
+            span = Span(
+                id=self._next_span_id,
+                parent_id=parent_id,
+                name=name,
+                start=start,
+                thread=threading.current_thread().name,
+                attributes=attributes
+            )
+            self._next_span_id += 1
+            self.spans.append(span)
+            return span
+
+    def finish(self, status: int | None, route: str | None) -> None:
+        with self._lock:
+            self.end = time.perf_counter()
+            self.status = status
+            self.route = route
+
+    def _offset_ms(self, t: float) -> float:
+        return round((t - self.start) * 1000, 3)
+
+    def summary(self) -> dict:
+        return {
+            "trace_id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms(), 3),
+            "finished": self.finished,
+            "spans": len(self.spans),
+        }
+
+    def to_dict(self) -> dict:
+        """The trace with its spans in start order, and total time per span name."""
+        now = time.perf_counter()
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        breakdown: dict[str, float] = defaultdict(float)
+        rendered = []
+        for span in spans:
+            duration = ((span.end or now) - span.start) * 1000
+            breakdown[span.name] += duration
+            rendered.append({
+                "id": span.id,
+                "parent_id": span.parent_id,
+                "name": span.name,
+                "start_ms": self._offset_ms(span.start),
+                "duration_ms": round(duration, 3),
+                "open": span.end is None,
+                "thread": span.thread,
+                "attributes": span.attributes,
+                "error": span.error,
+            })
+        return {
+            **self.summary(),
+            "dropped_spans": self.dropped_spans,
+            "breakdown_ms": {name: round(ms, 3) for name, ms in sorted(breakdown.items(), key=lambda i: -i[1])},
+            "span_list": rendered,
+        }
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("voiceforge_trace", default=None)
+_current_span: ContextVar[int | None] = ContextVar("voiceforge_span", default=None)
+
+# Thread ident -> id of the trace whose span that thread is running, for the profiler
+_thread_traces: dict[int, str] = {}
+# Threads running the event loop (their time interleaves all requests)
+_event_loop_threads: set[int] = set()
+
+
+def trace_of_thread(ident: int) -> str | None:
+    return _thread_traces.get(ident)
+
+
+def is_event_loop_thread(ident: int) -> bool:
+    return ident in _event_loop_threads
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[dict]:
+    """
+    Time the block as a span of the current request's trace, nested under
+    the enclosing span. Yields the span's attributes, which the block may
+    add to. Outside a traced request this does nothing.
+    """
+    trace = _current_trace.get()
+    recorded = trace.add_span(name, _current_span.get(), time.perf_counter(), attributes) if trace else None
+    if recorded is None:
+        yield attributes
+        return
+
+    # Worker threads run one request's work at a time; the loop thread interleaves them
+    ident = threading.get_ident()
+    track_thread = ident not in _event_loop_threads
+    previous_trace = _thread_traces.get(ident)
+    if track_thread:
+        _thread_traces[ident] = trace.id
+    token = _current_span.set(recorded.id)
+    try:
+        yield attributes
+    except BaseException as e:
+        recorded.error = type(e).__name__
+        raise
+    finally:
+        recorded.end = time.perf_counter()
+        _current_span.reset(token)
+        if track_thread and previous_trace is None:
+            _thread_traces.pop(ident, None)
+        elif track_thread:
+            _thread_traces[ident] = previous_trace
+
+
+def record_span(name: str, seconds: float, **attributes) -> None:
+    """Add a span that has just ended after seconds (timed elsewhere, e.g. in a worker process)."""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    end = time.perf_counter()
+    recorded = trace.add_span(name, _current_span.get(), end - seconds, attributes)
+    if recorded is not None:
+        recorded.end = end
+
+
+class TraceStore:
+    """Traces of requests in flight, and the last `capacity` finished ones."""
+
+    def __init__(self, capacity: int = TRACE_BUFFER_SIZE):
+        self.capacity = capacity
+        self._active: dict[str, Trace] = {}
+        self._finished: OrderedDict[str, Trace] = OrderedDict()
+        self._lock = threading.Lock()
+        self.traced = 0
+
+    def start(self, trace: Trace) -> None:
+        with self._lock:
+            self._active[trace.id] = trace
+            self.traced += 1
+
+    def finish(self, trace: Trace) -> None:
+        with self._lock:
+            if self._active.get(trace.id) is trace:
+                del self._active[trace.id]
+            self._finished[trace.id] = trace
+            self._finished.move_to_end(trace.id)
+            while len(self._finished) > self.capacity:
+                self._finished.popitem(last=False)
+
+    def get(self, trace_id: str) -> Trace | None:
+        with self._lock:
+            return self._active.get(trace_id) or self._finished.get(trace_id)
+
+    def is_finished(self, trace_id: str) -> bool:
+        with self._lock:
+            return trace_id in self._finished and trace_id not in self._active
+
+    def active(self) -> list[Trace]:
+        with self._lock:
+            return sorted(self._active.values(), key=lambda t: t.start)
+
+    def recent(self, limit: int = 50, min_duration_ms: float = 0.0, path_prefix: str | None = None) -> list[Trace]:
+        """Finished traces, newest first."""
+        with self._lock:
+            traces = list(reversed(self._finished.values()))
+        matching = [
+            t for t in traces
+            if t.duration_ms() >= min_duration_ms and (not path_prefix or t.path.startswith(path_prefix))
+        ]
+        return matching[:limit]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "buffered": len(self._finished),
+                "active": len(self._active),
+                "traced": self.traced,
+            }
+
+
+TRACES = TraceStore()
+
+
+def _route_template(scope: Scope) -> str | None:
+    """The matched endpoint's path with parameters as placeholders, e.g. /api/voice/models/{model_id}."""
+    if scope.get("route") is None:
+        return None
+    path = scope["path"]
+    for name, value in scope.get("path_params", {}).items():
+        path = path.replace(f"/{value}", f"/{{{name}}}", 1)
+    return path
+
+
+class TracingMiddleware:
+    """
+    Trace every HTTP request (except UNTRACED_PATHS). The trace id is taken
+    from the request's X-Trace-Id header when valid, generated otherwise,
+    and returned in the response's X-Trace-Id header. A trace ends when the
+    response has been sent, so streamed bodies are included.
+    """
+
+    def __init__(self, app: ASGIApp, store: TraceStore = TRACES):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(UNTRACED_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        supplied = Headers(scope=scope).get(TRACE_HEADER)
+        trace_id = supplied if supplied and TRACE_ID_PATTERN.match(supplied) else uuid.uuid4().hex
+        trace = Trace(trace_id, scope["method"], scope["path"])
+        _event_loop_threads.add(threading.get_ident())
+        self.store.start(trace)
+        status = None
+
+        async def send_with_trace_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("X-Trace-Id", trace_id)
+            await send(message)
+
+        token = _current_trace.set(trace)
+        try:
+            await self.app(scope, receive, send_with_trace_id)
+        finally:
+            _current_trace.reset(token)
+            trace.finish(status or 500, _route_template(scope))
+            self.store.finish(trace)
@@ -0,0 +1,249 @@
+"""
+Transcoder - Compressed and alternate-encoding variants of served audio
+Variants are encoded block by block and cached next to their source under a disk budget
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+import soxr
+
+from app.services.http_cache import DIGEST_SUFFIX, discard_digest, record_digest
+
+logger = logging.getLogger(__name__)
+
+# Disk budget for cached transcodes (bytes)
+TRANSCODE_CACHE_BYTES = int(os.environ.get("VOICEFORGE_TRANSCODE_CACHE_BYTES", str(2 * 1024 ** 3)))
+# Frames encoded per block
+TRANSCODE_BLOCK_FRAMES = 1 << 16
+# Marks transcode files, which sit next to their source as <stem>.tc-<format><ext>
+VARIANT_MARKER = ".tc-"
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    """A soundfile container/subtype pair served under one `format` name."""
+    container: str
+    subtype: str
+    extension: str
+    media_type: str
+    # Sample rates the codec accepts (None: any); others are resampled to the last
+    sample_rates: tuple[int, ...] | None = None
+
+
+# format query values; "wav" serves the stored file as is
+AUDIO_FORMATS = {
+    "wav": None,
+    "wav_int16": AudioFormat("WAV", "PCM_16", ".wav", "audio/wav"),
+    "wav_float32": AudioFormat("WAV", "FLOAT", ".wav", "audio/wav"),
+    "flac": AudioFormat("FLAC", "PCM_16", ".flac", "audio/flac"),
+    "mp3": AudioFormat("MP3", "MPEG_LAYER_III", ".mp3", "audio/mpeg"),
+    "opus": AudioFormat("OGG", "OPUS", ".opus", "audio/ogg; codecs=opus", (8000, 12000, 16000, 24000, 48000)),
+}
+FORMAT_PATTERN = f"^({'|'.join(AUDIO_FORMATS)})$"
+
+
+@dataclass
+class AudioVariant:
+    """The file to serve for a source in a requested format."""
+    path: Path
+    media_type: str
+    extension: str
+
+
+def transcode(source: Path, destination: Path, audio_format: AudioFormat) -> None:
+    """
+    Encode source into destination block by block (atomic: written to
+    .partial, then renamed) and record its content digest.
+    """
+    partial = destination.with_name(destination.name + ".partial")
+    try:
+        with sf.SoundFile(source) as src:
+            sample_rate = src.samplerate
+            resampler = None
+            if audio_format.sample_rates and sample_rate not in audio_format.sample_rates:
+                sample_rate = audio_format.sample_rates[-1]
+                resampler = soxr.ResampleStream(src.samplerate, sample_rate, src.channels, dtype="float32")
+
+            with sf.SoundFile(
+                partial, "w",
+                samplerate=sample_rate,
+                channels=src.channels,
+                format=audio_format.container,
+                subtype=audio_format.subtype
+            ) as dst:
+                while True:
+                    block = src.read(TRANSCODE_BLOCK_FRAMES, dtype="float32", always_2d=True)
+                    last = len(block) < TRANSCODE_BLOCK_FRAMES
+                    if resampler is not None:
+                        block = resampler.resample_chunk(block, last=last)
+                    if len(block):
+                        # Float sources may exceed full scale; integer codecs would wrap
+                        dst.write(np.clip(block, -1.0, 1.0))
+                    if last:
+                        break
+        os.replace(partial, destination)
+        record_digest(destination)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+
+
+class TranscodeCache:
+    """
+    Thread-safe LRU of transcoded variants stored next to their sources.
+    The index is rebuilt at startup by scanning the given roots (least
+    recently used by access time, refreshed on every hit). A variant
+    older than its source is stale and re-encoded. Concurrent requests for
+    the same missing variant share one encode.
+    """
+
+    def __init__(self, roots: list[str | Path], max_bytes: int = TRANSCODE_CACHE_BYTES):
+        self.roots = [Path(root) for root in roots]
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Path, int] = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self._in_flight: dict[Path, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load_index()
+
+    def _load_index(self) -> None:
+        files = []
+        for root in self.roots:
+            if not root.exists():
+                continue
+            for path in root.rglob(f"*{VARIANT_MARKER}*"):
+                if path.name.endswith(".partial"):
+                    path.unlink(missing_ok=True)
+                    continue
+                if path.name.endswith(DIGEST_SUFFIX):
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_atime, path, stat.st_size))
+        with self._lock:
+            for _, path, size in sorted(files, key=lambda f: f[0]):
+                self._entries[path] = size
+                self._current_bytes += size
+            self._evict()
+
+    @staticmethod
+    def variant_path(source: Path, name: str, audio_format: AudioFormat) -> Path:
+        return source.with_name(f"{source.stem}{VARIANT_MARKER}{name}{audio_format.extension}")
+
+    async def variant(self, source: str | Path, name: str) -> AudioVariant:
+        """
+        The file to serve for source in format name (a key of AUDIO_FORMATS),
+        encoding and caching it on first use. Raises FileNotFoundError when
+        the source does not exist.
+        """
+        source = Path(source)
+        audio_format = AUDIO_FORMATS[name]
+        if audio_format is None:
+            if not source.exists():
+                raise FileNotFoundError(str(source))
+            return AudioVariant(source, "audio/wav", source.suffix)
+
+        path = self.variant_path(source, name, audio_format)
+        if self._fresh(source, path):
+            with self._lock:
+                self.hits += 1
+                if path in self._entries:
+                    self._entries.move_to_end(path)
+            try:
+                # Recency lives in atime: mtime is the variant's Last-Modified and digest key
+                os.utime(path, ns=(time.time_ns(), path.stat().st_mtime_ns))
+            except OSError:
+                pass
+        else:
+            task = self._in_flight.get(path)
+            if task is None:
+                with self._lock:
+                    self.misses += 1
+                task = asyncio.create_task(self._encode(source, path, audio_format))
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                self._in_flight[path] = task
+            await asyncio.shield(task)
+        return AudioVariant(path, audio_format.media_type, audio_format.extension)
+
+    @staticmethod
+    def _fresh(source: Path, path: Path) -> bool:
+        """Whether the variant exists and is not older than its source (which must exist)."""
+        source_mtime = source.stat().st_mtime_ns
+        try:
+            return path.stat().st_mtime_ns >= source_mtime
+        except FileNotFoundError:
+            return False
+
+    async def _encode(self, source: Path, path: Path, audio_format: AudioFormat) -> None:
+        try:
+            logger.info(f"Transcoding {source} to {path.name}")
+            await asyncio.to_thread(transcode, source, path, audio_format)
+            if not source.exists():
+                # Source deleted while encoding (see discard)
+                path.unlink(missing_ok=True)
+                discard_digest(path)
+                return
+            size = path.stat().st_size
+            with self._lock:
+                self._current_bytes += size - self._entries.pop(path, 0)
+                self._entries[path] = size
+                self._evict(keep=path)
+        finally:
+            self._in_flight.pop(path, None)
+
+    def discard(self, source: str | Path) -> int:
+        """Delete every cached variant of a deleted source; returns how many were removed."""
+        source = Path(source)
+        prefix = f"{source.stem}{VARIANT_MARKER}"
+        variants = [
+            path for path in source.parent.glob(f"{prefix}*")
+            # An encode in progress cleans up after itself once it sees the source gone
+            if not path.name.endswith((DIGEST_SUFFIX, ".partial"))
+        ]
+        with self._lock:
+            for path in variants:
+                self._current_bytes -= self._entries.pop(path, 0)
+        for path in variants:
+            path.unlink(missing_ok=True)
+            discard_digest(path)
+        return len(variants)
+
+    def _evict(self, keep: Path | None = None) -> None:
+        """Delete least recently used variants until within budget (lock held)."""
+        for path in list(self._entries):
+            if self._current_bytes <= self.max_bytes:
+                break
+            if path == keep or path in self._in_flight:
+                continue
+            self._current_bytes -= self._entries.pop(path)
+            path.unlink(missing_ok=True)
+            discard_digest(path)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "in_flight": len(self._in_flight),
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
@@ -0,0 +1,173 @@
+"""
+TTS Worker Pool - Pocket-TTS synthesis across multiple processes
+Each worker process holds its own TTSModel so generation scales with cores
+
+Generated audio is handed back through shared memory: the worker writes the
+samples into a SharedMemory block and returns only its name and length, the
+API process copies them out and unlinks the block.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Any
+
+import numpy as np
+import torch
+
+from app.services.metrics import STAGE_SECONDS
+from app.services.voice_cache import VoiceStateCache
+from app.services.voice_state import VoiceStatePool, load_or_encode_voice_state
+
+logger = logging.getLogger(__name__)
+
+# Number of TTS worker processes; 0 keeps synthesis in the API process
+TTS_WORKERS = int(os.environ.get("VOICEFORGE_TTS_WORKERS", "0"))
+# Torch intra-op threads per worker; 0 splits the machine's cores evenly
+TTS_THREADS_PER_WORKER = int(os.environ.get("VOICEFORGE_TTS_THREADS_PER_WORKER", "0"))
+# Voice-state cache budget inside each worker (bytes)
+WORKER_VOICE_CACHE_BYTES = 256 * 1024 * 1024
+
+
+@dataclass
+class VoiceRef:
+    """
+    Picklable description of a voice that any process can resolve to a state.
+    kind is "model", "default" or "audio"; name is the model id, built-in voice
+    name, or the one-shot audio path. The resolved in-process state rides along
+    in `state` but is never sent to worker processes.
+    """
+    kind: str
+    name: str
+    prompt: str  # Audio prompt encoded when no valid persisted state exists
+    state_path: str | None = None  # Persisted voice_state.pt, if any
+    version: str = ""  # Changes when the source changes (e.g. one-shot audio mtime)
+    state: Any = field(default=None, repr=False, compare=False)
+
+    @property
+    def key(self) -> str:
+        return f"{self.kind}:{self.name}:{self.version}"
+
+    def __getstate__(self) -> dict:
+        data = self.__dict__.copy()
+        data["state"] = None
+        return data
+
+
+class _WorkerContext:
+    """Per-process model and voice caches, created by the pool initializer."""
+
+    def __init__(self, model_variant: str):
+        from pocket_tts import TTSModel
+
+        self.model_variant = model_variant
+        self.tts_model = TTSModel.load_model(model_variant)
+        self.voice_cache = VoiceStateCache(max_bytes=WORKER_VOICE_CACHE_BYTES)
+        self.state_pool = VoiceStatePool(max_idle=1)
+
+
+_worker: _WorkerContext | None = None
+
+
+def _init_worker(model_variant: str, threads: int) -> None:
+    global _worker
+    torch.set_num_threads(threads)
+    _worker = _WorkerContext(model_variant)
+    logger.info(f"TTS worker {os.getpid()} ready ({threads} threads)")
+
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+
+def _synthesize_in_worker(voice: VoiceRef, text: str) -> tuple[str, int, float]:
+    """
+    Generate audio in a worker; returns (shared memory name, sample count,
+    generate_audio seconds). The timing is reported back because metrics
+    recorded in a worker process are not exported.
+    """
+    voice_state = _worker.voice_cache.get_or_load(
+        voice.key,
+        lambda: load_or_encode_voice_state(
+            _worker.tts_model, voice.prompt, voice.state_path, _worker.model_variant
+        )
+    )
+    start = time.perf_counter()
+    with _worker.state_pool.lease(voice_state) as snapshot:
+        audio = _worker.tts_model.generate_audio(snapshot, text)
+    elapsed = time.perf_counter() - start
+
+    samples = audio.numpy().astype(np.float32, copy=False).reshape(-1)
+    shm = shared_memory.SharedMemory(create=True, size=max(samples.nbytes, 1))
+    try:
+        np.ndarray(samples.shape, dtype=np.float32, buffer=shm.buf)[:] = samples
+        return shm.name, len(samples), elapsed
+    finally:
+        # The API process owns the block from here on and unlinks it
+        shm.close()
+
+
+def _take_shared_audio(name: str, length: int) -> np.ndarray:
+    """Copy audio out of a worker's shared memory block and release it."""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return np.ndarray((length,), dtype=np.float32, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _discard_shared_audio(future: Future) -> None:
+    """Done-callback for a synthesis nobody is waiting for: release its block."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    name, _, _ = future.result()
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+class TTSWorkerPool:
+    """Pool of worker processes, each with its own Pocket-TTS model."""
+
+    def __init__(self, num_workers: int, model_variant: str, threads_per_worker: int = 0):
+        self.num_workers = num_workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // num_workers)
+        self._executor = ProcessPoolExecutor(
+            max_workers=num_workers,
+            # spawn: torch and forked thread pools do not mix
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_variant, self.threads_per_worker),
+        )
+
+    def start(self) -> None:
+        """Spawn every worker and wait until each has loaded its model."""
+        futures = [self._executor.submit(_worker_ready) for _ in range(self.num_workers)]
+        pids = {f.result() for f in futures}
+        logger.info(
+            f"TTS worker pool ready: {len(pids)} processes x {self.threads_per_worker} threads"
+        )
+
+    async def synthesize(self, voice: VoiceRef, text: str) -> np.ndarray:
+        """Generate audio for text on the next free worker."""
+        future = self._executor.submit(_synthesize_in_worker, voice, text)
+        try:
+            name, length, seconds = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # The worker may still finish (or already has); its block would leak
+            future.add_done_callback(_discard_shared_audio)
+            raise
+        STAGE_SECONDS.observe(seconds, stage="generate_audio")
+        return _take_shared_audio(name, length)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,194 @@
+"""
+Upload Spool - Streams multipart uploads straight to disk
+Uploads are never held in memory and are rejected as early as possible
+"""
+
+import os
+
+import aiofiles
+from fastapi import Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+# Largest accepted upload (bytes)
+MAX_UPLOAD_BYTES = int(os.environ.get("VOICEFORGE_MAX_UPLOAD_BYTES", str(512 * 1024 ** 2)))
+# Spooled data is written in chunks of this size
+UPLOAD_CHUNK_BYTES = 1024 ** 2
+# Allowance for multipart boundaries and part headers in Content-Length
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+# Bytes needed to recognise every supported container
+SNIFF_BYTES = 12
+
+
+class UploadTooLarge(ValueError):
+    """The upload exceeds MAX_UPLOAD_BYTES."""
+
+
+class UnsupportedUpload(ValueError):
+    """The upload is not an audio file of the format its extension claims."""
+
+
+def sniff_audio_format(header: bytes) -> str | None:
+    """Container format from the first bytes of a file, as a file extension."""
+    if header[:4] in (b"RIFF", b"RF64") and header[8:12] == b"WAVE":
+        return ".wav"
+    if header[:4] == b"fLaC":
+        return ".flac"
+    if header[:4] == b"OggS":
+        return ".ogg"
+    if header[:4] == b"\x1a\x45\xdf\xa3":
+        return ".webm"
+    if header[4:8] == b"ftyp":
+        return ".m4a"
+    if header[:3] == b"ID3" or (len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0):
+        return ".mp3"
+    return None
+
+
+class _FilePart:
+    """Receives the file part of a multipart body from the parser callbacks."""
+
+    def __init__(self, field_name: str, allowed_extensions: set[str]):
+        self.field_name = field_name
+        self.allowed_extensions = allowed_extensions
+        self.filename: str | None = None
+        self.extension: str | None = None
+        self.size = 0
+        self.header = b""
+        # Data received since the last flush to disk
+        self.pending: list[bytes] = []
+        self.pending_bytes = 0
+        self.error: ValueError | None = None
+
+        self._in_file = False
+        self._header_field = b""
+        self._header_value = b""
+        self._headers: dict[bytes, bytes] = {}
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": lambda data, start, end: self._append("_header_field", data[start:end]),
+            "on_header_value": lambda data, start, end: self._append("_header_value", data[start:end]),
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        }
+
+    def _append(self, attr: str, data: bytes) -> None:
+        setattr(self, attr, getattr(self, attr) + data)
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if options.get(b"name", b"").decode("latin-1") != self.field_name or b"filename" not in options:
+            return
+        if self.filename is not None:
+            self._reject(UnsupportedUpload("Only one file may be uploaded"))
+            return
+
+        self.filename = options[b"filename"].decode("utf-8", errors="replace")
+        self.extension = os.path.splitext(self.filename)[1].lower()
+        if self.extension not in self.allowed_extensions:
+            self._reject(UnsupportedUpload(
+                f"Unsupported file format. Allowed: {', '.join(sorted(self.allowed_extensions))}"
+            ))
+            return
+        self._in_file = True
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if not self._in_file or self.error is not None:
+            return
+        chunk = data[start:end]
+        self.size += len(chunk)
+        if self.size > MAX_UPLOAD_BYTES:
+            self._reject(UploadTooLarge(f"File too large. Maximum size is {MAX_UPLOAD_BYTES / 1024 ** 2:g} MB"))
+            return
+
+        if len(self.header) < SNIFF_BYTES:
+            self.header += chunk[:SNIFF_BYTES - len(self.header)]
+            if len(self.header) >= SNIFF_BYTES:
+                self._check_format()
+        self.pending.append(chunk)
+        self.pending_bytes += len(chunk)
+
+    def _on_part_end(self) -> None:
+        if self._in_file and self.error is None and len(self.header) < SNIFF_BYTES:
+            # Very short file: sniff what there is
+            self._check_format()
+        self._in_file = False
+
+    def _check_format(self) -> None:
+        detected = sniff_audio_format(self.header)
+        if detected != self.extension:
+            self._reject(UnsupportedUpload(f"File content is not valid {self.extension.lstrip('.')} audio"))
+
+    def _reject(self, error: ValueError) -> None:
+        self.error = self.error or error
+        self._in_file = False
+        self.pending.clear()
+        self.pending_bytes = 0
+
+    def take_pending(self) -> bytes:
+        data = b"".join(self.pending)
+        self.pending.clear()
+        self.pending_bytes = 0
+        return data
+
+
+async def spool_upload(
+    request: Request,
+    destination: str,
+    allowed_extensions: set[str],
+    field_name: str = "file"
+) -> tuple[str, str, int]:
+    """
+    Stream the multipart file field of request into destination in
+    UPLOAD_CHUNK_BYTES chunks, returning (filename, extension, size).
+
+    Raises UploadTooLarge when the declared Content-Length or the received
+    data exceed MAX_UPLOAD_BYTES, and UnsupportedUpload (or ValueError for a
+    malformed request) when the extension or the file's leading bytes do not
+    identify a supported audio format. Both are detected as soon as the
+    relevant bytes arrive; the rest of the body is not read. Nothing is left
+    at destination on failure.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        if int(content_length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+            raise UploadTooLarge(f"File too large. Maximum size is {MAX_UPLOAD_BYTES / 1024 ** 2:g} MB")
+
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise ValueError("Expected a multipart/form-data upload")
+
+    part = _FilePart(field_name, allowed_extensions)
+    parser = MultipartParser(options[b"boundary"], part.callbacks())
+    try:
+        async with aiofiles.open(destination, "wb") as f:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                if part.error is not None:
+                    raise part.error
+                if part.pending_bytes >= UPLOAD_CHUNK_BYTES:
+                    await f.write(part.take_pending())
+            parser.finalize()
+            if part.error is not None:
+                raise part.error
+            await f.write(part.take_pending())
+    except BaseException:
+        if os.path.exists(destination):
+            os.remove(destination)
+        raise
+
+    if part.filename is None:
+        os.remove(destination)
+        raise ValueError(f"Missing '{field_name}' file field")
+    return part.filename, part.extension, part.size
@@ -0,0 +1,139 @@
+"""
+Voice State Cache - Bounded in-memory LRU of Pocket-TTS voice states
+Avoids re-encoding the reference audio on every generation request
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+import torch
+
+
+# Default budget for resident voice states (bytes)
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GiB
+
+
+def state_nbytes(state: Any) -> int:
+    """Approximate memory held by a (nested) voice state in bytes."""
+    if isinstance(state, torch.Tensor):
+        return state.element_size() * state.nelement()
+    if isinstance(state, dict):
+        return sum(state_nbytes(v) for v in state.values())
+    if isinstance(state, (list, tuple)):
+        return sum(state_nbytes(v) for v in state)
+    return 0
+
+
+class VoiceStateCache:
+    """
+    Thread-safe LRU cache of voice states keyed by voice model id.
+    Entries are evicted least-recently-used first once the byte budget is exceeded.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Per-key locks so concurrent misses for the same voice encode only once
+        self._key_locks: dict[str, threading.Lock] = {}
+        self._current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached state for key (marking it recently used), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, state: Any) -> None:
+        """Insert or replace a state, evicting old entries to stay within budget."""
+        size = state_nbytes(state)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._current_bytes -= old[1]
+
+            if size > self.max_bytes:
+                # Larger than the whole budget: never resident
+                return
+
+            self._entries[key] = (state, size)
+            self._current_bytes += size
+
+            while self._current_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._current_bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        Return the cached state for key, calling loader() on a miss.
+        Concurrent callers missing on the same key wait for a single load.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another thread may have loaded it while we waited
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self.misses += 1
+
+            state = loader()
+            self.put(key, state)
+
+        with self._lock:
+            if self._key_locks.get(key) is key_lock and not key_lock.locked():
+                del self._key_locks[key]
+
+        return state
+
+    def invalidate(self, key: str) -> bool:
+        """Drop a cached state. Returns True if an entry was removed."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False
+            self._current_bytes -= entry[1]
+            return True
+
+    def clear(self) -> None:
+        """Drop all cached states."""
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def stats(self) -> dict:
+        """Snapshot of cache counters for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
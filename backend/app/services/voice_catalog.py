@@ -0,0 +1,205 @@
+"""
+Voice Catalog - SQLite index of saved voice models
+Lists pages of voices by recency, tag and name without reading every metadata.json
+"""
+
+import base64
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS voices (
+    id TEXT PRIMARY KEY,
+    name_lower TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    metadata_mtime_ns INTEGER NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS voices_recent ON voices (created_at DESC, id DESC);
+CREATE TABLE IF NOT EXISTS voice_tags (
+    tag TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    voice_id TEXT NOT NULL REFERENCES voices (id) ON DELETE CASCADE,
+    PRIMARY KEY (tag, created_at, voice_id)
+);
+CREATE INDEX IF NOT EXISTS voice_tags_voice ON voice_tags (voice_id);
+"""
+# Trigram full-text index over names, so substring filters don't scan every voice
+NAME_INDEX_SCHEMA = """
+CREATE VIRTUAL TABLE voice_names USING fts5(voice_id UNINDEXED, name_lower, tokenize='trigram')
+"""
+# Trigrams can't match shorter text; those filters scan name_lower instead
+NAME_INDEX_MIN_CHARS = 3
+
+
+def encode_cursor(created_at: str, voice_id: str) -> str:
+    """Opaque position after the given voice in newest-first order."""
+    return base64.urlsafe_b64encode(json.dumps([created_at, voice_id]).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        created_at, voice_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(created_at, str) or not isinstance(voice_id, str):
+        raise ValueError("Invalid cursor")
+    return created_at, voice_id
+
+
+class VoiceCatalog:
+    """
+    Persistent index of voice model metadata, newest first.
+    The voice_models/<id>/metadata.json files remain the source of truth:
+    the index is reconciled with them at startup (new, changed and removed
+    models) and updated by every save and delete afterwards.
+    Pages are keyset-paginated, so listing costs O(page size). Name filters
+    use an FTS5 trigram index when this SQLite build has one.
+    """
+
+    def __init__(self, voice_models_dir: str | Path, db_path: str | Path | None = None):
+        self.voice_models_dir = Path(voice_models_dir)
+        self.db_path = Path(db_path) if db_path else self.voice_models_dir / "catalog.sqlite3"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(SCHEMA)
+        self._name_index = self._create_name_index()
+        self.reconcile()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _create_name_index(self) -> bool:
+        """Create (and fill, for catalogs built before it existed) the name index; False if unsupported."""
+        exists = self._db.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'voice_names'"
+        ).fetchone()
+        if exists:
+            return True
+        try:
+            with self._db:
+                self._db.execute(NAME_INDEX_SCHEMA)
+                self._db.execute("INSERT INTO voice_names (voice_id, name_lower) SELECT id, name_lower FROM voices")
+        except sqlite3.OperationalError as e:
+            # FTS5 or the trigram tokenizer (SQLite 3.34+) missing
+            logger.warning(f"Voice name index unavailable, name filters will scan: {e}")
+            return False
+        return True
+
+    def reconcile(self) -> None:
+        """Bring the index in line with the model directories on disk."""
+        with self._lock:
+            indexed = dict(self._db.execute("SELECT id, metadata_mtime_ns FROM voices"))
+
+        on_disk = set()
+        added = 0
+        for model_dir in self.voice_models_dir.iterdir():
+            metadata_path = model_dir / "metadata.json"
+            try:
+                mtime_ns = metadata_path.stat().st_mtime_ns
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            on_disk.add(model_dir.name)
+            if indexed.get(model_dir.name) == mtime_ns:
+                continue
+            try:
+                with open(metadata_path) as f:
+                    metadata = json.load(f)
+            except Exception as e:
+                logger.warning(f"Error reading metadata for {model_dir}: {e}")
+                continue
+            self.upsert(metadata, mtime_ns)
+            added += 1
+
+        removed = [voice_id for voice_id in indexed if voice_id not in on_disk]
+        for voice_id in removed:
+            self.remove(voice_id)
+        logger.info(f"Voice catalog: {len(on_disk)} models ({added} indexed, {len(removed)} removed)")
+
+    def upsert(self, metadata: dict, metadata_mtime_ns: int | None = None) -> None:
+        """Add or replace a model's entry from its metadata."""
+        voice_id = metadata["id"]
+        if metadata_mtime_ns is None:
+            metadata_mtime_ns = (self.voice_models_dir / voice_id / "metadata.json").stat().st_mtime_ns
+        created_at = metadata.get("created_at", "")
+        name_lower = metadata.get("name", "").lower()
+        tags = set(metadata.get("tags") or [])
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM voices WHERE id = ?", (voice_id,))
+            self._db.execute(
+                "INSERT INTO voices (id, name_lower, created_at, metadata_mtime_ns, metadata) VALUES (?, ?, ?, ?, ?)",
+                (voice_id, name_lower, created_at, metadata_mtime_ns, json.dumps(metadata))
+            )
+            if self._name_index:
+                self._db.execute("DELETE FROM voice_names WHERE voice_id = ?", (voice_id,))
+                self._db.execute("INSERT INTO voice_names (voice_id, name_lower) VALUES (?, ?)", (voice_id, name_lower))
+            self._db.executemany(
+                "INSERT INTO voice_tags (tag, created_at, voice_id) VALUES (?, ?, ?)",
+                [(tag, created_at, voice_id) for tag in tags]
+            )
+
+    def remove(self, voice_id: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM voices WHERE id = ?", (voice_id,))
+            if self._name_index:
+                self._db.execute("DELETE FROM voice_names WHERE voice_id = ?", (voice_id,))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM voices").fetchone()[0]
+
+    def list_models(
+        self,
+        limit: int | None = None,
+        cursor: str | None = None,
+        tag: str | None = None,
+        name: str | None = None
+    ) -> tuple[list[dict], str | None]:
+        """
+        One page of model metadata, newest first, and the cursor of the next
+        page (None on the last page). tag matches exactly; name matches a
+        case-insensitive substring. Without a limit every match is returned.
+        Raises ValueError for a malformed cursor.
+        """
+        if tag is not None:
+            query = "SELECT v.created_at, v.id, v.metadata FROM voice_tags t JOIN voices v ON v.id = t.voice_id WHERE t.tag = ?"
+            columns = ("t.created_at", "t.voice_id")
+            params: list = [tag]
+        else:
+            query = "SELECT v.created_at, v.id, v.metadata FROM voices v WHERE 1"
+            columns = ("v.created_at", "v.id")
+            params = []
+
+        if name and self._name_index and len(name) >= NAME_INDEX_MIN_CHARS:
+            # A quoted phrase of trigrams matches the name as a substring
+            query += " AND v.id IN (SELECT voice_id FROM voice_names WHERE name_lower MATCH ?)"
+            params.append('"' + name.lower().replace('"', '""') + '"')
+        elif name:
+            escaped = name.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            query += " AND v.name_lower LIKE ? ESCAPE '\\'"
+            params.append(f"%{escaped}%")
+        if cursor:
+            query += f" AND ({columns[0]}, {columns[1]}) < (?, ?)"
+            params.extend(decode_cursor(cursor))
+        query += f" ORDER BY {columns[0]} DESC, {columns[1]} DESC"
+        if limit is not None:
+            # One extra row tells whether another page follows
+            query += " LIMIT ?"
+            params.append(limit + 1)
+
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][0], rows[-1][1])
+        return [json.loads(row[2]) for row in rows], next_cursor
@@ -10,7 +10,9 @@ import json
 import uuid
 import os
 import asyncio
-import copy
+import threading
+import time
+from contextlib import nullcontext
 from pathlib import Path
 from datetime import datetime
 import soundfile as sf
@@ -19,38 +21,153 @@ import scipy.io.wavfile
 
 from pocket_tts import TTSModel
 
-
-import librosa
+from app.services.audio_buffer import AudioAccumulator, CrossfadeStream
+from app.services.batcher import MicroBatcher, supports_batched_generation, BATCH_WINDOW_MS, MAX_BATCH_SIZE
+from app.services.effects import apply_effects, EFFECTS_VERSION
+from app.services.http_cache import record_digest
+from app.services.metrics import IN_FLIGHT, STAGE_SECONDS, record_real_time_factor, timed_load
+from app.services.output_cache import OutputCache, output_key
+from app.services.scheduler import GenerationScheduler, Priority
+from app.services.text_processor import TextProcessor, MAX_CHARS_PER_CHUNK
+from app.services.tracing import span
+from app.services.voice_cache import VoiceStateCache
+from app.services.voice_catalog import VoiceCatalog
+from app.services.tts_workers import TTSWorkerPool, VoiceRef, TTS_WORKERS, TTS_THREADS_PER_WORKER
+from app.services.voice_state import (
+    load_or_encode_voice_state, load_voice_state, save_voice_state, pocket_tts_version, VoiceStatePool
+)
 
 class VoiceClonerService:
     """Voice cloning service using Pocket-TTS."""
     
-    def __init__(self, voice_models_dir: str = "voice_models"):
+    # Pocket-TTS config variant; persisted voice states are only valid for this variant
+    MODEL_VARIANT = "b6369a24"
+    
+    # Built-in voices usable without cloning, by name -> Pocket-TTS audio prompt
+    DEFAULT_VOICES = {
+        "alba": "hf://kyutai/tts-voices/alba-mackenna/casual.wav",
+        "marius": "marius",
+        "javert": "javert",
+        "jean": "jean",
+        "fantine": "fantine",
+        "cosette": "cosette",
+        "eponine": "eponine",
+        "azelma": "azelma",
+    }
+    DEFAULT_VOICE = "alba"
+    
+    # Crossfade applied where consecutive text chunks are joined
+    CHUNK_CROSSFADE_MS = 10
+    
+    def __init__(self, voice_models_dir: str = "voice_models", num_workers: int = TTS_WORKERS):
         self.voice_models_dir = Path(voice_models_dir)
         self.voice_models_dir.mkdir(parents=True, exist_ok=True)
+        # Index of saved models for listing, reconciled with the directory now
+        self.catalog = VoiceCatalog(self.voice_models_dir)
         
         # Initialize Pocket-TTS from HuggingFace
         print("Loading Pocket-TTS model...")
         # Using the variant we found in config
-        self.tts_model = TTSModel.load_model("b6369a24") 
+        with timed_load("pocket_tts"):
+            self.tts_model = TTSModel.load_model(self.MODEL_VARIANT)
         print(f"Pocket-TTS loaded! Sample rate: {self.tts_model.sample_rate}")
 
+        # Encoded voice states kept resident, keyed by voice model id
+        self.voice_cache = VoiceStateCache()
+        # Reusable working copies of voice states for generation
+        self.state_pool = VoiceStatePool()
+        # Generated outputs by request content, so identical requests reuse one file
+        self.output_cache = OutputCache(Path("uploads") / "output_cache")
+        
+        # Built-in voices are encoded once and never evicted
+        self.default_voices_dir = self.voice_models_dir / ".defaults"
+        self.default_voices_dir.mkdir(parents=True, exist_ok=True)
+        self._default_voice_states: dict = {}
+        self._default_voices_lock = threading.Lock()
+        with timed_load("default_voices"):
+            self.preload_default_voices()
+        
+        # Background encodings of uploaded audio, by absolute audio path
+        self._precompute_tasks: dict[str, asyncio.Task] = {}
+        self._precompute_encoding: set[str] = set()  # Past the queue, encoding now
+        self._precompute_failed: set[str] = set()
+        
+        # Optional pool of worker processes with their own models for synthesis.
+        # The in-process model is still used for voice encoding (cloning).
+        self.worker_pool = None
+        if num_workers > 0:
+            print(f"Starting {num_workers} TTS worker processes...")
+            self.worker_pool = TTSWorkerPool(num_workers, self.MODEL_VARIANT, TTS_THREADS_PER_WORKER)
+            with timed_load("tts_workers"):
+                self.worker_pool.start()
+        
+        # Optional micro-batching of concurrent in-process generations
+        self.batcher = None
+        if BATCH_WINDOW_MS > 0 and not self.worker_pool:
+            if supports_batched_generation(self.tts_model):
+                self.batcher = MicroBatcher(self.tts_model, self._synthesize, BATCH_WINDOW_MS, MAX_BATCH_SIZE)
+                print(f"Micro-batching enabled: {BATCH_WINDOW_MS} ms window, up to {MAX_BATCH_SIZE} requests")
+            else:
+                print("This Pocket-TTS build cannot batch generations; micro-batching disabled")
     
-    def _apply_effects(self, audio: np.ndarray, sr: int, speed: float, pitch: float) -> np.ndarray:
-        """Apply speed and pitch effects using librosa."""
-        y = audio.astype(np.float32)
+    def shutdown(self) -> None:
+        """Stop worker processes, if any."""
+        if self.worker_pool:
+            self.worker_pool.shutdown()
+    
+    def preload_default_voices(self) -> None:
+        """Encode (or load from disk) every built-in voice so requests only pay for synthesis."""
+        for name in self.DEFAULT_VOICES:
+            try:
+                self.get_default_voice_state(name)
+            except Exception as e:
+                # Keep starting up; the voice is retried on first use
+                print(f"Could not preload default voice '{name}': {e}")
+        print(f"Default voices ready: {sorted(self._default_voice_states)}")
+    
+    def get_default_voice_state(self, name: str | None = None):
+        """Get the resident voice state of a built-in voice, encoding it on first use."""
+        name = name or self.DEFAULT_VOICE
+        if name not in self.DEFAULT_VOICES:
+            raise ValueError(
+                f"Unknown default voice '{name}'. Available: {', '.join(self.DEFAULT_VOICES)}"
+            )
         
-        # Apply pitch shift (semitones)
-        if pitch != 0:
-            # Shift pitch without changing speed
-            y = librosa.effects.pitch_shift(y, sr=sr, n_steps=pitch)
-
-        # Apply time stretch (speed)
-        if speed != 1.0 and speed > 0:
-            # Stretch time without changing pitch
-            y = librosa.effects.time_stretch(y, rate=speed)
+        voice_state = self._default_voice_states.get(name)
+        if voice_state is not None:
+            return voice_state
+        
+        with self._default_voices_lock:
+            voice_state = self._default_voice_states.get(name)
+            if voice_state is not None:
+                return voice_state
+            
+            print(f"Loading default voice '{name}'...")
+            voice_state = load_or_encode_voice_state(
+                self.tts_model,
+                self.DEFAULT_VOICES[name],
+                self.default_voices_dir / f"{name}.pt",
+                self.MODEL_VARIANT
+            )
             
-        return y
+            self._default_voice_states[name] = voice_state
+            return voice_state
+    
+    def list_default_voices(self) -> list[dict]:
+        """List built-in voices and whether each is already resident."""
+        return [
+            {
+                "name": name,
+                "is_default": name == self.DEFAULT_VOICE,
+                "loaded": name in self._default_voice_states
+            }
+            for name in self.DEFAULT_VOICES
+        ]
+    
+    def _apply_effects(self, audio: np.ndarray, sr: int, speed: float, pitch: float) -> np.ndarray:
+        """Apply speed and pitch effects (single phase-vocoder pass, see effects.py)."""
+        with STAGE_SECONDS.time(stage="effects"):
+            return apply_effects(audio, speed=speed, pitch=pitch)
     
     async def save_voice_model(
         self,
@@ -76,16 +193,33 @@ class VoiceClonerService:
             print(f"Error reading audio file: {e}")
             raise ValueError(f"Invalid audio file: {e}")
         
-        # Create voice state using Pocket-TTS (Heavy CPU op)
-        print(f"Creating voice state for {model_id} from {audio_path}...")
+        # Reuse the state encoded at upload time, if any
+        await self.wait_for_voice_state(audio_path)
         voice_state = await asyncio.to_thread(
-            self.tts_model.get_state_for_audio_prompt, 
-            audio_path
+            load_voice_state,
+            self.precomputed_state_path(audio_path),
+            self.MODEL_VARIANT
         )
-        print(f"Voice state created for {model_id}")
+        if voice_state is not None:
+            print(f"Using precomputed voice state for {model_id}")
+        else:
+            # Create voice state using Pocket-TTS (Heavy CPU op)
+            print(f"Creating voice state for {model_id} from {audio_path}...")
+            with STAGE_SECONDS.time(stage="voice_state_encode"):
+                voice_state = await asyncio.to_thread(
+                    self.tts_model.get_state_for_audio_prompt, 
+                    audio_path
+                )
+            print(f"Voice state created for {model_id}")
+        self.voice_cache.put(model_id, voice_state)
         
-        # Save voice state
-        await asyncio.to_thread(torch.save, voice_state, model_dir / "voice_state.pt")
+        # Save voice state (atomic, versioned and checksummed)
+        await asyncio.to_thread(
+            save_voice_state,
+            model_dir / "voice_state.pt",
+            voice_state,
+            self.MODEL_VARIANT
+        )
         
         # Copy original audio as reference
         sf.write(model_dir / "original.wav", audio, sr)
@@ -94,6 +228,7 @@ class VoiceClonerService:
         preview_samples = min(int(sr * 10), len(audio))
         preview = audio[:preview_samples]
         sf.write(model_dir / "preview.wav", preview, sr)
+        record_digest(model_dir / "preview.wav")
         
         # Save metadata
         metadata = {
@@ -107,30 +242,253 @@ class VoiceClonerService:
         
         with open(model_dir / "metadata.json", "w") as f:
             json.dump(metadata, f, indent=2)
+        self.catalog.upsert(metadata)
         
         return metadata
     
     def load_voice_model(self, model_id: str) -> tuple:
-        """Load a voice model by ID - regenerates state from original audio."""
+        """
+        Load a voice model by ID.
+        The voice state is served from the in-memory cache; on a miss it is
+        read from voice_state.pt, or regenerated from the original audio if the
+        persisted state is missing, stale or corrupt.
+        """
         model_dir = self.voice_models_dir / model_id
         
         if not model_dir.exists():
              raise FileNotFoundError(f"Model {model_id} not found")
 
-        # Load metadata
-        with open(model_dir / "metadata.json") as f:
-            metadata = json.load(f)
+        with span("load_voice_model", model_id=model_id):
+            # Load metadata
+            with open(model_dir / "metadata.json") as f:
+                metadata = json.load(f)
+            
+            voice_state = self.voice_cache.get_or_load(
+                model_id,
+                lambda: self._load_voice_state(model_id)
+            )
         
-        # IMPORTANT: Regenerate voice_state from original audio each time
-        # The .pt cache can become corrupted and is not reliable
+        return voice_state, metadata
+    
+    def _load_voice_state(self, model_id: str):
+        """Load the persisted voice state for a model, rebuilding it if needed."""
+        model_dir = self.voice_models_dir / model_id
         original_audio_path = model_dir / "original.wav"
         if not original_audio_path.exists():
             raise FileNotFoundError(f"Original audio for model {model_id} not found")
         
-        print(f"Regenerating voice state from {original_audio_path}...")
-        voice_state = self.tts_model.get_state_for_audio_prompt(str(original_audio_path))
+        return load_or_encode_voice_state(
+            self.tts_model,
+            str(original_audio_path),
+            model_dir / "voice_state.pt",
+            self.MODEL_VARIANT
+        )
+    
+    def _voice_state_for(self, voice: VoiceRef):
+        """
+        Resolve a voice reference to a state using the in-process caches.
+        Resident states are timed as voice_state_cached; loads and encodes are
+        timed where they happen (load_or_encode_voice_state).
+        """
+        if voice.kind == "default":
+            cached = voice.name in self._default_voice_states
+        else:
+            cached = (voice.name if voice.kind == "model" else voice.key) in self.voice_cache
+        with STAGE_SECONDS.time(stage="voice_state_cached") if cached else nullcontext():
+            return self._lookup_voice_state(voice)
+    
+    def _lookup_voice_state(self, voice: VoiceRef):
+        if voice.kind == "model":
+            voice_state, _ = self.load_voice_model(voice.name)
+            return voice_state
+        if voice.kind == "default":
+            return self.get_default_voice_state(voice.name)
         
-        return voice_state, metadata
+        def encode():
+            if voice.state_path is None:
+                print(f"Encoding voice from audio path: {voice.prompt}")
+            return load_or_encode_voice_state(self.tts_model, voice.prompt, voice.state_path, self.MODEL_VARIANT)
+        
+        # One-shot voices are cached by path and modification time
+        return self.voice_cache.get_or_load(voice.key, encode)
+    
+    def _synthesize(self, voice_state, text: str) -> torch.Tensor:
+        """
+        Run Pocket-TTS on a shared (cached) voice state.
+        Pocket-TTS mutates the state during generation and deep-copies it first;
+        the leased snapshot serves that copy from a pooled arena refilled in place,
+        so the cached state stays untouched without a fresh allocation per request.
+        """
+        with self.state_pool.lease(voice_state) as snapshot, STAGE_SECONDS.time(stage="generate_audio"):
+            return self.tts_model.generate_audio(snapshot, text)
+    
+    async def synthesize(self, voice: VoiceRef, text: str) -> np.ndarray:
+        """
+        Generate audio for one text chunk: on a worker process if the pool is
+        enabled, batched with concurrent requests if micro-batching is enabled.
+        """
+        with IN_FLIGHT.track(operation="synthesis"), span("synthesize", chars=len(text)):
+            if self.worker_pool:
+                return await self.worker_pool.synthesize(voice, text)
+            if self.batcher:
+                return await self.batcher.synthesize(voice.state, text)
+            audio = await asyncio.to_thread(self._synthesize, voice.state, text)
+            return audio.numpy()
+    
+    def precomputed_state_path(self, audio_path: str) -> Path:
+        """Where the voice state of an uploaded audio file is kept once encoded."""
+        return Path(audio_path).with_suffix(".voice_state.pt")
+    
+    def precompute_voice_state(
+        self,
+        audio_path: str,
+        scheduler: GenerationScheduler,
+        client_id: str = "anonymous"
+    ) -> None:
+        """
+        Start encoding the voice state of an uploaded audio file in the
+        background, so a following clone or one-shot generation finds it ready.
+        The encode waits for a batch-priority generation slot, so it never
+        competes with interactive generations for the CPU.
+        """
+        key = os.path.abspath(audio_path)
+        if key in self._precompute_tasks:
+            return
+        self._precompute_failed.discard(key)
+        task = asyncio.create_task(self._precompute(audio_path, scheduler, client_id))
+        self._precompute_tasks[key] = task
+        task.add_done_callback(lambda t: self._precompute_done(key, t))
+    
+    async def _precompute(self, audio_path: str, scheduler: GenerationScheduler, client_id: str) -> None:
+        key = os.path.abspath(audio_path)
+        async with scheduler.slot(Priority.BATCH, client_id, admit=False):
+            voice = self.describe_voice(audio_path=audio_path)
+            print(f"Precomputing voice state for {audio_path}...")
+            # From here on the encode finishes even if the upload is deleted
+            self._precompute_encoding.add(key)
+            voice_state = await asyncio.to_thread(
+                load_or_encode_voice_state,
+                self.tts_model,
+                audio_path,
+                self.precomputed_state_path(audio_path),
+                self.MODEL_VARIANT
+            )
+        if not os.path.exists(audio_path):
+            # Upload deleted while encoding
+            self.precomputed_state_path(audio_path).unlink(missing_ok=True)
+            return
+        self.voice_cache.put(voice.key, voice_state)
+        print(f"Voice state ready for {audio_path}")
+    
+    def _precompute_done(self, key: str, task: asyncio.Task) -> None:
+        self._precompute_tasks.pop(key, None)
+        self._precompute_encoding.discard(key)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Voice state precomputation failed for {key}: {task.exception()}")
+            self._precompute_failed.add(key)
+    
+    async def wait_for_voice_state(self, audio_path: str) -> None:
+        """
+        Wait for a running precomputation of audio_path, if any (errors are
+        ignored). One still queued for a slot is cancelled instead: the caller
+        may be holding the slot it waits for, and encodes the voice itself.
+        """
+        key = os.path.abspath(audio_path)
+        task = self._precompute_tasks.get(key)
+        if task is None:
+            return
+        if key not in self._precompute_encoding:
+            task.cancel()
+            return
+        try:
+            await asyncio.shield(task)
+        except Exception:
+            pass
+    
+    def voice_state_status(self, audio_path: str) -> str:
+        """Precomputed voice state of an upload: "pending", "ready", "failed" or "none"."""
+        key = os.path.abspath(audio_path)
+        if key in self._precompute_tasks:
+            return "pending"
+        if key in self._precompute_failed:
+            return "failed"
+        if self.precomputed_state_path(audio_path).exists():
+            return "ready"
+        return "none"
+    
+    def discard_voice_state(self, audio_path: str) -> None:
+        """
+        Forget every voice state of an upload about to be deleted: the
+        precomputed file, the resident copy, and a precomputation still
+        queued (one already encoding drops its result when it finds the
+        upload gone). Call it while the file still exists; its modification
+        time is part of the cache key.
+        """
+        key = os.path.abspath(audio_path)
+        task = self._precompute_tasks.get(key)
+        if task is not None and key not in self._precompute_encoding:
+            task.cancel()
+        self._precompute_failed.discard(key)
+        if os.path.exists(audio_path):
+            self.voice_cache.invalidate(self.describe_voice(audio_path=audio_path).key)
+        self.precomputed_state_path(audio_path).unlink(missing_ok=True)
+    
+    def describe_voice(
+        self,
+        voice_model_id: str | None = None,
+        audio_path: str | None = None,
+        default_voice: str | None = None
+    ) -> VoiceRef:
+        """Identify the voice for a request (saved model, one-shot audio, or built-in voice) without loading it."""
+        if voice_model_id:
+            model_dir = self.voice_models_dir / voice_model_id
+            if not model_dir.exists():
+                raise FileNotFoundError(f"Model {voice_model_id} not found")
+            voice = VoiceRef(
+                kind="model",
+                name=voice_model_id,
+                prompt=str(model_dir / "original.wav"),
+                state_path=str(model_dir / "voice_state.pt")
+            )
+        elif audio_path:
+            state_path = self.precomputed_state_path(audio_path)
+            voice = VoiceRef(
+                kind="audio",
+                name=os.path.abspath(audio_path),
+                prompt=audio_path,
+                state_path=str(state_path) if state_path.exists() else None,
+                version=str(os.stat(audio_path).st_mtime_ns)
+            )
+        else:
+            name = default_voice or self.DEFAULT_VOICE
+            if name not in self.DEFAULT_VOICES:
+                raise ValueError(f"Unknown default voice '{name}'")
+            print(f"Using default voice '{name}'")
+            voice = VoiceRef(
+                kind="default",
+                name=name,
+                prompt=self.DEFAULT_VOICES[name],
+                state_path=str(self.default_voices_dir / f"{name}.pt")
+            )
+        return voice
+    
+    async def resolve_voice(
+        self,
+        voice_model_id: str | None = None,
+        audio_path: str | None = None,
+        default_voice: str | None = None
+    ) -> VoiceRef:
+        """
+        Resolve the voice for a request: saved model, one-shot audio, or built-in voice.
+        Without a worker pool the voice state is loaded here, so errors surface
+        before generation starts.
+        """
+        if audio_path:
+            await self.wait_for_voice_state(audio_path)
+        voice = self.describe_voice(voice_model_id, audio_path, default_voice)
+        if not self.worker_pool:
+            voice.state = await asyncio.to_thread(self._voice_state_for, voice)
+        return voice
     
     async def generate_speech(
         self,
@@ -138,49 +496,113 @@ class VoiceClonerService:
         voice_model_id: str | None = None,
         audio_path: str | None = None,
         speed: float = 1.0,
-        pitch: float = 0.0
+        pitch: float = 0.0,
+        default_voice: str | None = None
     ) -> dict:
         """
         Generate speech from text using Pocket-TTS.
         Run CPU-heavy operations in a thread pool.
+        Without a voice model or audio path, the built-in voice named by
+        default_voice (or DEFAULT_VOICE) is used.
         """
         output_id = str(uuid.uuid4())
+        start = time.perf_counter()
+        
+        with IN_FLIGHT.track(operation="generation"), span("generate_speech", chars=len(text)):
+            # Get voice state (might involve loading file or processing audio)
+            print(f"Preparing generation for {output_id}...")
+            voice = await self.resolve_voice(voice_model_id, audio_path, default_voice)
+            
+            audio = await self.render_speech(text, voice)
+            print(f"Generation complete for {output_id}")
+            
+            result = await self.save_output(audio, speed, pitch, output_id)
+        record_real_time_factor("speech", time.perf_counter() - start, result["duration_seconds"])
+        return result
+    
+    def output_cache_key(self, text: str, voice: VoiceRef, speed: float = 1.0, pitch: float = 0.0) -> str:
+        """Content address of a generate_speech result, for the output cache."""
+        return output_key(
+            text=text,
+            voice=voice.key,
+            speed=float(speed),
+            pitch=float(pitch),
+            effects=EFFECTS_VERSION,
+            model_variant=self.MODEL_VARIANT,
+            pocket_tts=pocket_tts_version(),
+            crossfade_ms=self.CHUNK_CROSSFADE_MS,
+            max_chars_per_chunk=MAX_CHARS_PER_CHUNK,
+        )
+    
+    async def render_speech(self, text: str, voice: VoiceRef) -> np.ndarray:
+        """
+        Generate audio for text in memory (no effects, nothing written).
+        Audio is generated chunk by chunk (Heavy CPU op), reusing the one voice
+        state, so model memory stays bounded by the chunk size, not the text length.
+        """
+        accumulator = AudioAccumulator(
+            self.tts_model.sample_rate,
+            expected_seconds=TextProcessor.estimate_duration(text) * 1.25,
+            crossfade_ms=self.CHUNK_CROSSFADE_MS
+        )
+        async for _, _, audio in self.iter_speech_chunks(text, voice):
+            accumulator.append(audio)
+        return accumulator.audio
+    
+    async def iter_speech_chunks(self, text: str, voice: VoiceRef):
+        """
+        Synthesize text chunk by chunk, yielding (chunk_index, total_chunks, audio)
+        as soon as each chunk is ready. Audio is a float32 NumPy array.
+        """
+        for idx, total, chunk in TextProcessor.stream_chunks(text):
+            print(f"Generating chunk {idx + 1}/{total}: '{chunk[:60]}'...")
+            audio = await self.synthesize(voice, chunk)
+            yield idx, total, audio
+    
+    async def stream_speech(
+        self,
+        text: str,
+        voice: VoiceRef,
+        speed: float = 1.0,
+        pitch: float = 0.0
+    ):
+        """
+        Stream final audio for text: yields (chunk_index, total_chunks, audio)
+        with effects applied per chunk and boundaries crossfaded. The last
+        yield carries the held-back crossfade tail (chunk_index == total_chunks).
+        """
+        crossfade = CrossfadeStream(self.tts_model.sample_rate, self.CHUNK_CROSSFADE_MS)
+        total = 0
+        # Compute time excludes time spent waiting for the client to take each chunk
+        compute_seconds = 0.0
+        samples = 0
+        with IN_FLIGHT.track(operation="stream"):
+            start = time.perf_counter()
+            async for idx, total, audio in self.iter_speech_chunks(text, voice):
+                if speed != 1.0 or pitch != 0.0:
+                    audio = await asyncio.to_thread(
+                        self._apply_effects, audio, self.tts_model.sample_rate, speed, pitch
+                    )
+                compute_seconds += time.perf_counter() - start
+                samples += len(audio)
+                yield idx, total, crossfade.push(audio)
+                start = time.perf_counter()
+            yield total, total, crossfade.flush()
+        record_real_time_factor("stream", compute_seconds, samples / self.tts_model.sample_rate)
+    
+    async def save_output(
+        self,
+        audio_np: np.ndarray,
+        speed: float = 1.0,
+        pitch: float = 0.0,
+        output_id: str | None = None
+    ) -> dict:
+        """Apply effects to generated audio and write it to uploads/outputs."""
+        output_id = output_id or str(uuid.uuid4())
         output_dir = Path("uploads") / "outputs"
         output_dir.mkdir(parents=True, exist_ok=True)
         output_path = output_dir / f"{output_id}.wav"
         
-        # Get voice state (might involve loading file or processing audio)
-        print(f"Preparing generation for {output_id}...")
-        if voice_model_id:
-            voice_state, _ = await asyncio.to_thread(self.load_voice_model, voice_model_id)
-        elif audio_path:
-             print(f"Encoding voice from audio path: {audio_path}")
-             voice_state = await asyncio.to_thread(
-                 self.tts_model.get_state_for_audio_prompt, 
-                 audio_path
-             )
-        else:
-            # Use a default voice
-            print("Using default voice")
-            voice_state = await asyncio.to_thread(
-                self.tts_model.get_state_for_audio_prompt,
-                "hf://kyutai/tts-voices/alba-mackenna/casual.wav"
-            )
-        
-        # Generate audio using Pocket-TTS (Heavy CPU op)
-        # IMPORTANT: Deep copy voice_state as Pocket-TTS mutates it during generation
-        print(f"Generating audio for '{text}'...")
-        voice_state_copy = copy.deepcopy(voice_state)
-        audio = await asyncio.to_thread(
-            self.tts_model.generate_audio,
-            voice_state_copy, 
-            text
-        )
-        print(f"Generation complete for {output_id}")
-        
-        # Audio is a 1D torch tensor containing PCM data
-        audio_np = audio.numpy()
-        
         # Apply effects if needed
         if speed != 1.0 or pitch != 0.0:
             print(f"Applying effects: speed={speed}, pitch={pitch}")
@@ -193,12 +615,14 @@ class VoiceClonerService:
             )
         
         # Save output
-        await asyncio.to_thread(
-            scipy.io.wavfile.write,
-            str(output_path), 
-            self.tts_model.sample_rate, 
-            audio_np
-        )
+        with STAGE_SECONDS.time(stage="wav_write"):
+            await asyncio.to_thread(
+                scipy.io.wavfile.write,
+                str(output_path), 
+                self.tts_model.sample_rate, 
+                audio_np
+            )
+        await asyncio.to_thread(record_digest, output_path)
         
         duration = len(audio_np) / self.tts_model.sample_rate
         
@@ -209,27 +633,18 @@ class VoiceClonerService:
             "sample_rate": self.tts_model.sample_rate
         }
     
-    def list_voice_models(self) -> list[dict]:
-        """List all saved voice models."""
-        models = []
-        
-        if not self.voice_models_dir.exists():
-            return []
-
-        for model_dir in self.voice_models_dir.iterdir():
-            if model_dir.is_dir():
-                metadata_path = model_dir / "metadata.json"
-                if metadata_path.exists():
-                    try:
-                        with open(metadata_path) as f:
-                            metadata = json.load(f)
-                            models.append(metadata)
-                    except Exception as e:
-                        print(f"Error reading metadata for {model_dir}: {e}")
-        
-        # Sort by creation date, newest first
-        models.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-        return models
+    def list_voice_models(
+        self,
+        limit: int | None = None,
+        cursor: str | None = None,
+        tag: str | None = None,
+        name: str | None = None
+    ) -> tuple[list[dict], str | None]:
+        """
+        List saved voice models, newest first, from the catalog index.
+        Returns one page (all models without a limit) and the next page's cursor.
+        """
+        return self.catalog.list_models(limit=limit, cursor=cursor, tag=tag, name=name)
     
     def get_voice_model(self, model_id: str) -> dict | None:
         """Get a specific voice model metadata."""
@@ -246,6 +661,10 @@ class VoiceClonerService:
         import shutil
         model_dir = self.voice_models_dir / model_id
         
+        # Drop the resident state and index entry even if the files are already gone
+        self.voice_cache.invalidate(model_id)
+        self.catalog.remove(model_id)
+        
         if model_dir.exists():
             shutil.rmtree(model_dir)
             return True
@@ -258,6 +677,3 @@ class VoiceClonerService:
             return str(preview_path)
         return None
 
-
-# Global instance
-voice_cloner_service = VoiceClonerService()
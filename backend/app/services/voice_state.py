@@ -0,0 +1,266 @@
+"""
+Voice State Utilities - Persistence and cheap per-generation snapshots
+
+Persistence: versioned, checksummed voice_state.pt files let a restarted
+server reload encoded voices instead of re-encoding audio.
+
+File layout:
+    MAGIC (4 bytes) | header length (4 bytes, little endian) | header JSON | payload
+The payload is the torch.save() serialization of the voice state; the header
+records the format version, the Pocket-TTS model variant and library version
+the state was encoded with, and the SHA-256 of the payload.
+"""
+
+import copy
+import hashlib
+import io
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from importlib import metadata as importlib_metadata
+from pathlib import Path
+from typing import Any, Iterator
+
+import torch
+
+from app.services.metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"VFVS"
+FORMAT_VERSION = 1
+_HEADER_LEN = struct.Struct("<I")
+
+
+def pocket_tts_version() -> str:
+    """Installed Pocket-TTS library version (part of the cache validity key)."""
+    try:
+        return importlib_metadata.version("pocket-tts")
+    except importlib_metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def save_voice_state(path: str | Path, state: Any, model_variant: str) -> None:
+    """
+    Atomically persist a voice state.
+    Writes to a temp file in the same directory, fsyncs, then renames over the target,
+    so readers see either the previous file or the complete new one.
+    """
+    path = Path(path)
+    buffer = io.BytesIO()
+    torch.save(state, buffer)
+    payload = buffer.getvalue()
+
+    header = json.dumps({
+        "format_version": FORMAT_VERSION,
+        "model_variant": model_variant,
+        "library_version": pocket_tts_version(),
+        "sha256": hashlib.sha256(payload).hexdigest(),
+        "payload_bytes": len(payload),
+        "created_at": datetime.now().isoformat(),
+    }).encode("utf-8")
+
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(_HEADER_LEN.pack(len(header)))
+            f.write(header)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def load_voice_state(path: str | Path, model_variant: str) -> Any | None:
+    """
+    Load a persisted voice state.
+    Returns None when the file is missing, was written by another model variant,
+    library or format version, or fails the checksum; the caller should rebuild it.
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                logger.info(f"Voice state {path} has legacy/unknown format, rebuilding")
+                return None
+            (header_len,) = _HEADER_LEN.unpack(f.read(_HEADER_LEN.size))
+            header = json.loads(f.read(header_len))
+            payload = f.read()
+    except (OSError, ValueError, struct.error) as e:
+        logger.warning(f"Voice state {path} is unreadable ({e}), rebuilding")
+        return None
+
+    expected = {
+        "format_version": FORMAT_VERSION,
+        "model_variant": model_variant,
+        "library_version": pocket_tts_version(),
+    }
+    for field, value in expected.items():
+        if header.get(field) != value:
+            logger.info(
+                f"Voice state {path} is stale ({field}={header.get(field)!r}, "
+                f"expected {value!r}), rebuilding"
+            )
+            return None
+
+    if len(payload) != header.get("payload_bytes") or \
+            hashlib.sha256(payload).hexdigest() != header.get("sha256"):
+        logger.warning(f"Voice state {path} failed checksum verification, rebuilding")
+        return None
+
+    try:
+        return torch.load(io.BytesIO(payload), map_location="cpu", weights_only=True)
+    except Exception as e:
+        logger.warning(f"Voice state {path} could not be deserialized ({e}), rebuilding")
+        return None
+
+
+def load_or_encode_voice_state(tts_model, prompt: str, state_path: str | Path | None,
+                               model_variant: str) -> Any:
+    """
+    Load a persisted voice state, or encode it from the audio prompt.
+    A freshly encoded state is persisted to state_path (when given) for next time.
+    """
+    if state_path is not None:
+        start = time.perf_counter()
+        state = load_voice_state(state_path, model_variant)
+        if state is not None:
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage="voice_state_load")
+            return state
+
+    logger.info(f"Encoding voice state from {prompt}")
+    with STAGE_SECONDS.time(stage="voice_state_encode"):
+        state = tts_model.get_state_for_audio_prompt(prompt)
+
+    if state_path is not None:
+        try:
+            save_voice_state(state_path, state, model_variant)
+        except OSError as e:
+            logger.warning(f"Could not persist voice state to {state_path}: {e}")
+    return state
+
+
+# ---------------------------------------------------------------------------
+# Snapshots
+#
+# Pocket-TTS mutates the voice state while generating (KV cache writes, step
+# counters), so every generation needs its own copy of the shared, cached state.
+# copy.deepcopy walks the structure generically and allocates a fresh copy of
+# every tensor each time. Voice states are a dict of per-module dicts of tensors,
+# which allows two cheaper strategies:
+#   - snapshot_voice_state: a structural clone of only the tensors
+#   - VoiceStateArena: a preallocated working state refilled in place, so the
+#     hot path does no allocation at all once the arena is warm
+# ---------------------------------------------------------------------------
+
+def snapshot_voice_state(state: Any) -> Any:
+    """Independent copy of a voice state: tensors are cloned, containers rebuilt."""
+    if isinstance(state, torch.Tensor):
+        return state.clone()
+    if isinstance(state, dict):
+        return {k: snapshot_voice_state(v) for k, v in state.items()}
+    if isinstance(state, list):
+        return [snapshot_voice_state(v) for v in state]
+    if isinstance(state, tuple):
+        return tuple(snapshot_voice_state(v) for v in state)
+    return copy.deepcopy(state)
+
+
+class VoiceStateArena:
+    """
+    Reusable working copy of a voice state.
+    reset_from() copies a source state into tensors already owned by the arena
+    (in place, no allocation) and only allocates where shapes or dtypes differ,
+    e.g. the first time a voice with a different prompt length is used.
+    """
+
+    def __init__(self):
+        self._state: dict = {}
+
+    def reset_from(self, source: dict) -> dict:
+        """Make the arena an exact, independent copy of source and return it."""
+        target = self._state
+        for key in list(target):
+            if key not in source:
+                del target[key]
+
+        for key, value in source.items():
+            target[key] = self._reset_value(target.get(key), value)
+        return target
+
+    def _reset_value(self, current: Any, value: Any) -> Any:
+        if isinstance(value, torch.Tensor):
+            if (
+                isinstance(current, torch.Tensor)
+                and current.shape == value.shape
+                and current.dtype == value.dtype
+                and current.device == value.device
+            ):
+                current.copy_(value)
+                return current
+            return value.clone()
+        if isinstance(value, dict):
+            if not isinstance(current, dict):
+                current = {}
+            for key in list(current):
+                if key not in value:
+                    del current[key]
+            for key, item in value.items():
+                current[key] = self._reset_value(current.get(key), item)
+            return current
+        return snapshot_voice_state(value)
+
+
+class VoiceStateSnapshot(dict):
+    """
+    Shareable view of a cached voice state handed to Pocket-TTS.
+    Pocket-TTS deep-copies the state before each generation pass; for this
+    view the copy is served by refilling a leased arena in place instead of
+    allocating a new state. The underlying cached tensors are never mutated.
+    """
+
+    def __init__(self, state: dict, arena: VoiceStateArena):
+        super().__init__(state)
+        self._arena = arena
+
+    def __deepcopy__(self, memo: dict) -> dict:
+        with STAGE_SECONDS.time(stage="deepcopy"):
+            return self._arena.reset_from(self)
+
+
+class VoiceStatePool:
+    """
+    Pool of VoiceStateArena objects shared by generation workers.
+    An arena is leased for the whole duration of one generation, so it is
+    safe even when a streaming generation hops between threads.
+    """
+
+    def __init__(self, max_idle: int = 4):
+        self.max_idle = max_idle
+        self._idle: list[VoiceStateArena] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def lease(self, voice_state: dict) -> Iterator[VoiceStateSnapshot]:
+        """Yield a snapshot view of voice_state backed by a pooled arena."""
+        with self._lock:
+            arena = self._idle.pop() if self._idle else VoiceStateArena()
+        # On error or cancellation the arena is dropped rather than returned:
+        # an aborted Pocket-TTS generation thread may still be writing to it.
+        yield VoiceStateSnapshot(voice_state, arena)
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(arena)
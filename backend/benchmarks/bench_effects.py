@@ -0,0 +1,87 @@
+"""
+Benchmark: speed/pitch effects on generated speech.
+
+Compares the previous librosa chain (pitch_shift, then time_stretch: three
+STFT/ISTFT passes and a resample) with effects.apply_effects (one phase
+vocoder pass and one polyphase resample), on speech-like clips of several
+lengths at 24 kHz (Pocket-TTS output rate).
+
+Run from the backend directory:
+    python -m benchmarks.bench_effects --seconds 10 60 600 --repeat 3
+"""
+import argparse
+import statistics
+import time
+
+import librosa
+import numpy as np
+
+from app.services.effects import apply_effects
+
+SAMPLE_RATE = 24000
+
+
+def make_clip(seconds: float, sr: int = SAMPLE_RATE, seed: int = 0) -> np.ndarray:
+    """Harmonic tone with a wandering pitch and syllable-rate envelope, plus noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    f0 = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2
+    clip = 0.2 * voiced * envelope + 0.01 * rng.standard_normal(len(t))
+    return clip.astype(np.float32)
+
+
+def librosa_effects(audio: np.ndarray, sr: int, speed: float, pitch: float) -> np.ndarray:
+    """The previous VoiceClonerService._apply_effects."""
+    y = audio.astype(np.float32)
+    if pitch != 0:
+        y = librosa.effects.pitch_shift(y, sr=sr, n_steps=pitch)
+    if speed != 1.0 and speed > 0:
+        y = librosa.effects.time_stretch(y, rate=speed)
+    return y
+
+
+def time_it(fn, repeat: int) -> dict:
+    fn()  # warm up (FFT plans, resampling filter)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        "mean_ms": statistics.mean(times),
+        "p50_ms": statistics.median(times),
+        "max_ms": max(times),
+    }
+
+
+def run(seconds: float, speed: float, pitch: float, repeat: int) -> dict:
+    clip = make_clip(seconds)
+    return {
+        "librosa": time_it(lambda: librosa_effects(clip, SAMPLE_RATE, speed, pitch), repeat),
+        "single_pass": time_it(lambda: apply_effects(clip, speed=speed, pitch=pitch), repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, nargs="+", default=[10, 60, 600])
+    parser.add_argument("--speed", type=float, default=1.2)
+    parser.add_argument("--pitch", type=float, default=-2.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for seconds in args.seconds:
+        result = run(seconds, args.speed, args.pitch, args.repeat)
+        print(f"\nclip={seconds:g}s speed={args.speed} pitch={args.pitch:+g}")
+        for name in ("librosa", "single_pass"):
+            r = result[name]
+            print(f"  {name:<12} mean {r['mean_ms']:9.1f} ms  p50 {r['p50_ms']:9.1f} ms  max {r['max_ms']:9.1f} ms")
+        speedup = result["librosa"]["mean_ms"] / result["single_pass"]["mean_ms"]
+        print(f"  speedup {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
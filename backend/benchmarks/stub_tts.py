@@ -0,0 +1,92 @@
+"""
+Deterministic stand-in for pocket_tts.TTSModel, for offline benchmarks.
+
+generate_audio takes a fixed real-time factor (RTF x seconds of audio
+produced, slept rather than spun so it releases the GIL the way torch
+kernels do) and returns a speech-like clip whose length follows the text.
+Voice states have the shape of the Pocket-TTS b6369a24 flow LM prompt state
+(6 layers, KV cache [2, 1, 1000, 16, 64] float32, ~49 MB), and generate_audio
+deep-copies and writes to its state the way Pocket-TTS does, so state
+caching, snapshots and memory behave as with the real model.
+"""
+import copy
+import sys
+import time
+import types
+import zlib
+
+import torch
+
+from app.services.text_processor import TextProcessor
+from benchmarks.bench_effects import make_clip
+
+SAMPLE_RATE = 24000
+# Compute seconds per second of generated audio
+DEFAULT_RTF = 0.2
+# Seconds to encode a voice prompt
+ENCODE_SECONDS = 0.2
+
+NUM_LAYERS = 6
+SEQ_LEN = 1000
+NUM_HEADS = 16
+DIM_PER_HEAD = 64
+PROMPT_LEN = 375
+
+
+def make_voice_state(seed: int) -> dict:
+    """A voice state shaped like Pocket-TTS's, with content fixed by seed."""
+    generator = torch.Generator().manual_seed(seed)
+    state = {}
+    for i in range(NUM_LAYERS):
+        cache = torch.full((2, 1, SEQ_LEN, NUM_HEADS, DIM_PER_HEAD), float("NaN"))
+        cache[:, :, :PROMPT_LEN] = torch.randn(2, 1, PROMPT_LEN, NUM_HEADS, DIM_PER_HEAD, generator=generator)
+        state[f"transformer.layers.{i}.self_attn"] = {
+            "current_end": torch.zeros((PROMPT_LEN,)),
+            "cache": cache,
+        }
+    return state
+
+
+class StubTTSModel:
+    """The part of the pocket_tts.TTSModel interface VoiceForge uses."""
+
+    sample_rate = SAMPLE_RATE
+    rtf = DEFAULT_RTF
+
+    @classmethod
+    def load_model(cls, variant: str | None = None) -> "StubTTSModel":
+        return cls()
+
+    def get_state_for_audio_prompt(self, audio_conditioning, truncate: bool = False) -> dict:
+        time.sleep(ENCODE_SECONDS)
+        return make_voice_state(zlib.crc32(str(audio_conditioning).encode("utf-8")))
+
+    def generate_audio(self, model_state: dict, text_to_generate: str, copy_state: bool = True) -> torch.Tensor:
+        start = time.perf_counter()
+        if copy_state:
+            model_state = copy.deepcopy(model_state)
+        # Generation appends to the KV caches of its working copy
+        for layer in model_state.values():
+            layer["cache"][:, :, PROMPT_LEN] = 0.0
+
+        seconds = TextProcessor.estimate_duration(text_to_generate)
+        audio = make_clip(seconds, self.sample_rate, seed=zlib.crc32(text_to_generate.encode("utf-8")))
+        remaining = self.rtf * seconds - (time.perf_counter() - start)
+        if remaining > 0:
+            time.sleep(remaining)
+        return torch.from_numpy(audio)
+
+
+def install_stub_model(rtf: float = DEFAULT_RTF) -> None:
+    """
+    Make VoiceClonerService load StubTTSModel. Call before importing the
+    service; works whether or not pocket_tts is installed.
+    """
+    StubTTSModel.rtf = rtf
+    try:
+        import pocket_tts  # noqa: F401
+    except ImportError:
+        sys.modules["pocket_tts"] = types.SimpleNamespace(TTSModel=StubTTSModel)
+
+    import app.services.voice_cloner as voice_cloner
+    voice_cloner.TTSModel = StubTTSModel
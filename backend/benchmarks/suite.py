@@ -0,0 +1,364 @@
+"""
+Benchmark suite: text chunking, denoising, effects, podcast stitching and generation.
+
+Times TextProcessor.chunk_text, DenoiserService._reduce_noise, speed/pitch
+effects, podcast stitching (OrderedSegmentWriter into a StreamingWavWriter)
+and the full VoiceClonerService.generate_speech path, over text length,
+audio length and concurrency. Generation runs against a deterministic stub
+TTSModel (benchmarks.stub_tts: fixed real-time factor, real voice state
+sizes) or the real Pocket-TTS model. Results are written as JSON with the
+commit and machine they were measured on, so runs can be compared.
+
+Run from the backend directory:
+    python -m benchmarks.suite run --model stub --text-chars 200 1000 --audio-seconds 10 60 --concurrency 1 4
+    python -m benchmarks.suite compare benchmarks/results/<base>.json benchmarks/results/<new>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from benchmarks.bench_effects import make_clip
+from benchmarks.stub_tts import DEFAULT_RTF, install_stub_model
+
+BENCHMARKS = ("chunk_text", "denoise", "effects", "podcast_stitch", "generate")
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# TTS output rate
+TTS_SAMPLE_RATE = 24000
+# Typical podcast segment length
+SEGMENT_SECONDS = 8.0
+
+WORDS = (
+    "the voice model reads each sentence aloud with a natural pace and a clear tone "
+    "while listeners follow along as the story moves from one chapter to the next "
+    "and every speaker takes a turn before the narrator closes the episode"
+).split()
+
+
+def make_text(chars: int, seed: int = 0) -> str:
+    """Deterministic prose of about chars characters, in sentences and paragraphs."""
+    rng = random.Random(seed)
+    paragraphs = []
+    length = 0
+    while length < chars:
+        sentences = []
+        for _ in range(rng.randint(3, 6)):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(6, 24))]
+            sentence = " ".join(words).capitalize() + rng.choice(".?!")
+            sentences.append(sentence)
+            length += len(sentence) + 1
+            if length >= chars:
+                break
+        paragraphs.append(" ".join(sentences))
+    return "\n\n".join(paragraphs)[:chars].rstrip() + "."
+
+
+def summarize(times_ms: list[float]) -> dict:
+    ordered = sorted(times_ms)
+    return {
+        "n": len(ordered),
+        "mean_ms": statistics.mean(ordered),
+        "p50_ms": statistics.median(ordered),
+        "p95_ms": ordered[min(len(ordered) - 1, round(0.95 * (len(ordered) - 1)))],
+        "max_ms": ordered[-1],
+    }
+
+
+def time_it(fn, repeat: int) -> dict:
+    fn()  # warm up
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return summarize(times)
+
+
+@contextmanager
+def scratch_dir():
+    """Run in a throwaway working directory (the services write under ./uploads)."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="voiceforge-bench-") as directory:
+        os.chdir(directory)
+        try:
+            yield Path(directory)
+        finally:
+            os.chdir(cwd)
+
+
+# Benchmarks
+
+def bench_chunk_text(args) -> list[dict]:
+    from app.services.text_processor import TextProcessor
+
+    results = []
+    for chars in args.text_chars:
+        text = make_text(chars)
+        stats = time_it(lambda: TextProcessor.chunk_text(text), args.repeat)
+        results.append({
+            "params": {"text_chars": chars},
+            "stats": stats,
+            "chunks": len(TextProcessor.chunk_text(text)),
+        })
+    return results
+
+
+def bench_denoise(args) -> list[dict]:
+    from app.services.denoiser import DenoiserService
+
+    denoiser = DenoiserService()
+    # Uploads are decoded at the denoiser's own rate before noise reduction
+    sample_rate = DenoiserService.TARGET_SAMPLE_RATE
+    results = []
+    for seconds in args.audio_seconds:
+        clip = make_clip(seconds, sample_rate)
+        stats = time_it(lambda: denoiser._reduce_noise(clip, sample_rate), args.repeat)
+        results.append({
+            "params": {"audio_seconds": seconds},
+            "stats": stats,
+            "audio_seconds_per_second": seconds / (stats["mean_ms"] / 1000),
+        })
+    return results
+
+
+def bench_effects(args) -> list[dict]:
+    # What VoiceClonerService._apply_effects runs, without loading a model
+    from app.services.effects import apply_effects
+
+    results = []
+    for seconds in args.audio_seconds:
+        clip = make_clip(seconds, TTS_SAMPLE_RATE)
+        stats = time_it(lambda: apply_effects(clip, speed=args.speed, pitch=args.pitch), args.repeat)
+        results.append({
+            "params": {"audio_seconds": seconds, "speed": args.speed, "pitch": args.pitch},
+            "stats": stats,
+            "audio_seconds_per_second": seconds / (stats["mean_ms"] / 1000),
+        })
+    return results
+
+
+def bench_podcast_stitch(args) -> list[dict]:
+    from app.services.audio_buffer import OrderedSegmentWriter, StreamingWavWriter
+    from app.services.podcast_engine import SEGMENT_GAP_SECONDS
+
+    results = []
+    for seconds in args.audio_seconds:
+        count = max(1, round(seconds / SEGMENT_SECONDS))
+        segments = [make_clip(SEGMENT_SECONDS, TTS_SAMPLE_RATE, seed=i) for i in range(count)]
+        # Segments finish out of order when rendered in parallel
+        order = list(range(count))
+        random.Random(0).shuffle(order)
+
+        with tempfile.TemporaryDirectory(prefix="voiceforge-bench-") as directory:
+            path = Path(directory) / "podcast.wav"
+
+            def stitch():
+                writer = StreamingWavWriter(path, TTS_SAMPLE_RATE)
+                stitcher = OrderedSegmentWriter(writer, gap_seconds=SEGMENT_GAP_SECONDS)
+                for index in order:
+                    stitcher.add(index, segments[index])
+                writer.close()
+
+            stats = time_it(stitch, args.repeat)
+        results.append({
+            "params": {"audio_seconds": seconds, "segments": count},
+            "stats": stats,
+            "audio_seconds_per_second": count * SEGMENT_SECONDS / (stats["mean_ms"] / 1000),
+        })
+    return results
+
+
+def bench_generate(args) -> list[dict]:
+    from app.services.text_processor import TextProcessor
+    from app.services.voice_cloner import VoiceClonerService
+
+    class BenchVoiceCloner(VoiceClonerService):
+        # Only the voice the benchmark uses is encoded at startup
+        DEFAULT_VOICES = {"alba": VoiceClonerService.DEFAULT_VOICES["alba"]}
+
+    results = []
+    with scratch_dir():
+        cloner = BenchVoiceCloner(num_workers=args.workers)
+
+        async def generate(text: str) -> float:
+            start = time.perf_counter()
+            await cloner.generate_speech(text, speed=args.speed, pitch=args.pitch)
+            return time.perf_counter() - start
+
+        async def round_trip(texts: list[str]) -> tuple[list[float], float]:
+            start = time.perf_counter()
+            latencies = await asyncio.gather(*(generate(text) for text in texts))
+            return list(latencies), time.perf_counter() - start
+
+        async def run_all():
+            await generate(make_text(args.text_chars[0]))  # warm up
+            for chars in args.text_chars:
+                for concurrency in args.concurrency:
+                    latencies = []
+                    wall = 0.0
+                    audio_seconds = 0.0
+                    for r in range(args.repeat):
+                        # Distinct texts, as from distinct clients
+                        texts = [make_text(chars, seed=r * concurrency + i) for i in range(concurrency)]
+                        round_latencies, round_wall = await round_trip(texts)
+                        latencies.extend(round_latencies)
+                        wall += round_wall
+                        audio_seconds += sum(TextProcessor.estimate_duration(text) for text in texts)
+                    audio_per_request = audio_seconds / (args.repeat * concurrency)
+                    results.append({
+                        "params": {"text_chars": chars, "concurrency": concurrency},
+                        "stats": summarize([latency * 1000 for latency in latencies]),
+                        "audio_seconds_per_request": audio_per_request,
+                        "real_time_factor": statistics.mean(latencies) / audio_per_request,
+                        "audio_seconds_per_second": audio_seconds / wall,
+                    })
+
+        try:
+            asyncio.run(run_all())
+        finally:
+            cloner.shutdown()
+    return results
+
+
+RUNNERS = {
+    "chunk_text": bench_chunk_text,
+    "denoise": bench_denoise,
+    "effects": bench_effects,
+    "podcast_stitch": bench_podcast_stitch,
+    "generate": bench_generate,
+}
+
+
+# Results
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(args) -> dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "numpy": np.__version__,
+        "model": args.model,
+        "stub_rtf": args.stub_rtf if args.model == "stub" else None,
+    }
+
+
+def case_id(benchmark: str, params: dict) -> str:
+    return benchmark + "[" + ",".join(f"{k}={v:g}" if isinstance(v, float) else f"{k}={v}"
+                                      for k, v in params.items()) + "]"
+
+
+def run(args) -> None:
+    if args.model == "stub":
+        install_stub_model(args.stub_rtf)
+
+    report = {"environment": environment(args), "results": []}
+    for name in args.only or BENCHMARKS:
+        print(f"{name}...", file=sys.stderr)
+        for result in RUNNERS[name](args):
+            result = {"benchmark": name, **result}
+            report["results"].append(result)
+            stats = result["stats"]
+            print(f"  {case_id(name, result['params']):<50} mean {stats['mean_ms']:10.1f} ms  "
+                  f"p50 {stats['p50_ms']:10.1f} ms  p95 {stats['p95_ms']:10.1f} ms")
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = RESULTS_DIR / f"{stamp}-{args.model}.json"
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"Results written to {output}", file=sys.stderr)
+
+
+def compare(args) -> None:
+    """Mean time of each case in new relative to base; exits 1 on a regression."""
+    base, new = (json.loads(Path(path).read_text()) for path in (args.base, args.new))
+    base_cases = {case_id(r["benchmark"], r["params"]): r for r in base["results"]}
+
+    print(f"base: {base['environment']['commit']} ({base['environment']['model']})  "
+          f"new: {new['environment']['commit']} ({new['environment']['model']})")
+    regressions = 0
+    for result in new["results"]:
+        case = case_id(result["benchmark"], result["params"])
+        if case not in base_cases:
+            print(f"  {case:<50} (no baseline)")
+            continue
+        before = base_cases[case]["stats"]["mean_ms"]
+        after = result["stats"]["mean_ms"]
+        ratio = after / before
+        flag = ""
+        if ratio > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif ratio < 1 / args.threshold:
+            flag = "  faster"
+        print(f"  {case:<50} {before:10.1f} ms -> {after:10.1f} ms  {ratio:5.2f}x{flag}")
+    if regressions:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run benchmarks and write a results file")
+    run_parser.add_argument("--model", choices=("stub", "real"), default="stub")
+    run_parser.add_argument("--stub-rtf", type=float, default=DEFAULT_RTF,
+                            help="compute seconds per second of audio of the stub model")
+    run_parser.add_argument("--only", nargs="+", choices=BENCHMARKS)
+    run_parser.add_argument("--text-chars", type=int, nargs="+", default=[200, 1000])
+    run_parser.add_argument("--audio-seconds", type=float, nargs="+", default=[10, 60])
+    run_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    run_parser.add_argument("--speed", type=float, default=1.2)
+    run_parser.add_argument("--pitch", type=float, default=-2.0)
+    run_parser.add_argument("--workers", type=int, default=0,
+                            help="TTS worker processes for generate (real model only)")
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--output", help=f"results file (default: {RESULTS_DIR.name}/<timestamp>-<model>.json)")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=1.1,
+                                help="flag cases this many times slower than base")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    if args.command == "run" and args.model == "stub" and args.workers:
+        parser.error("--workers needs --model real (worker processes load their own model)")
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+# Scripts that exercise a running server (python test_api.py), not pytest tests
+collect_ignore = ["test_api.py", "test_effects.py"]
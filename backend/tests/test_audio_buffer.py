@@ -0,0 +1,108 @@
+import struct
+import wave
+
+import numpy as np
+
+from app.services.audio_buffer import (
+    AudioAccumulator,
+    CrossfadeStream,
+    OrderedSegmentWriter,
+    StreamingWavWriter,
+    UNKNOWN_WAV_SIZE,
+    to_pcm16,
+    wav_header,
+)
+
+SAMPLE_RATE = 1000  # 10 ms crossfade = 10 samples
+
+
+def chunks(count: int = 4, length: int = 137) -> list[np.ndarray]:
+    rng = np.random.default_rng(0)
+    return [rng.uniform(-0.5, 0.5, length).astype(np.float32) for _ in range(count)]
+
+
+def test_accumulator_crossfades_and_grows():
+    accumulator = AudioAccumulator(SAMPLE_RATE, expected_seconds=0.0, crossfade_ms=10.0)
+    parts = chunks()
+    for part in parts:
+        accumulator.append(part)
+    accumulator.append(np.zeros(0, dtype=np.float32))
+
+    assert accumulator.chunks == 4
+    assert len(accumulator) == 4 * 137 - 3 * 10
+    # Outside the crossfades the audio is copied unchanged
+    np.testing.assert_array_equal(accumulator.audio[:127], parts[0][:127])
+    np.testing.assert_array_equal(accumulator.audio[-127:], parts[-1][10:])
+
+
+def test_accumulator_matches_concatenation_without_crossfade():
+    parts = chunks()
+    accumulator = AudioAccumulator(SAMPLE_RATE, expected_seconds=10.0, crossfade_ms=0.0)
+    for part in parts:
+        accumulator.append(part)
+    np.testing.assert_array_equal(accumulator.audio, np.concatenate(parts))
+
+
+def test_stream_matches_accumulator():
+    parts = chunks()
+    accumulator = AudioAccumulator(SAMPLE_RATE)
+    stream = CrossfadeStream(SAMPLE_RATE)
+    streamed = []
+    for part in parts:
+        accumulator.append(part)
+        streamed.append(stream.push(part))
+    streamed.append(stream.flush())
+    np.testing.assert_allclose(np.concatenate(streamed), accumulator.audio, atol=1e-7)
+
+
+def test_to_pcm16_clips():
+    pcm = np.frombuffer(to_pcm16(np.array([-2.0, -1.0, 0.0, 0.5, 2.0])), dtype="<i2")
+    assert pcm.tolist() == [-32767, -32767, 0, 16383, 32767]
+
+
+def test_wav_header_sizes():
+    header = wav_header(24000, data_bytes=100)
+    assert len(header) == 44
+    assert struct.unpack("<I", header[4:8])[0] == 136
+    assert struct.unpack("<I", header[40:44])[0] == 100
+    streaming = wav_header(24000)
+    assert struct.unpack("<I", streaming[40:44])[0] == UNKNOWN_WAV_SIZE
+
+
+def test_streaming_writer_writes_a_valid_wav(tmp_path):
+    path = tmp_path / "out.wav"
+    with StreamingWavWriter(path, SAMPLE_RATE) as writer:
+        writer.write(np.full(500, 0.25, dtype=np.float32))
+        writer.write(np.full(250, -0.25, dtype=np.float32))
+    assert writer.duration_seconds == 0.75
+    assert not (tmp_path / "out.wav.partial").exists()
+    with wave.open(str(path)) as f:
+        assert (f.getframerate(), f.getnframes(), f.getsampwidth()) == (SAMPLE_RATE, 750, 2)
+
+
+def test_streaming_writer_abort_leaves_nothing(tmp_path):
+    writer = StreamingWavWriter(tmp_path / "out.wav", SAMPLE_RATE)
+    writer.write(np.zeros(10, dtype=np.float32))
+    writer.abort()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_ordered_segments_are_written_in_index_order(tmp_path):
+    path = tmp_path / "podcast.wav"
+    segments = [np.full(100, value, dtype=np.float32) for value in (0.1, 0.2, 0.3)]
+    writer = StreamingWavWriter(path, SAMPLE_RATE)
+    stitcher = OrderedSegmentWriter(writer, gap_seconds=0.01)
+    stitcher.add(2, segments[2])
+    stitcher.add(1, segments[1])
+    assert stitcher.next_index == 0
+    assert stitcher.held_bytes == 400
+    stitcher.add(0, segments[0])
+    assert stitcher.next_index == 3
+    assert stitcher.held_bytes == 0
+    writer.close()
+
+    gap = np.zeros(10, dtype=np.float32)
+    expected = np.concatenate([segments[0], gap, segments[1], gap, segments[2]])
+    with wave.open(str(path)) as f:
+        written = np.frombuffer(f.readframes(f.getnframes()), dtype="<i2")
+    assert written.tolist() == np.frombuffer(to_pcm16(expected), dtype="<i2").tolist()
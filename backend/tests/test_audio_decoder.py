@@ -0,0 +1,55 @@
+import librosa
+import numpy as np
+import pytest
+import soundfile as sf
+
+from app.services.audio_decoder import decode_audio, iter_audio_blocks, probe_audio, resampled_length
+
+
+def write_clip(path, sr: int, seconds: float, channels: int = 1, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    tone = 0.3 * np.sin(2 * np.pi * 440 * t) + 0.02 * rng.standard_normal(len(t))
+    audio = np.stack([tone, 0.5 * tone[::-1]], axis=1) if channels == 2 else tone
+    sf.write(path, audio.astype(np.float32), sr, subtype="FLOAT" if path.suffix == ".wav" else "PCM_16")
+    return path
+
+
+@pytest.mark.parametrize("sr, target_sr, channels, suffix", [
+    (44100, 48000, 1, ".wav"),
+    (22050, 24000, 2, ".wav"),
+    (48000, 24000, 1, ".flac"),
+    (48000, 48000, 2, ".wav"),
+])
+def test_decode_matches_librosa_load(tmp_path, sr, target_sr, channels, suffix):
+    path = write_clip(tmp_path / f"clip{suffix}", sr, 2.3, channels)
+    expected, _ = librosa.load(path, sr=target_sr, mono=True)
+    actual = decode_audio(str(path), target_sr)
+    assert actual.dtype == np.float32
+    assert actual.shape == expected.shape
+    assert np.max(np.abs(actual - expected)) < 1e-5
+
+
+@pytest.mark.parametrize("sr, target_sr", [(44100, 48000), (22050, 24000), (24000, 24000)])
+def test_blocks_match_whole_decode(tmp_path, sr, target_sr):
+    path = write_clip(tmp_path / "clip.wav", sr, 3.1, channels=2)
+    expected = decode_audio(str(path), target_sr)
+    blocks = list(iter_audio_blocks(str(path), target_sr, block_frames=1152 * 7))
+    assert len(blocks) > 1
+    actual = np.concatenate(blocks)
+    assert actual.shape == expected.shape
+    assert np.max(np.abs(actual - expected)) < 1e-4
+
+
+def test_resampled_length_matches_librosa():
+    for frames, sr, target_sr in [(101_000, 44100, 48000), (12345, 22050, 24000), (48000, 48000, 16000)]:
+        resampled = librosa.resample(np.zeros(frames, dtype=np.float32), orig_sr=sr, target_sr=target_sr)
+        assert resampled_length(frames, sr, target_sr) == len(resampled)
+
+
+def test_probe_reports_none_for_ffmpeg_formats(tmp_path):
+    path = tmp_path / "clip.webm"
+    path.write_bytes(b"\x1a\x45\xdf\xa3" + bytes(64))
+    assert probe_audio(str(path)) is None
+    info = probe_audio(str(write_clip(tmp_path / "clip.wav", 16000, 1.5, channels=2)))
+    assert (info.sample_rate, info.channels, info.frames) == (16000, 2, 24000)
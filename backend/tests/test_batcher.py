@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+
+import torch
+
+from app.services.batcher import MicroBatcher
+
+
+class FakeGenerator:
+    """Stands in for BatchedGenerator: texts starting with "solo" cannot be batched."""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.batches: list[list[str]] = []
+
+    def prepare(self, text):
+        return None if text.startswith("solo") else text
+
+    @staticmethod
+    def batch_key(voice_state, prepared):
+        return voice_state["layout"], len(prepared)
+
+    def generate(self, voice_states, prepared):
+        if self.fail:
+            raise RuntimeError("batched pass failed")
+        self.batches.append(list(prepared))
+        return [torch.full((3,), float(len(text))) for text in prepared]
+
+
+class ModelUse:
+    """synthesize_one that records how many passes ever overlapped."""
+
+    def __init__(self):
+        self.texts: list[str] = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.02)
+        with self._lock:
+            self.active -= 1
+
+    def __call__(self, voice_state, text):
+        self.enter()
+        self.texts.append(text)
+        return torch.full((2,), -1.0)
+
+
+def make_batcher(generator: FakeGenerator, model: ModelUse, max_batch_size: int = 8) -> MicroBatcher:
+    batcher = MicroBatcher(None, model, window_ms=20, max_batch_size=max_batch_size)
+    batcher.generator = generator
+    return batcher
+
+
+def test_requests_with_equal_keys_share_a_pass():
+    async def main():
+        generator, model = FakeGenerator(), ModelUse()
+        batcher = make_batcher(generator, model)
+        a, b = {"layout": "a"}, {"layout": "b"}
+        results = await asyncio.gather(
+            batcher.synthesize(a, "hello"),
+            batcher.synthesize(a, "world"),
+            batcher.synthesize(b, "other"),  # different layout: a batch of one
+            batcher.synthesize(a, "longer text"),  # different length
+        )
+        assert generator.batches == [["hello", "world"]]
+        assert sorted(model.texts) == ["longer text", "other"]
+        assert results[0].tolist() == [5.0, 5.0, 5.0]
+        assert results[2].tolist() == [-1.0, -1.0]
+        assert batcher.stats()["batched_requests"] == 2
+        assert batcher.stats()["single_requests"] == 2
+
+    asyncio.run(main())
+
+
+def test_full_batch_runs_without_waiting_for_the_window():
+    async def main():
+        generator, model = FakeGenerator(), ModelUse()
+        batcher = make_batcher(generator, model, max_batch_size=2)
+        batcher.window_seconds = 60
+        state = {"layout": "a"}
+        await asyncio.wait_for(asyncio.gather(batcher.synthesize(state, "abc"), batcher.synthesize(state, "xyz")), 5)
+        assert generator.batches == [["abc", "xyz"]]
+
+    asyncio.run(main())
+
+
+def test_unbatchable_text_runs_on_its_own():
+    async def main():
+        generator, model = FakeGenerator(), ModelUse()
+        batcher = make_batcher(generator, model)
+        audio = await batcher.synthesize({"layout": "a"}, "solo sentence. And another.")
+        assert audio.tolist() == [-1.0, -1.0]
+        assert model.texts == ["solo sentence. And another."]
+        assert generator.batches == []
+
+    asyncio.run(main())
+
+
+def test_failed_batch_falls_back_to_single_requests():
+    async def main():
+        generator, model = FakeGenerator(fail=True), ModelUse()
+        batcher = make_batcher(generator, model)
+        state = {"layout": "a"}
+        results = await asyncio.gather(batcher.synthesize(state, "abc"), batcher.synthesize(state, "xyz"))
+        assert [r.tolist() for r in results] == [[-1.0, -1.0], [-1.0, -1.0]]
+        assert sorted(model.texts) == ["abc", "xyz"]
+        assert batcher.stats()["batches"] == 0
+
+    asyncio.run(main())
+
+
+def test_model_runs_one_pass_at_a_time():
+    async def main():
+        model = ModelUse()
+        generator = FakeGenerator()
+        original = generator.generate
+
+        def generate(voice_states, prepared):
+            model.enter()
+            return original(voice_states, prepared)
+
+        generator.generate = generate
+        batcher = make_batcher(generator, model)
+        await asyncio.gather(*(
+            batcher.synthesize({"layout": layout}, text)
+            for layout in "abcd"
+            for text in ("solo", "abc", "xyz")
+        ))
+        assert len(generator.batches) == 4
+        assert model.max_active == 1
+
+    asyncio.run(main())
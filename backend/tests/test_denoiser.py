@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from app.services import denoiser
+from app.services.denoiser import DenoiserService
+
+SAMPLE_RATE = DenoiserService.TARGET_SAMPLE_RATE
+
+
+def make_speech(seconds: float, sr: int = SAMPLE_RATE, seed: int = 1) -> np.ndarray:
+    """A tone gated on and off, over noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    tone = 0.3 * np.sin(2 * np.pi * 200 * t) * (np.sin(2 * np.pi * 0.5 * t) > 0)
+    return (tone + 0.03 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def in_blocks(audio: np.ndarray, size: int):
+    return iter([audio[i:i + size] for i in range(0, len(audio), size)])
+
+
+@pytest.mark.filterwarnings("ignore:n_fft=")
+@pytest.mark.parametrize("seconds", [0.02, 0.2, 3.7])
+@pytest.mark.parametrize("block_size", [1000, 4096, 1 << 20])
+def test_stream_matches_batch(seconds, block_size):
+    service = DenoiserService()
+    audio = make_speech(seconds)
+    expected = service._reduce_noise(audio, SAMPLE_RATE)
+    actual = np.concatenate(list(service._reduce_noise_stream(in_blocks(audio, block_size))))
+    assert actual.shape == expected.shape
+    assert np.max(np.abs(actual - expected)) < 1e-7
+
+
+def test_streaming_file_matches_in_memory_file(tmp_path, monkeypatch):
+    service = DenoiserService()
+    source = tmp_path / "upload.wav"
+    sf.write(source, make_speech(2.5), SAMPLE_RATE)
+
+    monkeypatch.setattr(denoiser, "STREAMING_DENOISE_SECONDS", float("inf"))
+    batch = service._process_sync(str(source), str(tmp_path / "batch.wav"))
+    monkeypatch.setattr(denoiser, "STREAMING_DENOISE_SECONDS", 0.0)
+    streamed = service._process_sync(str(source), str(tmp_path / "streamed.wav"))
+
+    assert streamed["duration_seconds"] == pytest.approx(batch["duration_seconds"])
+    expected, _ = sf.read(tmp_path / "batch.wav", dtype="float32")
+    actual, _ = sf.read(tmp_path / "streamed.wav", dtype="float32")
+    assert actual.shape == expected.shape
+    assert np.max(np.abs(actual - expected)) < 1e-4  # 16-bit output
+    assert not (tmp_path / "streamed.wav.partial").exists()
@@ -0,0 +1,54 @@
+import librosa
+import numpy as np
+import pytest
+
+from app.services.effects import apply_effects, resample_ratio
+from benchmarks.bench_effects import SAMPLE_RATE, librosa_effects, make_clip
+
+CLIP = make_clip(3)
+
+
+def relative_error(actual: np.ndarray, expected: np.ndarray) -> float:
+    return float(np.linalg.norm(actual - expected) / np.linalg.norm(expected))
+
+
+def median_f0(audio: np.ndarray) -> float:
+    return float(np.median(librosa.yin(audio, fmin=60, fmax=600, sr=SAMPLE_RATE)))
+
+
+def test_no_effects_returns_input():
+    assert np.array_equal(apply_effects(CLIP), CLIP)
+
+
+@pytest.mark.parametrize("speed", [0.8, 1.25])
+def test_speed_matches_librosa_time_stretch(speed):
+    expected = librosa.effects.time_stretch(CLIP, rate=speed)
+    actual = apply_effects(CLIP, speed=speed)
+    assert actual.shape == expected.shape
+    assert relative_error(actual, expected) < 5e-3
+
+
+@pytest.mark.parametrize("pitch", [3, -4])
+def test_pitch_matches_librosa_pitch_shift(pitch):
+    expected = librosa.effects.pitch_shift(CLIP, sr=SAMPLE_RATE, n_steps=pitch)
+    actual = apply_effects(CLIP, pitch=pitch)
+    assert actual.shape == expected.shape
+    # The resamplers differ, so compare spectra rather than samples
+    assert relative_error(np.abs(librosa.stft(actual)), np.abs(librosa.stft(expected))) < 0.02
+
+
+@pytest.mark.parametrize("speed, pitch", [(1.2, 3), (0.9, -2.5)])
+def test_speed_and_pitch_match_librosa_length_and_pitch(speed, pitch):
+    # librosa's second vocoder pass smears the first one's output, so only
+    # length and fundamental are expected to agree, not the waveform
+    expected = librosa_effects(CLIP, SAMPLE_RATE, speed, pitch)
+    actual = apply_effects(CLIP, speed=speed, pitch=pitch)
+    assert len(actual) == len(expected) == round(len(CLIP) / speed)
+    assert median_f0(actual) == pytest.approx(median_f0(expected), rel=0.01)
+    assert median_f0(actual) == pytest.approx(median_f0(CLIP) * 2 ** (pitch / 12), rel=0.01)
+
+
+def test_resample_ratio_is_within_a_cent():
+    for pitch in (-12, -4, 0.5, 3, 7):
+        up, down = resample_ratio(2 ** (-pitch / 12))
+        assert abs(1200 * np.log2(up / down) + 100 * pitch) < 1
@@ -0,0 +1,71 @@
+import os
+import time
+from email.utils import formatdate
+
+from starlette.requests import Request
+
+from app.services.http_cache import (
+    _not_modified,
+    digest_path,
+    discard_digest,
+    file_digest,
+    record_digest,
+)
+
+ETAG = '"abc"'
+
+
+def request(**headers) -> Request:
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+def test_digest_is_recorded_and_reused(tmp_path):
+    path = tmp_path / "a.wav"
+    path.write_bytes(b"audio")
+    digest = record_digest(path)
+    assert digest_path(path).read_text().split()[0] == digest
+
+    # A stored digest is trusted, not recomputed
+    digest_path(path).write_text(f"cached {path.stat().st_size} {path.stat().st_mtime_ns}\n")
+    assert file_digest(path) == "cached"
+
+
+def test_rewritten_file_is_hashed_again(tmp_path):
+    path = tmp_path / "a.wav"
+    path.write_bytes(b"audio")
+    first = record_digest(path)
+    path.write_bytes(b"other audio")
+    os.utime(path, ns=(time.time_ns(), path.stat().st_mtime_ns + 1))
+    assert file_digest(path) != first
+
+
+def test_missing_digest_is_recorded(tmp_path):
+    path = tmp_path / "a.wav"
+    path.write_bytes(b"audio")
+    assert not digest_path(path).exists()
+    digest = file_digest(path)
+    assert digest_path(path).exists()
+    discard_digest(path)
+    assert not digest_path(path).exists()
+    assert file_digest(path) == digest
+
+
+def test_if_none_match(tmp_path):
+    stat = os.stat(tmp_path)
+    assert _not_modified(request(if_none_match=ETAG), ETAG, stat)
+    assert _not_modified(request(if_none_match=f'"x", W/{ETAG}'), ETAG, stat)
+    assert _not_modified(request(if_none_match="*"), ETAG, stat)
+    assert not _not_modified(request(if_none_match='"x"'), ETAG, stat)
+
+
+def test_if_modified_since(tmp_path):
+    stat = os.stat(tmp_path)
+    assert _not_modified(request(if_modified_since=formatdate(stat.st_mtime + 1, usegmt=True)), ETAG, stat)
+    assert not _not_modified(request(if_modified_since=formatdate(stat.st_mtime - 60, usegmt=True)), ETAG, stat)
+    assert not _not_modified(request(if_modified_since="garbage"), ETAG, stat)
+    # If-None-Match takes precedence
+    assert not _not_modified(
+        request(if_none_match='"x"', if_modified_since=formatdate(stat.st_mtime + 1, usegmt=True)), ETAG, stat
+    )
+    assert not _not_modified(request(), ETAG, stat)
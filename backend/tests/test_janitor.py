@@ -0,0 +1,155 @@
+import os
+import time
+
+from app.services.janitor import (
+    GRACE_SECONDS,
+    HOUR,
+    StorageJanitor,
+    StoragePolicy,
+    artifact_key,
+    is_partial_artifact,
+)
+
+
+def write(path, size: int = 100, age_seconds: float = 0.0):
+    path.write_bytes(b"\0" * size)
+    when = time.time() - age_seconds
+    os.utime(path, (when, when))
+    return path
+
+
+def janitor(directory, ttl_hours: float = 0, quota_bytes: int = 0) -> StorageJanitor:
+    return StorageJanitor(
+        [StoragePolicy(directory, ttl_hours * HOUR)],
+        partial_roots=[directory],
+        quota_bytes=quota_bytes
+    )
+
+
+def test_artifact_key_groups_companion_files():
+    names = ["id1.wav", "id1.wav.sha256", "id1.tc-opus.opus", "id1.voice_state.pt", ".id1.voice_state.pt.tmp"]
+    assert {artifact_key(name) for name in names} == {"id1"}
+
+
+def test_partial_artifacts():
+    assert is_partial_artifact("a.wav.partial")
+    assert is_partial_artifact(".a.voice_state.pt.tmp")
+    assert not is_partial_artifact("a.wav")
+    assert not is_partial_artifact("a_raw.mp3")
+
+
+def test_expires_artifacts_with_their_companions(tmp_path):
+    old = [write(tmp_path / "old.wav", age_seconds=3 * HOUR), write(tmp_path / "old.wav.sha256", age_seconds=3 * HOUR)]
+    fresh = write(tmp_path / "new.wav", age_seconds=HOUR / 2)
+    result = janitor(tmp_path, ttl_hours=1).sweep()
+    assert result["expired"] == 2
+    assert not any(path.exists() for path in old)
+    assert fresh.exists()
+
+
+def test_recent_access_keeps_an_artifact(tmp_path):
+    path = write(tmp_path / "old.wav", age_seconds=3 * HOUR)
+    os.utime(path, (time.time(), path.stat().st_mtime))
+    janitor(tmp_path, ttl_hours=1).sweep()
+    assert path.exists()
+
+
+def test_leased_and_partial_artifacts_are_kept(tmp_path):
+    leased = write(tmp_path / "leased.wav", age_seconds=3 * HOUR)
+    writing = write(tmp_path / "writing.wav", age_seconds=3 * HOUR)
+    write(tmp_path / "writing.wav.partial", age_seconds=3 * HOUR)
+    cleaner = janitor(tmp_path, ttl_hours=1)
+    with cleaner.lease(leased):
+        os.utime(leased, (time.time() - 3 * HOUR,) * 2)
+        cleaner.sweep()
+        assert leased.exists()
+    assert writing.exists()
+    assert cleaner.stats()["leases"] == 0
+
+
+def test_quota_deletes_least_recently_accessed_first(tmp_path):
+    oldest = write(tmp_path / "a.wav", age_seconds=GRACE_SECONDS + 300)
+    middle = write(tmp_path / "b.wav", age_seconds=GRACE_SECONDS + 200)
+    newest = write(tmp_path / "c.wav", age_seconds=GRACE_SECONDS + 100)
+    recent = write(tmp_path / "d.wav", age_seconds=0)
+    result = janitor(tmp_path, quota_bytes=250).sweep()
+    assert result["evicted"] == 2
+    assert not oldest.exists() and not middle.exists()
+    assert newest.exists() and recent.exists()
+    assert result["usage_bytes"] == 200
+
+
+def test_quota_skips_directories_outside_it(tmp_path):
+    uploads = tmp_path / "uploads"
+    outputs = uploads / "outputs"
+    outputs.mkdir(parents=True)
+    upload = write(uploads / "voice.wav", size=1000, age_seconds=GRACE_SECONDS + 500)
+    output = write(outputs / "out.wav", age_seconds=GRACE_SECONDS + 100)
+    cleaner = StorageJanitor(
+        [StoragePolicy(outputs, 0), StoragePolicy(uploads, 0, in_quota=False)],
+        partial_roots=[],
+        quota_bytes=50
+    )
+    result = cleaner.sweep()
+    assert upload.exists()
+    assert not output.exists()
+    assert (result["evicted"], result["usage_bytes"]) == (1, 0)
+
+
+def test_ttl_still_applies_outside_the_quota(tmp_path):
+    upload = write(tmp_path / "voice.wav", age_seconds=3 * HOUR)
+    cleaner = StorageJanitor([StoragePolicy(tmp_path, HOUR, in_quota=False)], partial_roots=[], quota_bytes=1)
+    assert cleaner.sweep()["expired"] == 1
+    assert not upload.exists()
+
+
+def test_quota_never_deletes_within_grace_period(tmp_path):
+    paths = [write(tmp_path / f"{i}.wav") for i in range(3)]
+    result = janitor(tmp_path, quota_bytes=100).sweep()
+    assert result["evicted"] == 0
+    assert all(path.exists() for path in paths)
+
+
+def test_startup_removes_partial_files(tmp_path):
+    (tmp_path / "nested").mkdir()
+    debris = [write(tmp_path / "a.wav.partial"), write(tmp_path / "nested" / "b.pt.tmp"), write(tmp_path / "c.tmp")]
+    kept = write(tmp_path / "nested" / "d.wav")
+    cleaner = janitor(tmp_path)
+    assert cleaner.remove_partial_artifacts() == 300
+    assert not any(path.exists() for path in debris)
+    assert kept.exists()
+    assert cleaner.stats()["bytes_reclaimed_by_reason"] == {"startup": 300}
+
+
+def test_startup_removes_job_leftovers_only_where_jobs_write_them(tmp_path):
+    uploads, temp, models = tmp_path / "uploads", tmp_path / "temp", tmp_path / "voice_models"
+    for directory in (uploads / "outputs", temp, models / "my_raw_voice"):
+        directory.mkdir(parents=True)
+    debris = [write(uploads / "abc_raw.mp3"), write(temp / "pod_seg_003.wav")]
+    kept = [
+        write(uploads / "outputs" / "x_raw.wav"),
+        write(uploads / "abc.wav"),
+        write(models / "my_raw_voice" / "original.wav"),
+        write(models / "pod_seg_note.wav"),
+    ]
+    cleaner = StorageJanitor(
+        [],
+        partial_roots=[uploads, models, temp],
+        job_leftovers=[(uploads, "*_raw.*"), (temp, "*_seg_*")]
+    )
+    assert cleaner.remove_partial_artifacts() == 200
+    assert not any(path.exists() for path in debris)
+    assert all(path.exists() for path in kept)
+
+
+def test_job_leftovers_keep_their_artifact_busy(tmp_path):
+    raw = write(tmp_path / "abc_raw.wav", age_seconds=3 * HOUR)
+    cleaner = StorageJanitor([StoragePolicy(tmp_path, HOUR)], partial_roots=[], job_leftovers=[(tmp_path, "*_raw.*")])
+    assert cleaner.sweep()["expired"] == 0
+    assert raw.exists()
+
+
+def test_zero_ttl_keeps_everything(tmp_path):
+    path = write(tmp_path / "old.wav", age_seconds=1000 * HOUR)
+    assert janitor(tmp_path, ttl_hours=0).sweep()["expired"] == 0
+    assert path.exists()
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import time
+
+from app.services.janitor import StorageJanitor
+from app.services.output_cache import OutputCache, output_key
+
+
+def write_output(directory, name: str, size: int = 100) -> dict:
+    path = directory / f"{name}.wav"
+    path.write_bytes(b"\0" * size)
+    return {"output_id": name, "output_path": str(path)}
+
+
+def test_output_key_covers_every_field():
+    key = output_key(text="hi", voice="a", speed=1.0)
+    assert key == output_key(speed=1.0, voice="a", text="hi")
+    assert key != output_key(text="hi", voice="a", speed=1.5)
+
+
+def test_identical_concurrent_requests_share_one_generation(tmp_path):
+    cache = OutputCache(tmp_path / "index")
+    calls = []
+
+    async def create():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return write_output(tmp_path, "out")
+
+    async def main():
+        results = await asyncio.gather(*(cache.get_or_create("k", create) for _ in range(4)))
+        assert len(calls) == 1
+        assert [hit for _, hit in results] == [False, True, True, True]
+        assert all(result == results[0][0] for result, _ in results)
+        assert await cache.get_or_create("k", create) == (results[0][0], True)
+
+    asyncio.run(main())
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["hits"]) == (1, 3, 1)
+
+
+def test_deleted_output_is_generated_again(tmp_path):
+    cache = OutputCache(tmp_path / "index")
+    cache.put("k", write_output(tmp_path, "out"))
+    os.remove(tmp_path / "out.wav")
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+    async def create():
+        return write_output(tmp_path, "again")
+
+    result, hit = asyncio.run(cache.get_or_create("k", create))
+    assert (result["output_id"], hit) == ("again", False)
+
+
+def test_index_is_rebuilt_from_records(tmp_path):
+    OutputCache(tmp_path / "index").put("k", write_output(tmp_path, "out"))
+    reopened = OutputCache(tmp_path / "index")
+    assert reopened.get("k")["output_id"] == "out"
+
+
+def test_hit_refreshes_the_output_access_time(tmp_path):
+    cache = OutputCache(tmp_path / "index")
+    result = write_output(tmp_path, "out")
+    cache.put("k", result)
+    old = time.time() - 3600
+    os.utime(result["output_path"], (old, old))
+    cache.get("k")
+    assert os.stat(result["output_path"]).st_atime > old + 3000
+
+
+def test_evicts_least_recently_used_over_budget(tmp_path):
+    cache = OutputCache(tmp_path / "index", max_bytes=250)
+    for name in "abc":
+        cache.put(name, write_output(tmp_path, name))
+    assert not (tmp_path / "a.wav").exists()
+    assert cache.get("a") is None
+    assert cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_leased_output_survives_eviction(tmp_path):
+    cache = OutputCache(tmp_path / "index", max_bytes=250)
+    janitor = StorageJanitor([], partial_roots=[])
+    cache.janitor = janitor
+    cache.put("a", write_output(tmp_path, "a"))
+    cache.put("b", write_output(tmp_path, "b"))
+
+    with janitor.lease(tmp_path / "a.wav"):
+        cache.put("c", write_output(tmp_path, "c"))
+        # "a" is being served, so the next least recently used goes instead
+        assert (tmp_path / "a.wav").exists()
+        assert not (tmp_path / "b.wav").exists()
+        assert cache.get("a") is not None
+
+    # Once released it is an ordinary entry again
+    cache.put("d", write_output(tmp_path, "d"))
+    assert not (tmp_path / "c.wav").exists()
+    assert cache.stats()["bytes"] <= 250
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from app.services.scheduler import GenerationScheduler, Priority, SchedulerFull, client_id_for
+
+
+async def hold(scheduler: GenerationScheduler, order: list, label: str, release: asyncio.Event, **kwargs) -> None:
+    async with scheduler.slot(**kwargs):
+        order.append(label)
+        await release.wait()
+
+
+async def settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_runs_at_most_max_concurrent():
+    async def main():
+        scheduler = GenerationScheduler(max_concurrent=2)
+        order, release = [], asyncio.Event()
+        tasks = [asyncio.create_task(hold(scheduler, order, str(i), release)) for i in range(5)]
+        await settle()
+        assert scheduler.stats()["running"] == 2
+        assert scheduler.stats()["queued"] == 3
+        release.set()
+        await asyncio.gather(*tasks)
+        stats = scheduler.stats()
+        assert (stats["running"], stats["queued"], stats["completed"]) == (0, 0, 5)
+
+    asyncio.run(main())
+
+
+def test_interactive_work_goes_before_batch():
+    async def main():
+        scheduler = GenerationScheduler(max_concurrent=1)
+        order, first, rest = [], asyncio.Event(), asyncio.Event()
+        running = asyncio.create_task(hold(scheduler, order, "running", first))
+        await settle()
+        tasks = [
+            asyncio.create_task(hold(scheduler, order, "batch", rest, priority=Priority.BATCH)),
+            asyncio.create_task(hold(scheduler, order, "interactive", rest, priority=Priority.INTERACTIVE)),
+        ]
+        await settle()
+        rest.set()
+        first.set()
+        await asyncio.gather(running, *tasks)
+        assert order == ["running", "interactive", "batch"]
+
+    asyncio.run(main())
+
+
+def test_clients_take_turns_within_a_priority():
+    async def main():
+        scheduler = GenerationScheduler(max_concurrent=1)
+        order, first, rest = [], asyncio.Event(), asyncio.Event()
+        running = asyncio.create_task(hold(scheduler, order, "running", first))
+        await settle()
+        tasks = [asyncio.create_task(hold(scheduler, order, f"a{i}", rest, client_id="a")) for i in range(3)]
+        tasks.append(asyncio.create_task(hold(scheduler, order, "b0", rest, client_id="b")))
+        await settle()
+        rest.set()
+        first.set()
+        await asyncio.gather(running, *tasks)
+        assert order == ["running", "a0", "b0", "a1", "a2"]
+
+    asyncio.run(main())
+
+
+def test_rejects_when_queue_is_full():
+    async def main():
+        scheduler = GenerationScheduler(max_concurrent=1, max_queue=1)
+        order, release = [], asyncio.Event()
+        tasks = [asyncio.create_task(hold(scheduler, order, str(i), release)) for i in range(2)]
+        await settle()
+        with pytest.raises(SchedulerFull) as rejected:
+            scheduler.check_admission()
+        assert rejected.value.retry_after >= 1
+        assert scheduler.stats()["rejected"] == 1
+
+        # Already admitted work is queued regardless
+        tasks.append(asyncio.create_task(hold(scheduler, order, "admitted", release, admit=False)))
+        await settle()
+        assert scheduler.stats()["queued"] == 2
+        release.set()
+        await asyncio.gather(*tasks)
+        assert len(order) == 3
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        scheduler = GenerationScheduler(max_concurrent=1)
+        order, release = [], asyncio.Event()
+        running = asyncio.create_task(hold(scheduler, order, "running", release))
+        waiting = asyncio.create_task(hold(scheduler, order, "waiting", release))
+        await settle()
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        assert scheduler.stats()["queued"] == 0
+        release.set()
+        await running
+        assert order == ["running"]
+        assert scheduler.stats()["running"] == 0
+
+    asyncio.run(main())
+
+
+def test_client_id_for_prefers_header():
+    class Client:
+        host = "10.0.0.1"
+
+    class Request:
+        def __init__(self, headers, client):
+            self.headers = headers
+            self.client = client
+
+    assert client_id_for(Request({"x-client-id": "studio"}, Client())) == "studio"
+    assert client_id_for(Request({}, Client())) == "10.0.0.1"
+    assert client_id_for(Request({}, None)) == "anonymous"
@@ -0,0 +1,58 @@
+import io
+
+import numpy as np
+
+from app.services.segment_cache import SegmentCache, segment_key
+
+
+def audio(length: int = 100, value: float = 0.5) -> np.ndarray:
+    return np.full(length, value, dtype=np.float32)
+
+
+def test_segment_key_depends_on_every_input():
+    params = {"model_variant": "a", "crossfade_ms": 10}
+    key = segment_key("voice", "Hello.", params)
+    assert key == segment_key("voice", "Hello.", dict(reversed(params.items())))
+    assert key != segment_key("other", "Hello.", params)
+    assert key != segment_key("voice", "Hello!", params)
+    assert key != segment_key("voice", "Hello.", {**params, "crossfade_ms": 20})
+
+
+def test_round_trip_and_stats(tmp_path):
+    cache = SegmentCache(tmp_path)
+    assert cache.get("a") is None
+    cache.put("a", audio())
+    np.testing.assert_array_equal(cache.get("a"), audio())
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 1)
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_evicts_least_recently_used(tmp_path):
+    npy = io.BytesIO()
+    np.save(npy, audio(), allow_pickle=False)
+    cache = SegmentCache(tmp_path, max_bytes=2 * len(npy.getvalue()))
+    cache.put("a", audio())
+    cache.put("b", audio())
+    cache.get("a")
+    cache.put("c", audio())
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1
+    assert not (tmp_path / "b.npy").exists()
+
+
+def test_index_is_rebuilt_from_disk(tmp_path):
+    SegmentCache(tmp_path).put("a", audio())
+    reopened = SegmentCache(tmp_path)
+    assert reopened.stats()["entries"] == 1
+    np.testing.assert_array_equal(reopened.get("a"), audio())
+
+
+def test_unreadable_segment_is_dropped(tmp_path):
+    cache = SegmentCache(tmp_path)
+    cache.put("a", audio())
+    (tmp_path / "a.npy").write_bytes(b"not numpy")
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+    assert not (tmp_path / "a.npy").exists()
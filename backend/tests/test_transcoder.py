@@ -0,0 +1,115 @@
+import asyncio
+import os
+
+import numpy as np
+import soundfile as sf
+
+from app.services.http_cache import digest_path
+from app.services.transcoder import TranscodeCache
+
+
+def write_source(path, seconds: float = 1.0, sr: int = 24000):
+    t = np.arange(int(seconds * sr)) / sr
+    sf.write(path, (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32), sr, subtype="FLOAT")
+    return path
+
+
+def make_older(path, seconds: int = 60) -> None:
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - seconds * 10 ** 9))
+
+
+def test_wav_is_served_as_stored(tmp_path):
+    source = write_source(tmp_path / "a.wav")
+    variant = asyncio.run(TranscodeCache([tmp_path]).variant(source, "wav"))
+    assert variant.path == source
+    assert list(tmp_path.iterdir()) == [source]
+
+
+def test_encodes_once_and_serves_cached_variant(tmp_path):
+    source = write_source(tmp_path / "a.wav")
+    cache = TranscodeCache([tmp_path])
+
+    async def main():
+        first, second = await asyncio.gather(cache.variant(source, "flac"), cache.variant(source, "flac"))
+        assert first.path == second.path
+        await cache.variant(source, "flac")
+        return first
+
+    variant = asyncio.run(main())
+    assert variant.media_type == "audio/flac"
+    decoded, sr = sf.read(variant.path, dtype="float32")
+    assert sr == 24000
+    assert np.max(np.abs(decoded - sf.read(source, dtype="float32")[0])) < 1e-4
+    assert digest_path(variant.path).exists()
+    stats = cache.stats()
+    assert (stats["misses"], stats["hits"], stats["entries"]) == (1, 1, 1)
+
+
+def test_variant_older_than_source_is_encoded_again(tmp_path):
+    source = write_source(tmp_path / "a.wav")
+    cache = TranscodeCache([tmp_path])
+    path = asyncio.run(cache.variant(source, "wav_int16")).path
+    make_older(path)
+
+    write_source(source, seconds=2.0)
+    asyncio.run(cache.variant(source, "wav_int16"))
+    assert sf.info(path).frames == 48000
+    assert cache.stats()["misses"] == 2
+    assert cache.stats()["bytes"] == path.stat().st_size
+
+
+def test_opus_is_resampled_to_a_supported_rate(tmp_path):
+    source = write_source(tmp_path / "a.wav", sr=44100)
+    variant = asyncio.run(TranscodeCache([tmp_path]).variant(source, "opus"))
+    assert sf.info(variant.path).samplerate == 48000
+
+
+def test_evicts_least_recently_used_over_budget(tmp_path):
+    sources = [write_source(tmp_path / f"{name}.wav") for name in "abc"]
+    variant_bytes = 24000 * 2 + 44
+    cache = TranscodeCache([tmp_path], max_bytes=2 * variant_bytes)
+
+    async def main():
+        paths = [(await cache.variant(source, "wav_int16")).path for source in sources[:2]]
+        await cache.variant(sources[0], "wav_int16")  # b is now least recent
+        paths.append((await cache.variant(sources[2], "wav_int16")).path)
+        return paths
+
+    a, b, c = asyncio.run(main())
+    assert a.exists() and c.exists()
+    assert not b.exists() and not digest_path(b).exists()
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"]) == (2, 1)
+    assert stats["bytes"] <= 2 * variant_bytes
+
+
+def test_index_is_rebuilt_and_partials_removed(tmp_path):
+    source = write_source(tmp_path / "a.wav")
+    path = asyncio.run(TranscodeCache([tmp_path]).variant(source, "flac")).path
+    partial = tmp_path / "b.tc-flac.flac.partial"
+    partial.write_bytes(b"half")
+
+    cache = TranscodeCache([tmp_path])
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] == path.stat().st_size
+    assert not partial.exists()
+
+
+def test_discard_removes_every_variant_of_a_source(tmp_path):
+    source = write_source(tmp_path / "a.wav")
+    other = write_source(tmp_path / "ab.wav")
+    cache = TranscodeCache([tmp_path])
+
+    async def main():
+        for name in ("flac", "wav_int16"):
+            await cache.variant(source, name)
+        return (await cache.variant(other, "flac")).path
+
+    kept = asyncio.run(main())
+    assert cache.discard(source) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        ["a.wav", "ab.wav", kept.name, digest_path(kept).name]
+    )
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] == kept.stat().st_size
@@ -0,0 +1,113 @@
+import asyncio
+import os
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.routers.audio import ALLOWED_EXTENSIONS, upload_audio
+from app.services import upload_spool
+from app.services.upload_spool import UnsupportedUpload, UploadTooLarge, sniff_audio_format, spool_upload
+
+BOUNDARY = "voiceforgeboundary"
+WAV_HEADER = b"RIFF\x24\x00\x00\x00WAVEfmt "
+
+
+def multipart(filename: str, content: bytes, field: str = "file") -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def make_request(body: bytes, chunk_size: int = 1024, content_length: int | None = None) -> tuple[Request, list]:
+    """A request whose body arrives in chunks; the list records chunks read."""
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+    received = []
+
+    async def receive():
+        index = len(received)
+        received.append(chunks[index])
+        return {"type": "http.request", "body": chunks[index], "more_body": index + 1 < len(chunks)}
+
+    length = len(body) if content_length is None else content_length
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/audio/upload",
+        "query_string": b"",
+        "headers": [
+            (b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode()),
+            (b"content-length", str(length).encode()),
+        ],
+    }
+    return Request(scope, receive), received
+
+
+def spool(request: Request, destination) -> tuple[str, str, int]:
+    return asyncio.run(spool_upload(request, str(destination), ALLOWED_EXTENSIONS))
+
+
+def test_sniffs_supported_containers():
+    assert sniff_audio_format(WAV_HEADER) == ".wav"
+    assert sniff_audio_format(b"fLaC\x00\x00\x00\x22") == ".flac"
+    assert sniff_audio_format(b"\x00\x00\x00\x20ftypM4A ") == ".m4a"
+    assert sniff_audio_format(b"ID3\x04\x00\x00") == ".mp3"
+    assert sniff_audio_format(b"<html><body>") is None
+
+
+def test_spools_file_to_disk(tmp_path):
+    content = WAV_HEADER + os.urandom(5000)
+    request, _ = make_request(multipart("talk.wav", content))
+    assert spool(request, tmp_path / "spool") == ("talk.wav", ".wav", len(content))
+    assert (tmp_path / "spool").read_bytes() == content
+
+
+def test_rejects_declared_oversize_without_reading_body(tmp_path):
+    request, received = make_request(b"", content_length=upload_spool.MAX_UPLOAD_BYTES * 2)
+    with pytest.raises(UploadTooLarge):
+        spool(request, tmp_path / "spool")
+    assert received == []
+    assert not (tmp_path / "spool").exists()
+
+
+def test_rejects_oversize_as_soon_as_limit_is_passed(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_spool, "MAX_UPLOAD_BYTES", 4096)
+    body = multipart("talk.wav", WAV_HEADER + bytes(64 * 1024))
+    # No Content-Length to go by, so the limit is enforced on received data
+    request, received = make_request(body, content_length=0)
+    with pytest.raises(UploadTooLarge):
+        spool(request, tmp_path / "spool")
+    assert len(received) < len(body) // 1024
+    assert not (tmp_path / "spool").exists()
+
+
+def test_rejects_unsupported_extension(tmp_path):
+    request, _ = make_request(multipart("notes.txt", b"just some text"))
+    with pytest.raises(UnsupportedUpload):
+        spool(request, tmp_path / "spool")
+    assert not (tmp_path / "spool").exists()
+
+
+def test_rejects_content_that_does_not_match_extension(tmp_path):
+    body = multipart("talk.mp3", WAV_HEADER + bytes(64 * 1024))
+    request, received = make_request(body)
+    with pytest.raises(UnsupportedUpload):
+        spool(request, tmp_path / "spool")
+    assert len(received) == 1
+    assert not (tmp_path / "spool").exists()
+
+
+@pytest.mark.parametrize("body, content_length, status", [
+    (multipart("talk.exe", b"MZ\x90\x00" * 8), None, 415),
+    (multipart("talk.wav", b"<html><body>" * 4), None, 415),
+    (b"", upload_spool.MAX_UPLOAD_BYTES * 2, 413),
+])
+def test_upload_endpoint_maps_rejections(tmp_path, monkeypatch, body, content_length, status):
+    monkeypatch.chdir(tmp_path)
+    request, _ = make_request(body, content_length=content_length)
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(upload_audio(request))
+    assert raised.value.status_code == status
+    assert os.listdir(tmp_path / "uploads") == []
@@ -0,0 +1,86 @@
+import threading
+import time
+
+import torch
+
+from app.services.voice_cache import VoiceStateCache, state_nbytes
+
+
+def state(n_floats: int) -> dict:
+    return {"layer": [torch.zeros(n_floats, dtype=torch.float32)]}
+
+
+def test_state_nbytes_counts_nested_tensors():
+    nested = {"a": torch.zeros(4), "b": [torch.zeros(2, dtype=torch.float64), (torch.zeros(1),)], "c": "x"}
+    assert state_nbytes(nested) == 4 * 4 + 2 * 8 + 4
+
+
+def test_get_put_and_stats():
+    cache = VoiceStateCache(max_bytes=1024)
+    assert cache.get("a") is None
+    cache.put("a", state(4))
+    assert cache.get("a") is not None
+    assert "a" in cache
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["hits"], stats["misses"]) == (1, 16, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_evicts_least_recently_used_over_budget():
+    cache = VoiceStateCache(max_bytes=3 * 16)
+    for key in "abc":
+        cache.put(key, state(4))
+    cache.get("a")  # "b" is now the oldest
+    cache.put("d", state(4))
+    assert "b" not in cache
+    assert all(key in cache for key in "acd")
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 3 * 16
+
+
+def test_replacing_an_entry_updates_its_size():
+    cache = VoiceStateCache(max_bytes=1024)
+    cache.put("a", state(4))
+    cache.put("a", state(8))
+    assert cache.stats()["bytes"] == 32
+
+
+def test_state_larger_than_budget_is_not_kept():
+    cache = VoiceStateCache(max_bytes=8)
+    cache.put("a", state(4))
+    assert "a" not in cache
+    assert cache.stats()["bytes"] == 0
+
+
+def test_invalidate_and_clear():
+    cache = VoiceStateCache()
+    cache.put("a", state(4))
+    cache.put("b", state(4))
+    assert cache.invalidate("a")
+    assert not cache.invalidate("a")
+    assert cache.stats()["bytes"] == 16
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["bytes"] == 0
+
+
+def test_concurrent_misses_load_once():
+    cache = VoiceStateCache()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        time.sleep(0.05)
+        return state(4)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("a", loader))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert all(result is results[0] for result in results)
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 7
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from app.services.voice_catalog import VoiceCatalog, decode_cursor, encode_cursor
+
+
+def save_model(root, voice_id: str, name: str, created_at: str, tags=()) -> dict:
+    metadata = {"id": voice_id, "name": name, "created_at": created_at, "tags": list(tags)}
+    model_dir = root / voice_id
+    model_dir.mkdir(parents=True, exist_ok=True)
+    (model_dir / "metadata.json").write_text(json.dumps(metadata))
+    return metadata
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    names = ["Host Voice", "Guest 50% Off", "narrator_one", "Wörld Señor", "HOST two", "x"]
+    for i, name in enumerate(names):
+        save_model(tmp_path, f"v{i}", name, f"2026-01-0{i + 1}T00:00:00", tags=["even" if i % 2 == 0 else "odd"])
+    catalog = VoiceCatalog(tmp_path)
+    yield catalog
+    catalog.close()
+
+
+def ids(models: list[dict]) -> list[str]:
+    return [model["id"] for model in models]
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor("2026-01-01", "v1")) == ("2026-01-01", "v1")
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor")
+
+
+def test_lists_newest_first(catalog):
+    models, next_cursor = catalog.list_models()
+    assert ids(models) == ["v5", "v4", "v3", "v2", "v1", "v0"]
+    assert next_cursor is None
+    assert catalog.count() == 6
+
+
+def test_pages_cover_every_model_once(catalog):
+    seen, cursor = [], None
+    while True:
+        models, cursor = catalog.list_models(limit=4, cursor=cursor)
+        seen += ids(models)
+        if cursor is None:
+            break
+    assert seen == ["v5", "v4", "v3", "v2", "v1", "v0"]
+
+
+def test_tag_filter_pages(catalog):
+    models, cursor = catalog.list_models(limit=2, tag="even")
+    assert ids(models) == ["v4", "v2"]
+    models, cursor = catalog.list_models(limit=2, cursor=cursor, tag="even")
+    assert ids(models) == ["v0"]
+    assert cursor is None
+
+
+@pytest.mark.parametrize("query", ["host", "HOST", "st vo", "50% o", "_one", "wör", "o", "x", "zzz"])
+def test_name_filter_matches_case_insensitive_substrings(catalog, query):
+    models, _ = catalog.list_models(name=query)
+    expected = [m["id"] for m in catalog.list_models()[0] if query.lower() in m["name"].lower()]
+    assert ids(models) == expected
+
+
+def test_name_and_tag_filters_combine(catalog):
+    models, _ = catalog.list_models(tag="even", name="host")
+    assert ids(models) == ["v4", "v0"]
+
+
+def test_upsert_and_remove_update_the_index(catalog, tmp_path):
+    metadata = save_model(tmp_path, "v0", "Renamed", "2026-01-01T00:00:00", tags=["new"])
+    catalog.upsert(metadata)
+    assert ids(catalog.list_models(name="renamed")[0]) == ["v0"]
+    assert ids(catalog.list_models(name="host voice")[0]) == []
+    assert ids(catalog.list_models(tag="new")[0]) == ["v0"]
+
+    catalog.remove("v0")
+    assert ids(catalog.list_models(name="renamed")[0]) == []
+    assert ids(catalog.list_models(tag="new")[0]) == []
+
+
+def test_reconcile_picks_up_changes_on_disk(catalog, tmp_path):
+    catalog.close()
+    save_model(tmp_path, "v9", "Added Later", "2026-02-01T00:00:00")
+    (tmp_path / "v1" / "metadata.json").unlink()
+    reopened = VoiceCatalog(tmp_path)
+    try:
+        assert ids(reopened.list_models(limit=1)[0]) == ["v9"]
+        assert "v1" not in ids(reopened.list_models()[0])
+        assert ids(reopened.list_models(name="added")[0]) == ["v9"]
+    finally:
+        reopened.close()
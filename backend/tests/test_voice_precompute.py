@@ -0,0 +1,145 @@
+import asyncio
+import threading
+
+import torch
+
+from app.services.scheduler import GenerationScheduler, Priority
+from app.services.voice_cache import VoiceStateCache
+from app.services.voice_cloner import VoiceClonerService
+
+
+class EncodingModel:
+    """Stands in for TTSModel; encoding waits for `release` and can fail."""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def get_state_for_audio_prompt(self, prompt):
+        self.started.set()
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("cannot encode")
+        return {"module": {"cache": torch.zeros(2, 3)}}
+
+
+def make_service(tmp_path, model: EncodingModel) -> VoiceClonerService:
+    """The service's precompute bookkeeping without loading Pocket-TTS."""
+    service = VoiceClonerService.__new__(VoiceClonerService)
+    service.voice_models_dir = tmp_path / "voice_models"
+    service.tts_model = model
+    service.voice_cache = VoiceStateCache()
+    service._precompute_tasks = {}
+    service._precompute_encoding = set()
+    service._precompute_failed = set()
+    return service
+
+
+def make_upload(tmp_path) -> str:
+    path = tmp_path / "upload.wav"
+    path.write_bytes(b"RIFF")
+    return str(path)
+
+
+async def settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def finish(service: VoiceClonerService) -> None:
+    await asyncio.gather(*service._precompute_tasks.values(), return_exceptions=True)
+    await settle()
+
+
+def test_precompute_goes_pending_then_ready(tmp_path):
+    service = make_service(tmp_path, EncodingModel())
+    audio_path = make_upload(tmp_path)
+
+    async def main():
+        assert service.voice_state_status(audio_path) == "none"
+        service.precompute_voice_state(audio_path, GenerationScheduler())
+        assert service.voice_state_status(audio_path) == "pending"
+        await finish(service)
+
+    asyncio.run(main())
+    assert service.voice_state_status(audio_path) == "ready"
+    assert service.precomputed_state_path(audio_path).exists()
+    assert service.describe_voice(audio_path=audio_path).key in service.voice_cache
+
+
+def test_failed_precompute_is_reported_until_retried(tmp_path):
+    model = EncodingModel(fail=True)
+    service = make_service(tmp_path, model)
+    audio_path = make_upload(tmp_path)
+
+    async def main():
+        service.precompute_voice_state(audio_path, GenerationScheduler())
+        await finish(service)
+        assert service.voice_state_status(audio_path) == "failed"
+        model.fail = False
+        service.precompute_voice_state(audio_path, GenerationScheduler())
+        assert service.voice_state_status(audio_path) == "pending"
+        await finish(service)
+
+    asyncio.run(main())
+    assert service.voice_state_status(audio_path) == "ready"
+
+
+def test_discard_forgets_a_ready_state(tmp_path):
+    service = make_service(tmp_path, EncodingModel())
+    audio_path = make_upload(tmp_path)
+
+    async def main():
+        service.precompute_voice_state(audio_path, GenerationScheduler())
+        await finish(service)
+
+    asyncio.run(main())
+    key = service.describe_voice(audio_path=audio_path).key
+    service.discard_voice_state(audio_path)
+    assert service.voice_state_status(audio_path) == "none"
+    assert not service.precomputed_state_path(audio_path).exists()
+    assert key not in service.voice_cache
+
+
+def test_discard_cancels_a_queued_precompute(tmp_path):
+    model = EncodingModel()
+    service = make_service(tmp_path, model)
+    audio_path = make_upload(tmp_path)
+
+    async def main():
+        scheduler = GenerationScheduler(max_concurrent=1)
+        async with scheduler.slot(Priority.INTERACTIVE, "someone"):
+            service.precompute_voice_state(audio_path, scheduler)
+            await settle()
+            assert service.voice_state_status(audio_path) == "pending"
+            service.discard_voice_state(audio_path)
+            await finish(service)
+        assert scheduler.stats()["queued"] == 0
+
+    asyncio.run(main())
+    assert not model.started.is_set()
+    assert service.voice_state_status(audio_path) == "none"
+
+
+def test_upload_deleted_while_encoding_leaves_no_state(tmp_path):
+    model = EncodingModel()
+    model.release.clear()
+    service = make_service(tmp_path, model)
+    audio_path = make_upload(tmp_path)
+
+    async def main():
+        service.precompute_voice_state(audio_path, GenerationScheduler())
+        await asyncio.to_thread(model.started.wait, 5)
+        key = service.describe_voice(audio_path=audio_path).key
+        service.discard_voice_state(audio_path)
+        (tmp_path / "upload.wav").unlink()
+        model.release.set()
+        await finish(service)
+        return key
+
+    key = asyncio.run(main())
+    assert service.voice_state_status(audio_path) == "none"
+    assert not service.precomputed_state_path(audio_path).exists()
+    assert key not in service.voice_cache
@@ -0,0 +1,108 @@
+import json
+
+import torch
+
+from app.services.voice_state import (
+    MAGIC,
+    _HEADER_LEN,
+    load_or_encode_voice_state,
+    load_voice_state,
+    save_voice_state,
+)
+
+VARIANT = "b6369a24"
+
+
+def make_state() -> dict:
+    return {"module": {"cache": torch.arange(6, dtype=torch.float32).reshape(2, 3), "step": torch.tensor(3)}}
+
+
+def assert_same_state(loaded: dict, state: dict) -> None:
+    assert loaded.keys() == state.keys()
+    for name, tensor in state["module"].items():
+        assert torch.equal(loaded["module"][name], tensor)
+
+
+def rewrite_header(path, **changes) -> None:
+    data = path.read_bytes()
+    (header_len,) = _HEADER_LEN.unpack_from(data, len(MAGIC))
+    start = len(MAGIC) + _HEADER_LEN.size
+    header = json.loads(data[start:start + header_len])
+    header.update(changes)
+    encoded = json.dumps(header).encode("utf-8")
+    path.write_bytes(MAGIC + _HEADER_LEN.pack(len(encoded)) + encoded + data[start + header_len:])
+
+
+class CountingModel:
+    """Stands in for TTSModel.get_state_for_audio_prompt."""
+
+    def __init__(self):
+        self.encodes = 0
+
+    def get_state_for_audio_prompt(self, prompt):
+        self.encodes += 1
+        return make_state()
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "voice_state.pt"
+    save_voice_state(path, make_state(), VARIANT)
+    assert_same_state(load_voice_state(path, VARIANT), make_state())
+    # Written atomically: no temp files left behind
+    assert [p.name for p in tmp_path.iterdir()] == ["voice_state.pt"]
+
+
+def test_missing_file(tmp_path):
+    assert load_voice_state(tmp_path / "voice_state.pt", VARIANT) is None
+
+
+def test_legacy_file_without_header(tmp_path):
+    path = tmp_path / "voice_state.pt"
+    torch.save(make_state(), path)
+    assert load_voice_state(path, VARIANT) is None
+
+
+def test_corrupt_payload_fails_checksum(tmp_path):
+    path = tmp_path / "voice_state.pt"
+    save_voice_state(path, make_state(), VARIANT)
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    assert load_voice_state(path, VARIANT) is None
+
+
+def test_truncated_file(tmp_path):
+    path = tmp_path / "voice_state.pt"
+    save_voice_state(path, make_state(), VARIANT)
+    path.write_bytes(path.read_bytes()[:len(MAGIC) + 2])
+    assert load_voice_state(path, VARIANT) is None
+
+
+def test_stale_versions_are_rejected(tmp_path):
+    path = tmp_path / "voice_state.pt"
+    save_voice_state(path, make_state(), VARIANT)
+    assert load_voice_state(path, "other-variant") is None
+
+    rewrite_header(path, library_version="0.0.0")
+    assert load_voice_state(path, VARIANT) is None
+
+    save_voice_state(path, make_state(), VARIANT)
+    rewrite_header(path, format_version=0)
+    assert load_voice_state(path, VARIANT) is None
+
+
+def test_load_or_encode_persists_then_reuses(tmp_path):
+    path = tmp_path / "voice_state.pt"
+    model = CountingModel()
+    assert_same_state(load_or_encode_voice_state(model, "prompt.wav", path, VARIANT), make_state())
+    assert_same_state(load_or_encode_voice_state(model, "prompt.wav", path, VARIANT), make_state())
+    assert model.encodes == 1
+
+
+def test_load_or_encode_rebuilds_a_corrupt_state(tmp_path):
+    path = tmp_path / "voice_state.pt"
+    path.write_bytes(MAGIC + b"garbage")
+    model = CountingModel()
+    load_or_encode_voice_state(model, "prompt.wav", path, VARIANT)
+    assert model.encodes == 1
+    assert_same_state(load_voice_state(path, VARIANT), make_state())